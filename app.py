@@ -1,11 +1,33 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, has_request_context, request, jsonify
 from flask_cors import CORS
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import psycopg2
 from psycopg2.extras import RealDictCursor
-import bcrypt
+import atexit
+import hmac
+import numpy as np
 import os
+import time
+
+from src.audit import AuditWriter
+from src.db import ConnectionPool, PoolError, config_from_env, observe_queries, timed_connect
+from src.formats import BINARY_FORMATS, MIMETYPES, FormatUnavailable, encode, negotiate, stack
+from src.health import HealthProber
+from src.hashing import HashingBusy, PasswordHasher
+from src.ml.forecasts import ForecastService, PathBudget
+from src.ml.predictor import CONFIDENCE_INTERVAL, forecast_many
+from src.metrics import CONTENT_TYPE, COUNTER, GAUGE, HISTOGRAM, Metrics
+from src.ml.registry import ModelRegistry
+from src.slow_queries import SlowQueryLog
+from src.rate_limit import RateLimiter, create_backend, rate_limit
+from src.stocks.cache import TTLCache
+from src.stocks.history import (
+    VALID_PERIODS, StockHistoryService, StockNotFound, UpstreamError,
+    build_payload, encode_ndjson, history_columns, history_meta, series_chunks,
+)
+from src.stocks.downsample import lttb
+from src.stocks.store import PriceStore
 
 # Load environment variables from .env file
 load_dotenv()
@@ -13,53 +35,138 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)
 
-# Database configuration
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'port': os.getenv('DB_PORT', '5432'),
-    'database': os.getenv('DB_NAME', 'stock_predictor'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', 'your_password_here')
-}
-
-def get_db_connection():
-    """Create and return a database connection"""
-    try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        return conn
-    except psycopg2.Error as e:
-        print(f"Database connection error: {e}")
-        return None
+# Metrics configuration. With several worker processes, point METRICS_DIR at a
+# directory they all share so any worker's /metrics adds up every worker.
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '1.0'))   # seconds
+
+metrics = Metrics(METRICS_DIR or None, METRICS_FLUSH_INTERVAL)
+metrics.define('http_requests_total', COUNTER, 'Requests handled, by route, method and status')
+metrics.define('http_request_duration_seconds', HISTOGRAM, 'Time to build the response, by route and method')
+metrics.define('http_request_db_seconds', HISTOGRAM, 'Time spent in cursor.execute per request, by route and method')
+metrics.define('http_requests_in_flight', GAUGE, 'Requests currently being handled')
+metrics.define('db_query_duration_seconds', HISTOGRAM, 'Duration of each cursor.execute')
+metrics.define('bcrypt_duration_seconds', HISTOGRAM, 'Time each bcrypt hash or verify spent hashing')
+
+@app.before_request
+def start_request_metrics():
+    metrics.ensure_started()
+    g.metrics_started = time.perf_counter()
+    g.db_seconds = 0.0
+    metrics.add('http_requests_in_flight')
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.get('metrics_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        labels = (('route', route), ('method', request.method))
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - started, labels)
+        metrics.observe('http_request_db_seconds', g.db_seconds, labels)
+        metrics.inc('http_requests_total', labels + (('status', str(response.status_code)),))
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    if g.pop('metrics_started', None) is not None:
+        metrics.add('http_requests_in_flight', value=-1)
+
+def record_query(seconds, query, params):
+    """Time in cursor.execute, overall and for the current request"""
+    metrics.observe('db_query_duration_seconds', seconds)
+    if has_request_context() and 'db_seconds' in g:
+        g.db_seconds += seconds
+
+observe_queries(record_query)
+
+# Database configuration (DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD)
+DB_CONFIG = config_from_env()
+
+# Connection pool configuration
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '5'))                 # seconds to wait for a free connection
+DB_POOL_VALIDATE_AFTER = float(os.getenv('DB_POOL_VALIDATE_AFTER', '30'))  # ping connections idle longer than this
+
+db_pool = ConnectionPool(
+    DB_CONFIG,
+    minconn=DB_POOL_MIN,
+    maxconn=DB_POOL_MAX,
+    timeout=DB_POOL_TIMEOUT,
+    validate_after=DB_POOL_VALIDATE_AFTER,
+    connect=timed_connect,
+)
+
+# Slow-query log: statements slower than SLOW_QUERY_MS get a sampled,
+# rate-limited EXPLAIN, viewable at /admin/slow-queries
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv('SLOW_QUERY_SAMPLE_RATE', '1.0'))
+SLOW_QUERY_EXPLAIN_INTERVAL = float(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', '60'))   # seconds per fingerprint
+SLOW_QUERY_LOG_SIZE = int(os.getenv('SLOW_QUERY_LOG_SIZE', '100'))                     # plans kept
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN', '')                                              # empty disables /admin
+
+slow_query_log = SlowQueryLog(
+    db_pool,
+    threshold=SLOW_QUERY_MS / 1000,
+    sample_rate=SLOW_QUERY_SAMPLE_RATE,
+    interval=SLOW_QUERY_EXPLAIN_INTERVAL,
+    capacity=SLOW_QUERY_LOG_SIZE,
+)
+observe_queries(slow_query_log.record)
+
+def get_db_connection(autocommit=False):
+    """
+    Check a connection out of the shared pool.
+    Use as a context manager; raises PoolError if none is available.
+    """
+    return db_pool.connection(autocommit=autocommit)
     
+# Auth audit pipeline configuration
+AUDIT_BATCH_SIZE = int(os.getenv('AUDIT_BATCH_SIZE', '100'))
+AUDIT_FLUSH_INTERVAL = float(os.getenv('AUDIT_FLUSH_INTERVAL', '1.0'))  # seconds
+AUDIT_QUEUE_SIZE = int(os.getenv('AUDIT_QUEUE_SIZE', '10000'))
+AUDIT_OVERFLOW = os.getenv('AUDIT_OVERFLOW', 'drop')                    # 'drop' or 'block'
+
+audit_writer = AuditWriter(
+    db_pool,
+    batch_size=AUDIT_BATCH_SIZE,
+    flush_interval=AUDIT_FLUSH_INTERVAL,
+    max_queue=AUDIT_QUEUE_SIZE,
+    overflow=AUDIT_OVERFLOW,
+)
+atexit.register(audit_writer.close)
+
 def record_auth_event(action, email, user_id=None):
     """
-    Insert a simple authentication audit record.
+    Queue an authentication audit record for the background writer.
     This is best-effort: failures here should not break login or register.
     """
     try:
-        conn = get_db_connection()
-        if not conn:
-            return
-
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            INSERT INTO auth_audit (user_id, email, action, ip_address)
-            VALUES (%s, %s, %s, %s)
-            """,
-            (user_id, email, action, request.remote_addr)
-        )
-        conn.commit()
-
+        audit_writer.record(action, email, user_id, request.remote_addr)
     except Exception as e:
         print(f"Auth audit error: {e}")
 
-    finally:
-        try:
-            cursor.close()
-            conn.close()
-        except:
-            pass
+# Password hashing pool configuration
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+BCRYPT_WORKERS = int(os.getenv('BCRYPT_WORKERS', str(os.cpu_count() or 2)))
+BCRYPT_MAX_PENDING = int(os.getenv('BCRYPT_MAX_PENDING', '32'))   # queued jobs before answering 503
+BCRYPT_TIMEOUT = float(os.getenv('BCRYPT_TIMEOUT', '5'))          # seconds
+
+password_hasher = PasswordHasher(
+    workers=BCRYPT_WORKERS,
+    max_pending=BCRYPT_MAX_PENDING,
+    timeout=BCRYPT_TIMEOUT,
+    rounds=BCRYPT_ROUNDS,
+    observe=lambda seconds: metrics.observe('bcrypt_duration_seconds', seconds),
+)
+
+@app.errorhandler(HashingBusy)
+def hashing_busy(e):
+    """Shed auth load quickly instead of queueing requests behind bcrypt"""
+    response = jsonify({"error": "Server is busy. Please try again shortly."})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
 
 import re   # make sure this is at your imports at the very top
 
@@ -88,30 +195,83 @@ def validate_password(password: str):
 
     return True, ""
 
-from collections import defaultdict
-import time   # also ensure this is imported above
+# Rate limiting configuration
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')   # 'memory', 'shm' or 'redis'
+RATE_LIMIT_SHM_PATH = os.getenv('RATE_LIMIT_SHM_PATH', '/dev/shm/stock_predictor_ratelimit')
+RATE_LIMIT_REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0')
 
 LOGIN_RATE_LIMIT_WINDOW = 60     # seconds
-LOGIN_RATE_LIMIT_MAX = 10        # max attempts per IP per window
-login_attempts = defaultdict(list)
+LOGIN_RATE_LIMIT_MAX = int(os.getenv('LOGIN_RATE_LIMIT_MAX', '10'))   # max attempts per IP per window
+REGISTER_RATE_LIMIT_WINDOW = 3600
+REGISTER_RATE_LIMIT_MAX = int(os.getenv('REGISTER_RATE_LIMIT_MAX', '20'))
+API_RATE_LIMIT_WINDOW = 60
+API_RATE_LIMIT_MAX = int(os.getenv('API_RATE_LIMIT_MAX', '300'))
 
-def is_rate_limited(ip: str) -> bool:
-    """
-    Simple in-memory IP-based rate limiter for login attempts.
-    Returns True if the IP exceeded allowed login rate.
-    """
-    now = time.time()
-    attempts = login_attempts[ip]
+rate_limit_backend = create_backend(
+    RATE_LIMIT_BACKEND,
+    shm_path=RATE_LIMIT_SHM_PATH,
+    redis_url=RATE_LIMIT_REDIS_URL,
+)
+login_limiter = RateLimiter(rate_limit_backend, LOGIN_RATE_LIMIT_MAX, LOGIN_RATE_LIMIT_WINDOW, scope='login')
+register_limiter = RateLimiter(rate_limit_backend, REGISTER_RATE_LIMIT_MAX, REGISTER_RATE_LIMIT_WINDOW, scope='register')
+api_limiter = RateLimiter(rate_limit_backend, API_RATE_LIMIT_MAX, API_RATE_LIMIT_WINDOW, scope='api')
 
-    # keep only attempts within time window
-    attempts = [t for t in attempts if now - t < LOGIN_RATE_LIMIT_WINDOW]
-    attempts.append(now)
+# Account lockout: MAX_LOGIN_ATTEMPTS wrong passwords in a row lock the
+# account for LOGIN_LOCKOUT_MINUTES. Counting happens in the UPDATE itself,
+# so concurrent failures can't race past the limit.
+MAX_LOGIN_ATTEMPTS = int(os.getenv('MAX_LOGIN_ATTEMPTS', '5'))
+LOGIN_LOCKOUT_MINUTES = float(os.getenv('LOGIN_LOCKOUT_MINUTES', '15'))
 
-    login_attempts[ip] = attempts
+# Auth statements run on autocommit connections: one round trip each
+REGISTER_USER_SQL = """
+    INSERT INTO users (email, password_hash, role)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (email) DO NOTHING
+    RETURNING id, email, created_at
+"""
+LOGIN_LOOKUP_SQL = """
+    SELECT id, email, password_hash,
+           GREATEST(EXTRACT(EPOCH FROM locked_until - CURRENT_TIMESTAMP), 0) AS locked_for
+    FROM users
+    WHERE email = %s
+"""
+LOGIN_SUCCESS_SQL = """
+    UPDATE users
+    SET last_login = CURRENT_TIMESTAMP, failed_attempts = 0, locked_until = NULL
+    WHERE id = %s AND (locked_until IS NULL OR locked_until <= CURRENT_TIMESTAMP)
+    RETURNING id, email
+"""
+LOGIN_FAILURE_SQL = """
+    UPDATE users
+    SET failed_attempts = CASE WHEN failed_attempts + 1 >= %(max_attempts)s THEN 0
+                               ELSE failed_attempts + 1 END,
+        locked_until = CASE WHEN failed_attempts + 1 >= %(max_attempts)s
+                            THEN CURRENT_TIMESTAMP + %(lockout)s * INTERVAL '1 second'
+                            END
+    WHERE id = %(id)s AND (locked_until IS NULL OR locked_until <= CURRENT_TIMESTAMP)
+    RETURNING failed_attempts, locked_until IS NOT NULL AS locked
+"""
 
-    return len(attempts) > LOGIN_RATE_LIMIT_MAX
+def run_auth_statement(sql, params):
+    """Execute one auth statement on an autocommit connection; returns its row"""
+    with get_db_connection(autocommit=True) as conn:
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        try:
+            cursor.execute(sql, params)
+            return cursor.fetchone()
+        finally:
+            cursor.close()
+
+def account_locked(email, user_id, retry_after):
+    """423 for a locked account; Retry-After says when it unlocks"""
+    record_auth_event('login_locked', email, user_id)
+    response = jsonify({"error": "Too many failed login attempts. Please try again later."})
+    response.status_code = 423
+    response.headers['Retry-After'] = str(max(1, int(np.ceil(retry_after))))
+    return response
 
 @app.route("/api/register", methods=["POST"])
+@rate_limit(register_limiter)
 def register():
     """Handle user registration"""
     try:
@@ -132,76 +292,49 @@ def register():
         if len(password) < 8:
             return jsonify({"error": "Password must be at least 8 characters"}), 400
         
-        # Connect to database
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({"error": "Database connection failed"}), 500
-        
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        # Hash password (on the bcrypt worker pool) before borrowing a connection
+        password_hash = password_hasher.hash(password)
         
         try:
-            # Check if user already exists
-            cursor.execute(
-                "SELECT id FROM users WHERE email = %s",
-                (email,)
-            )
-            existing_user = cursor.fetchone()
-            
-            if existing_user:
-                return jsonify({
-                    "error": "An account with this email already exists"
-                }), 409
-            
-            # Hash password
-            password_hash = bcrypt.hashpw(
-                password.encode('utf-8'),
-                bcrypt.gensalt()
-            ).decode('utf-8')
-            
-            # Insert new user
-            cursor.execute(
-                """
-                INSERT INTO users (email, password_hash, role)
-                VALUES (%s, %s, %s)
-                RETURNING id, email, created_at
-                """,
-                (email, password_hash, 'user')
-            )
-            
-            new_user = cursor.fetchone()
-            conn.commit()
-            
-            return jsonify({
-                "message": "Registration successful",
-                "user": {
-                    "id": new_user['id'],
-                    "email": new_user['email'],
-                    "created_at": new_user['created_at'].isoformat()
-                }
-            }), 201
-            
+            # Existence check and insert in one statement
+            new_user = run_auth_statement(REGISTER_USER_SQL, (email, password_hash, 'user'))
         except psycopg2.IntegrityError:
-            conn.rollback()
-            return jsonify({
-                "error": "Email already registered"
-            }), 409
-            
-        except Exception as e:
-            conn.rollback()
+            new_user = None
+        except psycopg2.Error as e:
             print(f"Registration error: {e}")
             return jsonify({
                 "error": "Registration failed. Please try again."
             }), 500
+        
+        if not new_user:
+            return jsonify({
+                "error": "An account with this email already exists"
+            }), 409
+        
+        record_auth_event('register', email, new_user['id'])
+        
+        return jsonify({
+            "message": "Registration successful",
+            "user": {
+                "id": new_user['id'],
+                "email": new_user['email'],
+                "created_at": new_user['created_at'].isoformat()
+            }
+        }), 201
             
-        finally:
-            cursor.close()
-            conn.close()
+    except PoolError as e:
+        print(f"Database connection error: {e}")
+        return jsonify({"error": "Database connection failed"}), 500
+            
+    except HashingBusy:
+        raise
             
     except Exception as e:
         print(f"Request error: {e}")
         return jsonify({"error": "Invalid request"}), 400
 
 @app.route("/api/login", methods=["POST"])
+@rate_limit(login_limiter)
 def login():
     """Handle user login"""
     try:
@@ -213,93 +346,625 @@ def login():
         if not email or not password:
             return jsonify({"error": "Email and password are required"}), 400
         
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({"error": "Database connection failed"}), 500
+        # Get user and lockout state from database
+        user = run_auth_statement(LOGIN_LOOKUP_SQL, (email,))
         
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        if not user:
+            record_auth_event('login_failed', email)
+            return jsonify({"error": "Invalid email or password"}), 401
         
-        try:
-            # Get user from database
-            cursor.execute(
-                "SELECT id, email, password_hash FROM users WHERE email = %s",
-                (email,)
-            )
-            user = cursor.fetchone()
+        # Locked accounts are turned away without spending a bcrypt verify
+        if user['locked_for'] > 0:
+            return account_locked(email, user['id'], float(user['locked_for']))
+        
+        # Verify password (on the bcrypt worker pool, no connection held)
+        if password_hasher.verify(password, user['password_hash']):
+            # Update last login and clear the failure count
+            if run_auth_statement(LOGIN_SUCCESS_SQL, (user['id'],)) is None:
+                # Locked by a concurrent request since the lookup
+                return account_locked(email, user['id'], LOGIN_LOCKOUT_MINUTES * 60)
+            record_auth_event('login_success', email, user['id'])
             
-            if not user:
-                return jsonify({"error": "Invalid email or password"}), 401
+            return jsonify({
+                "message": "Login successful",
+                "user": {
+                    "id": user['id'],
+                    "email": user['email']
+                }
+            }), 200
+        
+        # Count the failure; reaching MAX_LOGIN_ATTEMPTS locks the account
+        failure = run_auth_statement(LOGIN_FAILURE_SQL, {
+            "id": user['id'],
+            "max_attempts": MAX_LOGIN_ATTEMPTS,
+            "lockout": LOGIN_LOCKOUT_MINUTES * 60,
+        })
+        record_auth_event('login_failed', email, user['id'])
+        if failure is None or failure['locked']:
+            return account_locked(email, user['id'], LOGIN_LOCKOUT_MINUTES * 60)
+        return jsonify({"error": "Invalid email or password"}), 401
             
-            # Verify password
-            if bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
-                # Update last login
-                cursor.execute(
-                    "UPDATE users SET last_login = CURRENT_TIMESTAMP WHERE id = %s",
-                    (user['id'],)
-                )
-                conn.commit()
-                
-                return jsonify({
-                    "message": "Login successful",
-                    "user": {
-                        "id": user['id'],
-                        "email": user['email']
-                    }
-                }), 200
-            else:
-                return jsonify({"error": "Invalid email or password"}), 401
-                
-        finally:
-            cursor.close()
-            conn.close()
+    except PoolError as e:
+        print(f"Database connection error: {e}")
+        return jsonify({"error": "Database connection failed"}), 500
+            
+    except HashingBusy:
+        raise
             
     except Exception as e:
         print(f"Login error: {e}")
         return jsonify({"error": "Login failed"}), 500
 
+# Health probing: dependencies are checked in the background every
+# HEALTH_CHECK_INTERVAL seconds and probes only read the cached results
+HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', '5'))   # seconds
+HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', '2'))     # seconds to wait for a pooled connection
+
+health_prober = HealthProber(HEALTH_CHECK_INTERVAL)
+
+def check_database():
+    with db_pool.connection(timeout=HEALTH_CHECK_TIMEOUT) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.close()
+
+health_prober.add_check('database', check_database)
+if RATE_LIMIT_BACKEND == 'redis':
+    health_prober.add_check('rate_limit', lambda: rate_limit_backend.client.ping())
+
+@app.route("/health/live")
+def health_live():
+    """Liveness probe: answers from memory"""
+    return jsonify(health_prober.live())
+
+@app.route("/health/ready")
+def health_ready():
+    """Readiness probe: cached dependency checks and their age"""
+    ready, report = health_prober.ready()
+    return jsonify(report), 200 if ready else 503
+
 @app.route("/health")
 def health():
     """Health check endpoint"""
-    try:
-        conn = get_db_connection()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.close()
-            conn.close()
-            db_status = "connected"
-        else:
-            db_status = "disconnected"
-    except:
-        db_status = "error"
+    ready, report = health_prober.ready()
+    db_status = {"ok": "connected", "failing": "disconnected"}.get(
+        report["checks"]["database"]["status"], "unknown"
+    )
     
     return jsonify({
         "status": "ok",
+        "ready": ready,
         "database": db_status,
+        "checks": {
+            name: "ok" if check["status"] == "ok" else "failed"
+            for name, check in report["checks"].items()
+        },
         "timestamp": datetime.utcnow().isoformat()
     })
 
+# Stock history cache configuration
+STOCK_CACHE_SIZE = int(os.getenv('STOCK_CACHE_SIZE', '512'))        # (ticker, period) entries
+STOCK_CACHE_TTL = float(os.getenv('STOCK_CACHE_TTL', '300'))        # seconds
+STOCK_DB_MAX_AGE_DAYS = int(os.getenv('STOCK_DB_MAX_AGE_DAYS', '4'))  # prices rows older than this are stale
+STOCK_FETCH_WORKERS = int(os.getenv('STOCK_FETCH_WORKERS', '8'))      # concurrent upstream fetches per batch
+STOCK_BATCH_MAX = 50                                                  # tickers per batch request
+PRICE_STORE_DIR = os.getenv('PRICE_STORE_DIR', 'data/price_store')    # memory-mapped price columns
+HISTORY_STREAM_PERIODS = tuple(os.getenv('HISTORY_STREAM_PERIODS', '5y,10y,max').split(','))  # streamed, not buffered
+RESPONSE_FORMATS = ('json', 'arrow', 'msgpack')                       # ?format= / Accept negotiation
+HISTORY_FORMATS = ('json', 'ndjson', 'arrow', 'msgpack')
+MAX_CHART_POINTS = 10000                                              # largest max_points a chart may ask for
+
+TICKER_REGEX = re.compile(r"^[A-Z][A-Z0-9.\-]{0,14}$")
+
+stock_cache = TTLCache(maxsize=STOCK_CACHE_SIZE, ttl=STOCK_CACHE_TTL)
+price_store = PriceStore(PRICE_STORE_DIR)
+stock_history = StockHistoryService(
+    db_pool,
+    stock_cache,
+    max_age_days=STOCK_DB_MAX_AGE_DAYS,
+    fetch_workers=STOCK_FETCH_WORKERS,
+    store=price_store,
+)
+
+def response_format(offered):
+    """Negotiated format name for this request, or None if not offered"""
+    return negotiate(request.args.get("format"), request.accept_mimetypes, offered)
+
+def format_error(offered):
+    return jsonify({"error": f"Invalid format. Use one of: {', '.join(offered)}"}), 400
+
+def parse_max_points(value):
+    """Validated chart point budget, or None"""
+    try:
+        max_points = int(value)
+    except (TypeError, ValueError):
+        return None
+    return max_points if 2 <= max_points <= MAX_CHART_POINTS else None
+
+def max_points_error():
+    return jsonify({"error": f"max_points must be an integer between 2 and {MAX_CHART_POINTS}"}), 400
+
+def binary_response(fmt, meta, key, columns):
+    """Arrow or MessagePack body for columns; `meta` carries the other payload fields"""
+    try:
+        body = encode(fmt, meta, key, columns)
+    except FormatUnavailable as e:
+        return jsonify({"error": str(e)}), 406
+    return Response(body, mimetype=MIMETYPES[fmt])
+
+@app.get("/api/stocks/")
+def stock_history_missing_ticker():
+    """Stock history requires a ticker in the path"""
+    return jsonify({"error": "Missing ticker"}), 400
+
+@app.post("/api/stocks/batch")
+@rate_limit(api_limiter)
+def get_stock_history_batch():
+    """
+    Historical OHLCV data for several tickers.
+    Tickers that fail are reported under "errors" instead of failing the batch.
+    Arrow / MessagePack responses hold one long table with a Symbol column.
+    "max_points" downsamples each ticker's rows for charting.
+    """
+    data = request.get_json(silent=True) or {}
+    tickers = data.get("tickers")
+    period = data.get("period") or "1y"
+    max_points = data.get("max_points")
+    fmt = response_format(RESPONSE_FORMATS)
+
+    if fmt is None:
+        return format_error(RESPONSE_FORMATS)
+    if max_points is not None:
+        max_points = parse_max_points(max_points)
+        if max_points is None:
+            return max_points_error()
+    if not isinstance(tickers, list) or not tickers:
+        return jsonify({"error": "tickers must be a non-empty list"}), 400
+    if len(tickers) > STOCK_BATCH_MAX:
+        return jsonify({"error": f"At most {STOCK_BATCH_MAX} tickers per request"}), 400
+    if period not in VALID_PERIODS:
+        return jsonify({"error": f"Invalid period. Use one of: {', '.join(VALID_PERIODS)}"}), 400
+
+    valid, errors = [], {}
+    for raw in tickers:
+        ticker = str(raw).strip().upper()
+        if TICKER_REGEX.match(ticker):
+            valid.append(ticker)
+        else:
+            errors[str(raw)[:20]] = "Invalid ticker"
+
+    loaded = None    # ticker -> (PriceSeries, rows before downsampling)
+    if max_points is not None:
+        loaded, failures = stock_history.downsampled_many(valid, period, max_points)
+    elif fmt in BINARY_FORMATS:
+        series, failures = stock_history.series_many(valid, period)
+        loaded = {ticker: (rows, len(rows)) for ticker, rows in series.items()}
+    else:
+        payloads, failures = stock_history.get_many(valid, period)
+    for ticker, e in failures.items():
+        if isinstance(e, StockNotFound):
+            errors[ticker] = f"No data found for ticker {ticker}"
+        elif isinstance(e, UpstreamError):
+            errors[ticker] = str(e)
+        else:
+            print(f"Stock history error ({ticker}): {e}")
+            errors[ticker] = "Failed to load stock data"
+
+    if fmt in BINARY_FORMATS:
+        metas = {t: history_meta(t, period, len(series), total) for t, (series, total) in loaded.items()}
+        return binary_response(fmt, {
+            "period": period,
+            "warnings": {t: m["warning"] for t, m in metas.items() if "warning" in m},
+            "downsampled_from": {t: m["downsampled_from"] for t, m in metas.items() if "downsampled_from" in m},
+            "errors": errors,
+        }, "stocks", stack("Symbol", {t: history_columns(series) for t, (series, _) in loaded.items()}))
+    if loaded is not None:
+        payloads = {t: build_payload(t, period, series.rows(), total) for t, (series, total) in loaded.items()}
+
+    return jsonify({
+        "period": period,
+        "stocks": payloads,
+        "errors": errors,
+    })
+
+@app.get("/api/stocks/<ticker>")
+@rate_limit(api_limiter)
+def get_stock_history(ticker):
+    """
+    Historical OHLCV data for one ticker.
+    Long periods (HISTORY_STREAM_PERIODS) and NDJSON requests (?format=ndjson
+    or Accept: application/x-ndjson) are streamed chunk by chunk; Arrow and
+    MessagePack are serialized from the price columns. ?max_points=N returns
+    at most N rows chosen by LTTB downsampling, for charts.
+    """
+    ticker = ticker.strip().upper()
+    period = request.args.get("period") or "1y"
+    max_points = request.args.get("max_points")
+    fmt = response_format(HISTORY_FORMATS)
+
+    if not TICKER_REGEX.match(ticker):
+        return jsonify({"error": "Invalid ticker"}), 400
+    if period not in VALID_PERIODS:
+        return jsonify({"error": f"Invalid period. Use one of: {', '.join(VALID_PERIODS)}"}), 400
+    if fmt is None:
+        return format_error(HISTORY_FORMATS)
+    if max_points is not None:
+        max_points = parse_max_points(max_points)
+        if max_points is None:
+            return max_points_error()
+
+    try:
+        if max_points is not None:
+            series, total = stock_history.downsampled(ticker, period, max_points)
+            return history_response(fmt, ticker, period, series, total)
+        if fmt in BINARY_FORMATS:
+            return history_response(fmt, ticker, period, stock_history.series(ticker, period))
+        if fmt == "ndjson":
+            return Response(stock_history.stream(ticker, period, ndjson=True), mimetype=MIMETYPES[fmt])
+        if period in HISTORY_STREAM_PERIODS:
+            return Response(stock_history.stream(ticker, period), mimetype=MIMETYPES[fmt])
+        return jsonify(stock_history.get(ticker, period))
+    except StockNotFound:
+        return jsonify({"error": f"No data found for ticker {ticker}"}), 404
+    except UpstreamError as e:
+        return jsonify({"error": str(e)}), e.status_code
+    except Exception as e:
+        print(f"Stock history error: {e}")
+        return jsonify({"error": "Failed to load stock data"}), 500
+
+def history_response(fmt, ticker, period, series, total=None):
+    """Response for history columns already in memory"""
+    if fmt in BINARY_FORMATS:
+        meta = history_meta(ticker, period, len(series), total)
+        return binary_response(fmt, meta, "historical_data", history_columns(series))
+    if fmt == "ndjson":
+        return Response(encode_ndjson(series_chunks(series)), mimetype=MIMETYPES[fmt])
+    return jsonify(build_payload(ticker, period, series.rows(), total))
+
+# Prediction model configuration
+MODEL_DIR = os.getenv('MODEL_DIR', 'data/models')                       # versioned per-symbol models
+MODEL_CACHE_SIZE = int(os.getenv('MODEL_CACHE_SIZE', '32'))            # models kept in memory per worker
+MODEL_MEMORY_MB = int(os.getenv('MODEL_MEMORY_MB', '64'))              # memory budget for loaded models
+MODEL_CHECK_INTERVAL = float(os.getenv('MODEL_CHECK_INTERVAL', '5'))   # seconds between new-version checks
+MAX_PREDICTION_DAYS = 30
+PREDICT_BATCH_MAX = 50                                                  # tickers per batch prediction
+
+FORECAST_CACHE_SIZE = int(os.getenv('FORECAST_CACHE_SIZE', '1024'))   # symbols of stored forecasts kept in memory
+FORECAST_CACHE_TTL = float(os.getenv('FORECAST_CACHE_TTL', '60'))     # seconds before re-reading predictions
+FORECAST_MAX_AGE_HOURS = float(os.getenv('FORECAST_MAX_AGE_HOURS', '36'))   # older stored forecasts are recomputed
+CONFIDENCE_PATHS = int(os.getenv('CONFIDENCE_PATHS', '2000'))          # simulated paths per on-demand band
+CONFIDENCE_MIN_PATHS = int(os.getenv('CONFIDENCE_MIN_PATHS', '200'))   # floor when the budget is tight
+CONFIDENCE_BUDGET_MS = float(os.getenv('CONFIDENCE_BUDGET_MS', '50'))  # target simulation time per request
+
+model_registry = ModelRegistry(
+    MODEL_DIR,
+    max_models=MODEL_CACHE_SIZE,
+    memory_budget=MODEL_MEMORY_MB * 1024 * 1024,
+    check_interval=MODEL_CHECK_INTERVAL,
+)
+forecast_cache = TTLCache(maxsize=FORECAST_CACHE_SIZE, ttl=FORECAST_CACHE_TTL)
+forecast_service = ForecastService(db_pool, forecast_cache, max_age=FORECAST_MAX_AGE_HOURS * 3600)
+confidence_cache = TTLCache(maxsize=FORECAST_CACHE_SIZE, ttl=FORECAST_CACHE_TTL)
+path_budget = PathBudget(CONFIDENCE_PATHS, CONFIDENCE_MIN_PATHS, CONFIDENCE_BUDGET_MS)
+
+def load_model(ticker):
+    """(predictor, metadata, recent closes) for ticker, or (None, None, None)"""
+    try:
+        predictor, model_meta = model_registry.get(ticker)
+    except Exception as e:
+        print(f"Model load error for {ticker}: {e}")
+        return None, None, None
+    if predictor is None:
+        return None, None, None
+    # Forecast from the freshest stored closes, or the model's own history
+    series = price_store.series(ticker)
+    closes = series.close if series is not None and len(series) else predictor.history
+    return predictor, model_meta, closes
+
+def linear_projection(ticker, days):
+    """Fallback for tickers without a trained model"""
+    # Anchor the projection on the latest stored close when we have one
+    start_price = price_store.latest_close(ticker) or 420.0
+    return [start_price + i * 1.8 for i in range(days)]
+
+def forecast_entry(prices, dates=None, model=None, generated_at=None, source="live", bands=None):
+    """
+    One ticker's forecast as columns plus where it came from; `bands` holds
+    optional "lower", "upper" and "confidence" columns (and "paths")
+    """
+    now = datetime.utcnow()
+    if dates is None:
+        dates = [(now.date() + timedelta(days=i+1)).isoformat() for i in range(len(prices))]
+    return {
+        "prices": prices,
+        "dates": dates,
+        "model": model,
+        "generated_at": generated_at or now.isoformat() + "Z",
+        "source": source,
+        "bands": bands,
+    }
+
+def prediction_meta(ticker, entry):
+    """Every prediction payload field except the rows"""
+    meta = {
+        "ticker": ticker,
+        "last_updated": datetime.utcnow().isoformat() + "Z",
+        "generated_at": entry["generated_at"],
+        "source": entry["source"],
+    }
+    if entry["model"] is not None:
+        meta["model"] = entry["model"]
+    if "downsampled_from" in entry:
+        meta["downsampled_from"] = entry["downsampled_from"]
+    if entry["bands"] is not None:
+        meta["bands"] = {"interval": CONFIDENCE_INTERVAL, "paths": entry["bands"].get("paths")}
+    return meta
+
+def prediction_payload(ticker, entry):
+    payload = prediction_meta(ticker, entry)
+    payload["predictions"] = [
+        {"date": date, "price": round(float(price), 2)}
+        for date, price in zip(entry["dates"], entry["prices"])
+    ]
+    bands = entry["bands"]
+    if bands is not None:
+        for row, lower, upper, confidence in zip(
+                payload["predictions"], bands["lower"], bands["upper"], bands["confidence"]):
+            row["lower"] = round(float(lower), 2)
+            row["upper"] = round(float(upper), 2)
+            row["confidence"] = round(float(confidence), 4)
+    return payload
+
+def downsample_entry(entry, max_points):
+    """The forecast reduced to at most max_points points with LTTB"""
+    if max_points is None or len(entry["prices"]) <= max_points:
+        return entry
+    keep = lttb(np.arange(len(entry["prices"])), entry["prices"], max_points)
+    bands = entry["bands"]
+    if bands is not None:
+        bands = dict(bands, **{
+            name: [bands[name][i] for i in keep] for name in ("lower", "upper", "confidence")
+        })
+    return dict(
+        entry,
+        prices=[entry["prices"][i] for i in keep],
+        dates=[entry["dates"][i] for i in keep],
+        bands=bands,
+        downsampled_from=len(entry["prices"]),
+    )
+
+def prediction_columns(entry):
+    columns = {
+        "date": np.array(entry["dates"], dtype='datetime64[D]'),
+        "price": np.asarray(entry["prices"], dtype=float),
+    }
+    if entry["bands"] is not None:
+        for name in ("lower", "upper", "confidence"):
+            columns[name] = np.asarray(entry["bands"][name], dtype=float)
+    return columns
+
+def confidence_entry(ticker, days, predictor, model_meta, closes):
+    """Live forecast with Monte Carlo bands, cached per model version and horizon"""
+    key = (ticker, model_meta["version"], days)
+    bands = confidence_cache.get(key)
+    if bands is None:
+        bands = path_budget.simulate(predictor, closes, days)
+        confidence_cache.set(key, bands)
+    model = {"version": model_meta["version"], "trained_at": model_meta["trained_at"]}
+    return forecast_entry(bands["predicted"], model=model, bands=bands)
+
+def forecast_tickers(requested, confidence=False):
+    """
+    Forecast entries for {ticker: days}: stored forecasts first, then one
+    batched inference pass for tickers with a model, then the linear fallback.
+    With `confidence`, model forecasts carry Monte Carlo bands (stored ones
+    without bands are simulated again); the linear fallback has none.
+    """
+    payloads = {}
+    for ticker, entry in forecast_service.get_many(requested).items():
+        if confidence and entry["bands"] is None:
+            continue
+        payloads[ticker] = forecast_entry(
+            entry["prices"], entry["dates"],
+            model={"version": entry["model_version"], "trained_at": entry["model_trained_at"]},
+            generated_at=entry["generated_at"],
+            source="precomputed",
+            bands=entry["bands"] if confidence else None,
+        )
+
+    batch = []
+    for ticker, days in requested.items():
+        if ticker in payloads:
+            continue
+        predictor, model_meta, closes = load_model(ticker)
+        if predictor is None:
+            payloads[ticker] = forecast_entry(linear_projection(ticker, days), source="fallback")
+        elif confidence:
+            payloads[ticker] = confidence_entry(ticker, days, predictor, model_meta, closes)
+        else:
+            batch.append((ticker, days, predictor, model_meta, closes))
+
+    if batch:
+        forecasts = forecast_many(
+            [b[2] for b in batch], [b[4] for b in batch], max(b[1] for b in batch),
+        )
+        for (ticker, days, _, model_meta, _), prices in zip(batch, forecasts):
+            model = {"version": model_meta["version"], "trained_at": model_meta["trained_at"]}
+            payloads[ticker] = forecast_entry(prices[:days], model=model)
+
+    return {ticker: payloads[ticker] for ticker in requested}
+
+def parse_days(value):
+    """Validated forecast horizon, or None"""
+    try:
+        days = int(value)
+    except (TypeError, ValueError):
+        return None
+    return days if 1 <= days <= MAX_PREDICTION_DAYS else None
+
 @app.get("/predict")
+@rate_limit(api_limiter)
 def predict():
-    """Existing prediction endpoint"""
+    """
+    Price predictions: the stored forecast when one covers `days`, otherwise
+    the symbol's trained model, otherwise a linear projection.
+    ?max_points=N downsamples the path for charting; ?confidence=true adds
+    Monte Carlo bands (lower, upper, confidence) to each day.
+    """
     ticker = (request.args.get("ticker") or "").upper()
-    days = int(request.args.get("days") or 7)
+    max_points = request.args.get("max_points")
+    confidence = (request.args.get("confidence") or "").lower() in ("1", "true", "yes")
+    fmt = response_format(RESPONSE_FORMATS)
+    if fmt is None:
+        return format_error(RESPONSE_FORMATS)
+    if max_points is not None:
+        max_points = parse_max_points(max_points)
+        if max_points is None:
+            return max_points_error()
     if not ticker:
         return jsonify(error="Missing ticker"), 400
+    if not TICKER_REGEX.match(ticker):
+        return jsonify(error="Invalid ticker"), 400
+    days = parse_days(request.args.get("days") or 7)
+    if days is None:
+        return jsonify(error=f"days must be an integer between 1 and {MAX_PREDICTION_DAYS}"), 400
 
-    start_price = 420.0
-    preds = []
-    today = datetime.utcnow().date()
-    for i in range(days):
-        preds.append({
-            "date": (today + timedelta(days=i+1)).isoformat(),
-            "price": round(start_price + i * 1.8, 2)
-        })
+    entry = downsample_entry(forecast_tickers({ticker: days}, confidence)[ticker], max_points)
+    if fmt in BINARY_FORMATS:
+        return binary_response(fmt, prediction_meta(ticker, entry), "predictions", prediction_columns(entry))
+    return jsonify(prediction_payload(ticker, entry))
+
+@app.post("/predict/batch")
+@rate_limit(api_limiter)
+def predict_batch():
+    """
+    Forecasts for many tickers in one response. Stored forecasts are read in
+    one query; the rest are computed together as one vectorized batch.
+    Body: {"tickers": [...], "days": 7, "horizons": {"LMT": 30}, "max_points": 10}
+    """
+    data = request.get_json(silent=True) or {}
+    tickers = data.get("tickers")
+    horizons = data.get("horizons") or {}
+    max_points = data.get("max_points")
+    fmt = response_format(RESPONSE_FORMATS)
+
+    if fmt is None:
+        return format_error(RESPONSE_FORMATS)
+    if max_points is not None:
+        max_points = parse_max_points(max_points)
+        if max_points is None:
+            return max_points_error()
+    if not isinstance(tickers, list) or not tickers:
+        return jsonify({"error": "tickers must be a non-empty list"}), 400
+    if len(tickers) > PREDICT_BATCH_MAX:
+        return jsonify({"error": f"At most {PREDICT_BATCH_MAX} tickers per request"}), 400
+    if not isinstance(horizons, dict):
+        return jsonify({"error": "horizons must be an object"}), 400
+    default_days = parse_days(data.get("days", 7))
+    if default_days is None:
+        return jsonify({"error": f"days must be an integer between 1 and {MAX_PREDICTION_DAYS}"}), 400
+
+    requested, errors = {}, {}
+    for raw in tickers:
+        ticker = str(raw).strip().upper()
+        if not TICKER_REGEX.match(ticker):
+            errors[str(raw)[:20]] = "Invalid ticker"
+            continue
+        days = parse_days(horizons.get(ticker, horizons.get(raw, default_days)))
+        if days is None:
+            errors[ticker] = f"days must be an integer between 1 and {MAX_PREDICTION_DAYS}"
+            continue
+        requested[ticker] = days
+
+    entries = forecast_tickers(requested) if requested else {}
+    entries = {ticker: downsample_entry(entry, max_points) for ticker, entry in entries.items()}
+
+    if fmt in BINARY_FORMATS:
+        return binary_response(fmt, {
+            "models": {ticker: prediction_meta(ticker, entry) for ticker, entry in entries.items()},
+            "errors": errors,
+        }, "predictions", stack("ticker", {t: prediction_columns(e) for t, e in entries.items()}))
 
     return jsonify({
-        "ticker": ticker,
-        "last_updated": datetime.utcnow().isoformat() + "Z",
-        "predictions": preds
+        "predictions": {ticker: prediction_payload(ticker, entry) for ticker, entry in entries.items()},
+        "errors": errors,
+    })
+
+def collect_component_metrics():
+    """Counters the pool, caches and hashing pool already keep, as samples"""
+    pool = db_pool.stats()
+    for state in ('idle', 'in_use', 'waiting'):
+        yield 'db_pool_connections', (('state', state),), pool[state]
+    yield 'db_pool_timeouts_total', (), pool['timeouts']
+    yield 'bcrypt_outstanding', (), password_hasher.stats()['outstanding']
+
+    history = stock_history.stats()
+    forecasts = forecast_service.stats()
+    models = model_registry.stats()
+    confidence = confidence_cache.stats()
+    for cache, hits, misses in (
+        ('stock_history', history['l1_hits'], history['l1_misses']),
+        ('forecasts', forecasts['cache_hits'], forecasts['cache_misses']),
+        ('confidence', confidence['hits'], confidence['misses']),
+        ('models', models['hits'], models['misses']),
+    ):
+        yield 'cache_hits_total', (('cache', cache),), hits
+        yield 'cache_misses_total', (('cache', cache),), misses
+
+metrics.define('db_pool_connections', GAUGE, 'Pooled database connections by state')
+metrics.define('db_pool_timeouts_total', COUNTER, 'Checkouts that timed out waiting for a connection')
+metrics.define('bcrypt_outstanding', GAUGE, 'bcrypt jobs queued or running')
+metrics.define('cache_hits_total', COUNTER, 'Cache lookups that hit, by cache')
+metrics.define('cache_misses_total', COUNTER, 'Cache lookups that missed, by cache')
+metrics.ratio('cache_hit_ratio', 'cache_hits_total', 'cache_misses_total', 'Share of cache lookups that hit, by cache')
+metrics.collect(collect_component_metrics)
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape endpoint (summed over every worker with METRICS_DIR)"""
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+def admin_authorized():
+    """Admin endpoints need ADMIN_TOKEN in the X-Admin-Token header"""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+@app.get("/admin/slow-queries")
+def slow_queries():
+    """Statement timings by fingerprint and the captured slow-query plans"""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    return jsonify({
+        **slow_query_log.stats(),
+        "statements": slow_query_log.statements(limit),
+        "slow_queries": slow_query_log.captures(limit),
+    })
+
+@app.get("/admin/stats")
+def component_stats():
+    """Internal counters of the pool, queues, caches and background workers"""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not admin_authorized():
+        return jsonify({"error": "Forbidden"}), 403
+
+    return jsonify({
+        "pool": db_pool.stats(),
+        "audit": audit_writer.stats(),
+        "bcrypt": password_hasher.stats(),
+        "stock_cache": stock_history.stats(),
+        "models": model_registry.stats(),
+        "forecasts": forecast_service.stats(),
+        "confidence": path_budget.stats(),
+        "slow_queries": slow_query_log.stats(),
     })
 
 if __name__ == "__main__":
@@ -0,0 +1,39 @@
+"""
+gunicorn settings for production serving.
+
+    gunicorn                        # reads ./gunicorn.conf.py
+    gunicorn -c gunicorn.conf.py
+
+The app is imported once in the master, warmed, and then forked into the
+workers, which share the warmed memory copy-on-write (see src/server.py).
+WEB_WORKERS, WEB_THREADS, WEB_BIND, WEB_TIMEOUT and WEB_MAX_REQUESTS
+override the defaults below. `python app.py` still runs the development
+server.
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from src import server
+
+wsgi_app = 'app:app'
+preload_app = True
+
+bind = os.getenv('WEB_BIND', f"{os.getenv('HOST', '127.0.0.1')}:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv('WEB_WORKERS') or server.default_workers())
+worker_class = 'gthread'
+threads = int(os.getenv('WEB_THREADS', '4'))
+timeout = int(os.getenv('WEB_TIMEOUT', '30'))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.getenv('WEB_MAX_REQUESTS', '0'))
+max_requests_jitter = max_requests // 10
+
+server.configure_environment(workers)
+
+on_starting = server.on_starting
+when_ready = server.when_ready
+post_fork = server.post_fork
+post_worker_init = server.post_worker_init
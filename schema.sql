@@ -116,3 +116,44 @@ CREATE INDEX idx_auth_audit_email ON auth_audit(email);
 CREATE INDEX idx_auth_audit_action ON auth_audit(action);
 
 
+
+-- Sprint 4: Indicator materialization
+
+-- One value per symbol, indicator and day so runs can upsert
+CREATE UNIQUE INDEX IF NOT EXISTS idx_indicators_symbol_type_date
+    ON indicators(symbol, indicator_type, calculation_date);
+
+-- EMA/RSI state at the last materialized day, carried into the next run
+CREATE TABLE IF NOT EXISTS indicator_state (
+    symbol VARCHAR(10) PRIMARY KEY REFERENCES stocks(symbol),
+    last_date DATE NOT NULL,
+    state JSONB NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Sprint 4: Precomputed forecasts (regenerated after each prices load)
+CREATE TABLE IF NOT EXISTS predictions (
+    symbol VARCHAR(10) REFERENCES stocks(symbol),
+    horizon INTEGER NOT NULL,             -- days ahead, 1..30
+    target_date DATE NOT NULL,
+    predicted_price DECIMAL(10,2) NOT NULL,
+    model_version INTEGER,
+    model_trained_at TIMESTAMP,
+    as_of DATE,                           -- last price date the forecast starts from
+    generated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (symbol, horizon)
+);
+
+-- Sprint 4: Monte Carlo confidence bands stored with each forecast
+ALTER TABLE predictions ADD COLUMN IF NOT EXISTS lower_price DECIMAL(10,2);
+ALTER TABLE predictions ADD COLUMN IF NOT EXISTS upper_price DECIMAL(10,2);
+ALTER TABLE predictions ADD COLUMN IF NOT EXISTS confidence REAL;   -- share of paths near the prediction
+
+-- Sprint 4: Bulk load checkpoints (input rows of a source already committed)
+CREATE TABLE IF NOT EXISTS ingest_checkpoints (
+    source TEXT NOT NULL,                 -- file path, size and mtime
+    symbol VARCHAR(10) NOT NULL,
+    rows_done BIGINT NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (source, symbol)
+);
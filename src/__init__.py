@@ -0,0 +1,3 @@
+"""
+Backend services for the Stock Market Predictor.
+"""
@@ -0,0 +1,218 @@
+"""
+Asynchronous, batched writer for the auth_audit table.
+
+Requests only enqueue an event; a background thread collects events and
+writes them with one multi-row INSERT per batch. A batch is flushed when it
+reaches `batch_size` events or when `flush_interval` seconds have passed since
+its first event, whichever comes first. Anything still queued is flushed when
+the process exits.
+
+The queue is bounded. When it is full, the `overflow` policy decides what
+happens to new events:
+- 'drop':  discard the event immediately (requests never wait)
+- 'block': wait up to `block_timeout` seconds for room, then discard
+
+created_at is the time the event was enqueued, not the time its batch is
+written. It is sent as an aware UTC timestamp (timestamptz), which
+PostgreSQL converts to the session time zone when storing it in the
+TIMESTAMP column, so the values are in the same zone as the column's
+CURRENT_TIMESTAMP default.
+"""
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+
+from psycopg2.extras import execute_values
+
+INSERT_AUDIT_SQL = """
+    INSERT INTO auth_audit (user_id, email, action, ip_address, created_at)
+    VALUES %s
+"""
+
+_STOP = object()
+
+
+class AuditWriter:
+    """Background writer that batches auth_audit inserts"""
+
+    def __init__(self, pool, batch_size=100, flush_interval=1.0, max_queue=10000,
+                 overflow='drop', block_timeout=0.05):
+        if overflow not in ('drop', 'block'):
+            raise ValueError("overflow must be 'drop' or 'block'")
+
+        self.pool = pool
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()    # close() fallback when the queue has no room for _STOP
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        self._enqueued = 0
+        self._dropped = 0
+        self._written = 0
+        self._failed = 0
+        self._batches = 0
+        self._last_batch_size = 0
+        self._last_flush_ms = 0.0
+
+    def record(self, action, email, user_id=None, ip_address=None):
+        """
+        Queue one audit event without touching the database.
+        Returns False if the event was dropped because the queue is full.
+        """
+        self._ensure_started()
+        event = (user_id, email, action, ip_address, datetime.now(timezone.utc))
+
+        try:
+            if self.overflow == 'block':
+                self._queue.put(event, timeout=self.block_timeout)
+            else:
+                self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+
+        with self._lock:
+            self._enqueued += 1
+        return True
+
+    def close(self, timeout=10.0):
+        """
+        Stop the worker after flushing everything already queued. Waits at
+        most `timeout` seconds, so a full queue or a stuck database cannot
+        hang interpreter exit; whatever is unwritten by then is lost.
+        """
+        thread = self._thread
+        if thread is None or not thread.is_alive() or self._pid != os.getpid():
+            # No worker in this process: drain synchronously
+            self._write(self._drain())
+            return
+
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            self._stop.set()
+        thread.join(max(deadline - time.monotonic(), 0))
+        if thread.is_alive():
+            print(f"Auth audit writer did not stop within {timeout}s; "
+                  f"{self._queue.qsize()} events not written")
+
+    def reset(self):
+        """
+        Forget the parent's worker and queued events in a forked child (they
+        belong to the parent); the child's worker starts on its first record().
+        """
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def stats(self):
+        """Queue depth and throughput counters for monitoring"""
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue": self.max_queue,
+                "batch_size": self.batch_size,
+                "flush_interval": self.flush_interval,
+                "overflow": self.overflow,
+                "enqueued": self._enqueued,
+                "dropped": self._dropped,
+                "written": self._written,
+                "failed": self._failed,
+                "batches": self._batches,
+                "last_batch_size": self._last_batch_size,
+                "last_flush_ms": round(self._last_flush_ms, 3),
+            }
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self):
+        """Start the worker lazily (and again in a forked child process)"""
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._thread = threading.Thread(
+                target=self._run, name="auth-audit-writer", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        batch = []
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                event = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                event = None
+
+            if event is _STOP or self._stop.is_set():
+                if event is not None and event is not _STOP:
+                    batch.append(event)
+                batch.extend(self._drain())
+                self._write(batch)
+                return
+
+            if event is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(event)
+
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                batch = []
+                deadline = None
+
+    def _drain(self):
+        events = []
+        while True:
+            try:
+                event = self._queue.get_nowait()
+            except queue.Empty:
+                return events
+            if event is not _STOP:
+                events.append(event)
+
+    def _write(self, events):
+        """Insert events in chunks of batch_size; failures are counted, not raised"""
+        for start in range(0, len(events), self.batch_size):
+            chunk = events[start:start + self.batch_size]
+            started = time.perf_counter()
+            try:
+                with self.pool.connection() as conn:
+                    cursor = conn.cursor()
+                    try:
+                        execute_values(cursor, INSERT_AUDIT_SQL, chunk, page_size=len(chunk))
+                        conn.commit()
+                    finally:
+                        cursor.close()
+            except Exception as e:
+                print(f"Auth audit error: {e}")
+                with self._lock:
+                    self._failed += len(chunk)
+                continue
+
+            with self._lock:
+                self._written += len(chunk)
+                self._batches += 1
+                self._last_batch_size = len(chunk)
+                self._last_flush_ms = (time.perf_counter() - started) * 1000
@@ -0,0 +1,450 @@
+"""
+Load and latency benchmark for the Flask API.
+
+By default the benchmark recreates a scratch PostgreSQL database from
+schema.sql and seed.sql and loads about five years of synthetic daily
+prices (seeded by --seed) for every ticker. It builds a price store from
+them, trains and publishes a model per ticker, and stores their forecasts
+under data/benchmarks/<database>/. History and predictions are therefore
+served locally instead of from Yahoo Finance, and runs can be reproduced.
+It boots app.py against all of that with `flask run` (rate limits raised so
+they do not dominate the numbers), and then drives a weighted mix of routes
+from a fixed number of concurrent clients. Each client
+keeps one HTTP connection open and sends its next request as soon as the
+previous one finishes (a closed loop), so throughput and latency are both
+measured at the given concurrency.
+
+Requests made during the warm-up are not counted. Per route, and for the
+whole run, the report has request and error counts, status codes,
+throughput and p50/p95/p99 latency. It is written as JSON (by default to
+data/benchmarks/<commit>.json) so runs can be compared across commits; with
+--baseline the run is compared against an earlier report and the command
+exits with status 1 if any route got slower or lost throughput beyond
+--tolerance.
+
+Usage:
+    python -m src.benchmark                                # boot app.py, 30 s, 16 clients
+    python -m src.benchmark --concurrency 64 --duration 60 --mix predict=5,history=3,health=1
+    python -m src.benchmark --url http://127.0.0.1:5000 --no-setup   # already running server
+    python -m src.benchmark --baseline data/benchmarks/abc123.json
+    python -m src.benchmark --results new.json --baseline old.json   # compare only
+
+Routes in --mix: login, register, predict, predict_batch, history,
+history_batch and health.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shlex
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+DEFAULT_MIX = {'login': 2, 'register': 1, 'predict': 4, 'history': 4, 'health': 1}
+DEFAULT_TICKERS = ['LMT', 'RTX', 'BA', 'NOC', 'GD']
+BENCH_DATABASE = 'stock_predictor_bench'
+BENCH_PASSWORD = 'Bench-Passw0rd'
+PERCENTILES = (50, 95, 99)
+HISTORY_DAYS = 1900           # calendar days of synthetic prices, enough for period=5y
+TRAINING_EPOCHS = 5
+READY_TIMEOUT = 30.0          # seconds to wait for a booted server's /health
+
+# Environment for a booted server: limits high enough that the benchmark
+# measures the endpoints rather than 429 responses
+SERVER_ENV = {
+    'FLASK_DEBUG': '0',
+    'LOGIN_RATE_LIMIT_MAX': '1000000',
+    'REGISTER_RATE_LIMIT_MAX': '1000000',
+    'API_RATE_LIMIT_MAX': '1000000',
+}
+
+
+# ----------------------------------------------------------------------
+# Routes
+# ----------------------------------------------------------------------
+
+def _login(rng, tickers):
+    return 'POST', '/api/login', {'email': 'bench-login@example.com', 'password': BENCH_PASSWORD}
+
+
+def _register(rng, tickers):
+    return 'POST', '/api/register', {'email': f'bench-{uuid.uuid4().hex}@example.com', 'password': BENCH_PASSWORD}
+
+
+def _predict(rng, tickers):
+    return 'GET', f'/predict?ticker={rng.choice(tickers)}&days={rng.choice((7, 30))}', None
+
+
+def _predict_batch(rng, tickers):
+    return 'POST', '/predict/batch', {'tickers': tickers, 'days': 7}
+
+
+def _history(rng, tickers):
+    return 'GET', f'/api/stocks/{rng.choice(tickers)}?period={rng.choice(("1mo", "1y", "5y"))}', None
+
+
+def _history_batch(rng, tickers):
+    return 'POST', '/api/stocks/batch', {'tickers': tickers, 'period': '1y'}
+
+
+def _health(rng, tickers):
+    return 'GET', '/health', None
+
+
+ROUTES = {
+    'login': _login,
+    'register': _register,
+    'predict': _predict,
+    'predict_batch': _predict_batch,
+    'history': _history,
+    'history_batch': _history_batch,
+    'health': _health,
+}
+
+
+def parse_mix(text):
+    """'predict=4,health=1' -> {'predict': 4.0, 'health': 1.0}"""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(','))):
+        name, _, weight = part.partition('=')
+        if name not in ROUTES:
+            raise ValueError(f"Unknown route {name!r}; choose from {', '.join(ROUTES)}")
+        mix[name] = float(weight or 1)
+        if mix[name] < 0:
+            raise ValueError(f"Weight for {name} must not be negative")
+    if not any(mix.values()):
+        raise ValueError("The mix needs at least one route with a positive weight")
+    return mix
+
+
+# ----------------------------------------------------------------------
+# Load generation
+# ----------------------------------------------------------------------
+
+class HttpSender:
+    """send(method, path, body) -> status over one keep-alive connection per thread"""
+
+    def __init__(self, url, timeout=30.0):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def __call__(self, method, path, body=None):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            raise
+
+
+def run_load(send, mix, concurrency=16, duration=30.0, warmup=5.0, tickers=DEFAULT_TICKERS, seed=0):
+    """
+    Drive send() from `concurrency` threads for warmup + duration seconds.
+
+    Returns {route: [(latency_seconds, status), ...]} for requests that
+    started after the warm-up, and the wall time from the end of the
+    warm-up until the last of those requests finished. A status of 0
+    means the request failed without a response.
+    """
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    measure_from = time.perf_counter() + warmup
+    stop_at = measure_from + duration
+
+    def client(index):
+        rng = random.Random(seed + index)
+        local = defaultdict(list)
+        while True:
+            began = time.perf_counter()
+            if began >= stop_at:
+                break
+            name = rng.choices(names, weights)[0]
+            method, path, body = ROUTES[name](rng, tickers)
+            try:
+                status = send(method, path, body)
+            except Exception:
+                status = 0
+            if began >= measure_from:
+                local[name].append((time.perf_counter() - began, status))
+        with lock:
+            for name, rows in local.items():
+                samples[name].extend(rows)
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return dict(samples), time.perf_counter() - measure_from
+
+
+def summarize(samples, elapsed):
+    """Throughput, status counts and latency percentiles (ms) for one route"""
+    latencies = np.array([s[0] for s in samples], dtype=float) * 1000
+    statuses = Counter(s[1] for s in samples)
+    summary = {
+        'requests': len(samples),
+        'errors': sum(n for status, n in statuses.items() if not 200 <= status < 400),
+        'status': {str(status): n for status, n in sorted(statuses.items())},
+        'throughput': round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    if len(samples):
+        for p, value in zip(PERCENTILES, np.percentile(latencies, PERCENTILES)):
+            summary[f'p{p}_ms'] = round(float(value), 3)
+        summary['mean_ms'] = round(float(latencies.mean()), 3)
+        summary['max_ms'] = round(float(latencies.max()), 3)
+    return summary
+
+
+def build_report(samples, elapsed, settings):
+    every = [row for rows in samples.values() for row in rows]
+    return {
+        **settings,
+        'commit': current_commit(),
+        'finished_at': datetime.utcnow().isoformat(),
+        'python': sys.version.split()[0],
+        'total': summarize(every, elapsed),
+        'routes': {name: summarize(rows, elapsed) for name, rows in sorted(samples.items())},
+    }
+
+
+def compare(baseline, current, tolerance=0.15):
+    """Regressions of current against baseline, as human-readable lines"""
+    regressions = []
+    for name, now in current['routes'].items():
+        before = baseline.get('routes', {}).get(name)
+        if not before or not before.get('requests') or not now.get('requests'):
+            continue
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if now[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{name} {key}: {before[key]:.1f} -> {now[key]:.1f}")
+        if now['throughput'] < before['throughput'] * (1 - tolerance):
+            regressions.append(f"{name} throughput: {before['throughput']:.1f} -> {now['throughput']:.1f} req/s")
+    return regressions
+
+
+# ----------------------------------------------------------------------
+# Database and server
+# ----------------------------------------------------------------------
+
+def setup_database(config, schema='schema.sql', seed='seed.sql'):
+    """Recreate config['database'] and load the schema and seed data into it"""
+    import psycopg2
+
+    admin = psycopg2.connect(**{**config, 'database': 'postgres'})
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cursor:
+            cursor.execute(f'DROP DATABASE IF EXISTS "{config["database"]}"')
+            cursor.execute(f'CREATE DATABASE "{config["database"]}"')
+    finally:
+        admin.close()
+
+    conn = psycopg2.connect(**config)
+    try:
+        for path in (schema, seed):
+            with open(path) as f, conn.cursor() as cursor:
+                try:
+                    cursor.execute(f.read())
+                    conn.commit()
+                except psycopg2.Error as e:
+                    conn.rollback()
+                    print(f"Loading {path} error: {e}")
+    finally:
+        conn.close()
+
+
+def synthetic_prices(symbol, seed=0, days=HISTORY_DAYS, end=None):
+    """Deterministic daily OHLCV random walk for symbol, ending today"""
+    dates = pd.bdate_range(end=end or date.today(), periods=days * 5 // 7, name='Date')
+    rng = np.random.default_rng([seed, *symbol.encode()])
+    n = len(dates)
+    close = np.maximum(5.0, rng.uniform(80, 500) + np.cumsum(rng.normal(0.05, 2.5, n)))
+    return pd.DataFrame({
+        'Open': close - rng.uniform(-2, 2, n),
+        'High': close + rng.uniform(0, 4, n),
+        'Low': close - rng.uniform(0, 4, n),
+        'Close': close,
+        'Volume': rng.integers(800_000, 2_000_000, n),
+    }, index=dates)
+
+
+def prepare_data(config, tickers, directory, seed=0):
+    """
+    Load synthetic history for tickers into the database, build a price
+    store and publish models and forecasts for them under `directory`.
+    Returns the environment settings that point app.py at them.
+    """
+    from src.db import ConnectionPool
+    from src.ml.forecasts import generate_forecasts
+    from src.ml.registry import ModelRegistry
+    from src.ml.training import train_many
+    from src.stocks.ingest import ingest_frames
+    from src.stocks.store import PriceStore
+
+    store_dir = os.path.join(directory, 'price_store')
+    model_dir = os.path.join(directory, 'models')
+    shutil.rmtree(directory, ignore_errors=True)
+
+    pool = ConnectionPool(config, minconn=0, maxconn=max(1, len(tickers)))
+    try:
+        ingest_frames(pool, {t: synthetic_prices(t, seed) for t in tickers}, workers=len(tickers))
+        store = PriceStore(store_dir)
+        store.refresh(pool, tickers)
+        train_many(store, model_dir, tickers, epochs=TRAINING_EPOCHS)
+        generate_forecasts(pool, ModelRegistry(model_dir), store, tickers)
+    finally:
+        pool.close_all()
+    return {'PRICE_STORE_DIR': store_dir, 'MODEL_DIR': model_dir}
+
+
+def start_server(url, database, command=None, env=None):
+    """Boot app.py (or `command`) for url and wait until /health answers"""
+    parts = urlsplit(url)
+    if command is None:
+        command = [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--no-reload',
+                   '--host', parts.hostname, '--port', str(parts.port or 80)]
+    else:
+        command = shlex.split(command)
+    env = {**os.environ, **SERVER_ENV, **(env or {}), 'DB_NAME': database}
+    process = subprocess.Popen(command, env=env)
+
+    deadline = time.monotonic() + READY_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=2)
+            conn.request('GET', '/health')
+            conn.getresponse().read()
+            conn.close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Server did not answer within {READY_TIMEOUT:.0f}s")
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_report(report):
+    print(f"{'route':<14}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, row in [*report['routes'].items(), ('total', report['total'])]:
+        print(f"{name:<14}{row['requests']:>9}{row['errors']:>8}{row['throughput']:>9.1f}"
+              f"{row.get('p50_ms', 0):>9.1f}{row.get('p95_ms', 0):>9.1f}{row.get('p99_ms', 0):>9.1f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load and latency benchmark for the API")
+    parser.add_argument("--url", default=None,
+                        help="benchmark a server that is already running instead of booting app.py")
+    parser.add_argument("--port", type=int, default=5055, help="port for the booted server")
+    parser.add_argument("--command", default=None,
+                        help="command that starts the server (default: flask run on app.py)")
+    parser.add_argument("--database", default=BENCH_DATABASE,
+                        help=f"scratch database to recreate and use (default: {BENCH_DATABASE})")
+    parser.add_argument("--no-setup", action="store_true",
+                        help="use the database and data/benchmarks/<database>/ as they are "
+                             "instead of reloading them")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds before measuring starts")
+    parser.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                        help="route weights, e.g. predict=4,history=4,login=1")
+    parser.add_argument("--tickers", default=",".join(DEFAULT_TICKERS), help="symbols to request")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the request sequence and prices")
+    parser.add_argument("--output", default=None,
+                        help="report path (default: data/benchmarks/<commit>.json)")
+    parser.add_argument("--results", default=None,
+                        help="compare this existing report with --baseline instead of running")
+    parser.add_argument("--baseline", default=None, help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="allowed relative slowdown before a route counts as regressed")
+    args = parser.parse_args(argv)
+
+    if args.results:
+        with open(args.results) as f:
+            report = json.load(f)
+    else:
+        load_dotenv()
+        mix = parse_mix(args.mix)
+        tickers = [t.strip().upper() for t in args.tickers.split(',') if t.strip()]
+        url = args.url or f"http://127.0.0.1:{args.port}"
+        server = None
+        try:
+            if args.url is None:
+                from src.db import config_from_env
+                config = {**config_from_env(), 'database': args.database}
+                directory = os.path.join('data', 'benchmarks', args.database)
+                data_env = {'PRICE_STORE_DIR': os.path.join(directory, 'price_store'),
+                            'MODEL_DIR': os.path.join(directory, 'models')}
+                if not args.no_setup:
+                    setup_database(config)
+                    data_env = prepare_data(config, tickers, directory, args.seed)
+                server = start_server(url, args.database, args.command, data_env)
+            send = HttpSender(url)
+            if 'login' in mix:
+                send('POST', '/api/register', {'email': 'bench-login@example.com', 'password': BENCH_PASSWORD})
+            samples, elapsed = run_load(send, mix, args.concurrency, args.duration, args.warmup, tickers, args.seed)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=10)
+
+        report = build_report(samples, elapsed, {
+            'url': url, 'concurrency': args.concurrency, 'duration': args.duration,
+            'warmup': args.warmup, 'mix': mix, 'tickers': tickers, 'seed': args.seed,
+        })
+        output = args.output or os.path.join('data', 'benchmarks', f"{report['commit'] or 'unknown'}.json")
+        os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {output}")
+
+    _print_report(report)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        for line in regressions:
+            print(f"Regression: {line}")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,379 @@
+"""
+Pooled PostgreSQL connections.
+
+Every endpoint used to open (and authenticate) a brand-new connection per call.
+The pool keeps a bounded set of connections open and hands them out through a
+context manager:
+
+    with db_pool.connection() as conn:
+        cursor = conn.cursor()
+        ...
+
+Connections that sat idle for a while are validated with `SELECT 1` before
+being handed out again, so a database restart does not surface as a failed
+request.
+
+Connections opened with `timed_connect` report the time every
+cursor.execute() takes to the callables registered with observe_queries().
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+
+
+def config_from_env():
+    """psycopg2 connection settings from the DB_* environment variables"""
+    return {
+        'host': os.getenv('DB_HOST', 'localhost'),
+        'port': os.getenv('DB_PORT', '5432'),
+        'database': os.getenv('DB_NAME', 'stock_predictor'),
+        'user': os.getenv('DB_USER', 'postgres'),
+        'password': os.getenv('DB_PASSWORD', 'your_password_here')
+    }
+
+
+def pool_from_env(**overrides):
+    """ConnectionPool sized from the DB_POOL_* environment variables"""
+    settings = {
+        'minconn': int(os.getenv('DB_POOL_MIN', '1')),
+        'maxconn': int(os.getenv('DB_POOL_MAX', '10')),
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', '5')),
+        'validate_after': float(os.getenv('DB_POOL_VALIDATE_AFTER', '30')),
+    }
+    settings.update(overrides)
+    return ConnectionPool(config_from_env(), **settings)
+
+
+class PoolError(Exception):
+    """Raised when no database connection can be handed out"""
+
+
+class PoolTimeout(PoolError):
+    """Raised when every connection stayed checked out past the timeout"""
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections.
+
+    - minconn connections are opened on first use and kept around
+    - at most maxconn connections exist at any time
+    - callers wait up to `timeout` seconds for a free connection
+    - idle connections older than `validate_after` seconds are pinged first
+    """
+
+    def __init__(self, db_config, minconn=1, maxconn=10, timeout=5.0,
+                 validate_after=30.0, connect=psycopg2.connect):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Pool size must satisfy 0 <= minconn <= maxconn, maxconn >= 1")
+
+        self.db_config = db_config
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.validate_after = validate_after
+        self._connect = connect
+
+        self._cond = threading.Condition()
+        self._idle = deque()      # (conn, returned_at)
+        self._in_use = set()
+        self._opening = 0
+        self._filled = False
+        self._closed = False
+
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._checkout_time_total = 0.0
+        self._checkout_time_max = 0.0
+
+    # ------------------------------------------------------------------
+    # Checkout / return
+    # ------------------------------------------------------------------
+
+    def getconn(self, timeout=None):
+        """Check out a connection, opening or waiting for one as needed"""
+        timeout = self.timeout if timeout is None else timeout
+        started = time.perf_counter()
+        deadline = time.monotonic() + timeout
+
+        if not self._filled:
+            self._fill()
+
+        while True:
+            conn, returned_at = self._reserve(deadline)
+
+            if conn is None:
+                # A slot was reserved for a new connection; open it outside the lock
+                try:
+                    conn = self._connect(**self.db_config)
+                except psycopg2.Error as e:
+                    with self._cond:
+                        self._opening -= 1
+                        self._cond.notify()
+                    raise PoolError(f"Could not open database connection: {e}") from e
+                with self._cond:
+                    self._opening -= 1
+                    self._in_use.add(conn)
+                break
+
+            if self._is_usable(conn, returned_at):
+                break
+
+            self._discard(conn)
+
+        elapsed = time.perf_counter() - started
+        with self._cond:
+            self._checkouts += 1
+            self._checkout_time_total += elapsed
+            self._checkout_time_max = max(self._checkout_time_max, elapsed)
+        return conn
+
+    def putconn(self, conn, discard=False):
+        """
+        Return a connection to the pool, rolling back any open transaction
+        and switching autocommit back off
+        """
+        if not discard and not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                if conn.autocommit:
+                    conn.autocommit = False
+            except psycopg2.Error:
+                discard = True
+        else:
+            discard = True
+
+        with self._cond:
+            self._in_use.discard(conn)
+            if discard or self._closed:
+                self._discarded += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+        if discard or self._closed:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self, timeout=None, autocommit=False):
+        """
+        Context manager that checks out a connection and always returns it.
+        An exception inside the block (including GeneratorExit from a
+        generator closed early) rolls back the transaction; a connection that
+        died mid-request, or was interrupted by KeyboardInterrupt or
+        SystemExit in an unknown state, is closed instead of being pooled again.
+
+        With autocommit=True each statement commits on its own, which saves
+        the BEGIN and COMMIT round trips around single-statement work.
+        """
+        conn = self.getconn(timeout)
+        if autocommit:
+            conn.autocommit = True
+        try:
+            yield conn
+        except BaseException as e:
+            broken = conn.closed or not isinstance(e, (Exception, GeneratorExit))
+            if not broken:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            self.putconn(conn, discard=broken)
+            raise
+        else:
+            self.putconn(conn)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def close_all(self):
+        """Close every idle connection and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def reset(self):
+        """
+        Forget every connection without closing it.
+        Used in a freshly forked worker: the sockets belong to the parent
+        process and closing them here would break the parent's sessions.
+        """
+        with self._cond:
+            self._idle.clear()
+            self._in_use.clear()
+            self._opening = 0
+            self._filled = False
+            self._closed = False
+
+    def stats(self):
+        """Snapshot of pool usage for monitoring"""
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                "min_size": self.minconn,
+                "max_size": self.maxconn,
+                "size": len(self._idle) + len(self._in_use) + self._opening,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "waiting": self._waiting,
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "checkout_ms_avg": round(self._checkout_time_total / checkouts * 1000, 3) if checkouts else 0.0,
+                "checkout_ms_max": round(self._checkout_time_max * 1000, 3),
+            }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _reserve(self, deadline):
+        """
+        Under the lock, either pop an idle connection or reserve a slot for a
+        new one (returned as (None, None)). Waits while the pool is exhausted.
+        """
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._closed:
+                        raise PoolError("Connection pool is closed")
+                    if self._idle:
+                        conn, returned_at = self._idle.pop()
+                        self._in_use.add(conn)
+                        return conn, returned_at
+                    if len(self._in_use) + self._opening < self.maxconn:
+                        self._opening += 1
+                        return None, None
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"No database connection available within {self.timeout}s"
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+    def _is_usable(self, conn, returned_at):
+        """Validate a pooled connection that may have gone stale while idle"""
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.validate_after:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        with self._cond:
+            self._in_use.discard(conn)
+            self._discarded += 1
+            self._cond.notify()
+        self._close_quietly(conn)
+
+    def _fill(self):
+        """Open the minimum number of connections (best effort)"""
+        with self._cond:
+            if self._filled:
+                return
+            self._filled = True
+            missing = self.minconn - len(self._idle) - len(self._in_use) - self._opening
+            self._opening += max(missing, 0)
+
+        for _ in range(max(missing, 0)):
+            try:
+                conn = self._connect(**self.db_config)
+            except psycopg2.Error as e:
+                print(f"Database pool warm-up error: {e}")
+                conn = None
+            with self._cond:
+                self._opening -= 1
+                if conn is not None:
+                    self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+# ----------------------------------------------------------------------
+# Query timing
+# ----------------------------------------------------------------------
+
+_query_observers = []
+_timed_cursors = {}
+
+
+def observe_queries(observer):
+    """Call observer(seconds, query, params) after every timed execute()"""
+    _query_observers.append(observer)
+
+
+def timed_connect(**db_config):
+    """psycopg2.connect() whose cursors report execute() durations"""
+    return psycopg2.connect(connection_factory=TimedConnection, **db_config)
+
+
+class TimedConnection(psycopg2.extensions.connection):
+    """Connection that wraps whichever cursor class is asked for in timing"""
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs['cursor_factory'] = _timed_cursor(factory)
+        return super().cursor(*args, **kwargs)
+
+
+def _timed_cursor(factory):
+    timed = _timed_cursors.get(factory)
+    if timed is None:
+        class timed(factory):
+            def execute(self, query, vars=None):
+                started = time.perf_counter()
+                try:
+                    return super().execute(query, vars)
+                finally:
+                    _report_query(time.perf_counter() - started, query, vars)
+
+            def executemany(self, query, vars_list):
+                started = time.perf_counter()
+                try:
+                    return super().executemany(query, vars_list)
+                finally:
+                    _report_query(time.perf_counter() - started, query, None)
+
+        timed.__name__ = f"Timed{factory.__name__}"
+        timed = _timed_cursors.setdefault(factory, timed)
+    return timed
+
+
+def _report_query(seconds, query, params):
+    for observer in _query_observers:
+        try:
+            observer(seconds, query, params)
+        except Exception as e:
+            print(f"Query observer error: {e}")
@@ -0,0 +1,111 @@
+"""
+Response formats chosen by content negotiation.
+
+JSON stays the default for the web UI. Clients that send
+
+    Accept: application/vnd.apache.arrow.stream    (Arrow IPC stream)
+    Accept: application/msgpack                    (MessagePack)
+
+or ?format=arrow / ?format=msgpack get the same data as typed columns
+instead of one object per row. Payload fields (ticker, period, errors, ...)
+travel as Arrow schema metadata (JSON-encoded values) or as top-level
+MessagePack keys, with the columns under the payload's usual row key.
+
+pyarrow and msgpack are optional; asking for a format whose library is not
+installed raises FormatUnavailable.
+"""
+import json
+
+import numpy as np
+
+JSON_MIMETYPE = 'application/json'
+NDJSON_MIMETYPE = 'application/x-ndjson'
+ARROW_MIMETYPE = 'application/vnd.apache.arrow.stream'
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+MIMETYPES = {
+    'json': JSON_MIMETYPE,
+    'ndjson': NDJSON_MIMETYPE,
+    'arrow': ARROW_MIMETYPE,
+    'msgpack': MSGPACK_MIMETYPE,
+}
+
+BINARY_FORMATS = ('arrow', 'msgpack')
+
+
+class FormatUnavailable(Exception):
+    """The library for the requested format is not installed"""
+
+
+def negotiate(fmt, accept, offered):
+    """
+    Format name for a request: the explicit ?format= value when given,
+    otherwise the best Accept match among `offered` (JSON by default).
+    Returns None for a format the endpoint does not offer.
+    """
+    if fmt is not None:
+        return fmt if fmt in offered else None
+    best = accept.best_match([MIMETYPES[f] for f in offered], default=JSON_MIMETYPE)
+    return next(f for f in offered if MIMETYPES[f] == best)
+
+
+def encode(fmt, meta, key, columns):
+    """
+    Serialize {name: array} columns in a binary format.
+    `meta` holds the payload's other fields; `key` names the row collection.
+    """
+    if fmt == 'arrow':
+        return encode_arrow(meta, columns)
+    if fmt == 'msgpack':
+        return encode_msgpack(meta, key, columns)
+    raise ValueError(f"Unknown format: {fmt}")
+
+
+def encode_arrow(meta, columns):
+    try:
+        import pyarrow as pa   # optional dependency, only needed for Arrow responses
+    except ImportError as e:
+        raise FormatUnavailable("Arrow responses are not available") from e
+
+    batch = pa.RecordBatch.from_arrays(
+        [pa.array(values) for values in columns.values()], names=list(columns),
+    )
+    schema = batch.schema.with_metadata({name: json.dumps(value) for name, value in meta.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(batch.replace_schema_metadata(schema.metadata))
+    return sink.getvalue().to_pybytes()
+
+
+def encode_msgpack(meta, key, columns):
+    try:
+        import msgpack   # optional dependency, only needed for MessagePack responses
+    except ImportError as e:
+        raise FormatUnavailable("MessagePack responses are not available") from e
+
+    body = dict(meta)
+    body[key] = {name: column_list(values) for name, values in columns.items()}
+    return msgpack.packb(body)
+
+
+def column_list(values):
+    """Plain list for one column; dates become ISO strings"""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return np.datetime_as_string(values, unit='D').tolist()
+    return values.tolist()
+
+
+def stack(label, tables):
+    """
+    Long-format columns from {value: {name: array}}: the tables concatenated
+    with a leading `label` column repeating each value.
+    """
+    if not tables:
+        return {label: np.array([], dtype=str)}
+    names = list(next(iter(tables.values())))
+    lengths = [len(columns[names[0]]) for columns in tables.values()]
+    stacked = {label: np.repeat(np.array(list(tables), dtype=str), lengths)}
+    for name in names:
+        stacked[name] = np.concatenate([np.asarray(columns[name]) for columns in tables.values()])
+    return stacked
@@ -0,0 +1,124 @@
+"""
+bcrypt hashing on a dedicated worker pool.
+
+bcrypt costs 100-300 ms of CPU per call. Running it on the request thread pins
+that thread and starves cheap endpoints during a login burst. PasswordHasher
+runs hashing on a fixed pool of threads (bcrypt releases the GIL, so threads
+scale across cores) in front of a bounded queue:
+
+- when the queue is full, HashingBusy is raised immediately
+- when a queued job does not finish within `timeout`, HashingBusy is raised
+
+Both carry a `retry_after` hint (seconds) for a 503 response. `observe`, if
+given, is called with the seconds each finished job spent hashing.
+"""
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import bcrypt
+
+
+class HashingBusy(Exception):
+    """The hashing pool cannot take (or finish) this job in time"""
+
+    def __init__(self, message, retry_after=1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Bounded worker pool for bcrypt hash/verify"""
+
+    def __init__(self, workers=4, max_pending=32, timeout=5.0, rounds=12, observe=None):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.rounds = rounds
+        self.observe = observe
+        self.reset()
+
+    def reset(self):
+        """
+        Start over with a new pool and counters. A forked child must call
+        this: the parent's worker threads do not exist in it.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+        self._lock = threading.Lock()
+
+        self._outstanding = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._busy_time_total = 0.0
+
+    def hash(self, password):
+        """Return the bcrypt hash of password as a str"""
+        hashed = self._run(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(self.rounds))
+        return hashed.decode('utf-8')
+
+    def verify(self, password, password_hash):
+        """Check password against a stored bcrypt hash"""
+        return self._run(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        with self._lock:
+            completed = self._completed
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "outstanding": self._outstanding,
+                "completed": completed,
+                "rejected": self._rejected,
+                "timeouts": self._timeouts,
+                "avg_ms": round(self._busy_time_total / completed * 1000, 3) if completed else 0.0,
+            }
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise HashingBusy("Password hashing queue is full", self._retry_after())
+
+        with self._lock:
+            self._outstanding += 1
+
+        future = self._executor.submit(self._timed, fn, *args)
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            # The job keeps its slot until it actually finishes
+            future.cancel()
+            with self._lock:
+                self._timeouts += 1
+            raise HashingBusy("Password hashing timed out", self._retry_after())
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._completed += 1
+                self._busy_time_total += elapsed
+            if self.observe is not None:
+                self.observe(elapsed)
+
+    def _release(self, future):
+        with self._lock:
+            self._outstanding -= 1
+        self._slots.release()
+
+    def _retry_after(self):
+        """Rough time for the current backlog to drain, in whole seconds"""
+        with self._lock:
+            avg = self._busy_time_total / self._completed if self._completed else 0.25
+            backlog = self._outstanding
+        return max(1, int(math.ceil(avg * backlog / self.workers)))
@@ -0,0 +1,127 @@
+"""
+Dependency health checked in the background.
+
+Load balancers and orchestrators probe every second or so. Running the
+checks on each probe turns that into constant database traffic. The
+HealthProber instead runs every registered check on a background thread
+every `interval` seconds and keeps the latest result. Probes only read that
+state:
+
+- live():   the process is up and serving requests (never touches a dependency)
+- ready():  every check passed on its last run, and that run is recent
+
+A check is a callable that raises (or returns False) on failure. Results
+older than `stale_after` seconds count as failing, so a check that hangs
+makes the instance not ready instead of leaving an old "ok" in place.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+
+class HealthProber:
+    """Runs dependency checks periodically and caches their outcome"""
+
+    def __init__(self, interval=5.0, stale_after=None):
+        self.interval = interval
+        self.stale_after = stale_after if stale_after is not None else interval * 3
+        self.started_at = time.monotonic()
+
+        self._checks = {}          # name -> callable
+        self._results = {}         # name -> result dict
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self.runs = 0
+
+    def add_check(self, name, check):
+        self._checks[name] = check
+
+    # ------------------------------------------------------------------
+    # Probes (request path: memory only)
+    # ------------------------------------------------------------------
+
+    def live(self):
+        return {"status": "alive", "uptime_s": round(time.monotonic() - self.started_at, 3)}
+
+    def ready(self):
+        """(is_ready, report) from the cached check results"""
+        self.ensure_started()
+        now = time.monotonic()
+        with self._lock:
+            results = dict(self._results)
+
+        checks = {}
+        ready = True
+        for name in self._checks:
+            result = results.get(name)
+            if result is None:
+                checks[name] = {"status": "pending"}
+                ready = False
+                continue
+            age = now - result["monotonic"]
+            status = result["status"]
+            if status == "ok" and age > self.stale_after:
+                status = "stale"
+            ready = ready and status == "ok"
+            checks[name] = {
+                "status": status,
+                "age_s": round(age, 3),
+                "latency_ms": result["latency_ms"],
+                "checked_at": result["checked_at"],
+                "consecutive_failures": result["consecutive_failures"],
+                **({"error": result["error"]} if result["error"] else {}),
+            }
+        return ready, {"status": "ready" if ready else "not_ready", "checks": checks}
+
+    # ------------------------------------------------------------------
+    # Background checks
+    # ------------------------------------------------------------------
+
+    def ensure_started(self):
+        """Start the prober lazily (and again in a forked child process)"""
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            if self._pid is not None and self._pid != pid:
+                self._results = {}
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name="health-prober", daemon=True)
+            self._thread.start()
+
+    def check_now(self):
+        """Run every check once on the calling thread"""
+        for name, check in list(self._checks.items()):
+            started = time.perf_counter()
+            error = None
+            try:
+                if check() is False:
+                    error = "check failed"
+            except Exception as e:
+                error = str(e) or e.__class__.__name__
+            latency = (time.perf_counter() - started) * 1000
+
+            with self._lock:
+                previous = self._results.get(name)
+                failures = 0 if error is None else (previous["consecutive_failures"] if previous else 0) + 1
+                self._results[name] = {
+                    "status": "ok" if error is None else "failing",
+                    "error": error,
+                    "latency_ms": round(latency, 3),
+                    "checked_at": datetime.utcnow().isoformat(),
+                    "monotonic": time.monotonic(),
+                    "consecutive_failures": failures,
+                }
+        self.runs += 1
+
+    def _run(self):
+        while True:
+            try:
+                self.check_now()
+            except Exception as e:
+                print(f"Health check error: {e}")
+            time.sleep(self.interval)
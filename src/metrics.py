@@ -0,0 +1,269 @@
+"""
+Request metrics exported in the Prometheus text format.
+
+Recording a value only appends a tuple to a deque, which is atomic in
+CPython, so request threads never take a lock. A background thread drains
+the deque every `flush_interval` seconds (and /metrics drains it before
+rendering) into per-series counters, gauges and histograms. Histograms use
+fixed buckets: each batch of observations is bucketed at once with
+np.searchsorted.
+
+With `directory` set, every worker process also writes its series to
+<directory>/metrics-<pid>.json on each flush, and render() adds up the files
+of all processes, so any worker can answer a scrape. Counters and histograms
+of exited processes still count; their gauges are ignored. Empty the
+directory when the server starts.
+
+Besides recorded events, collectors (callables returning (name, labels,
+value) samples) are read at flush time, for values that components already
+count themselves, such as cache hits.
+"""
+import glob
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+
+COUNTER, GAUGE, HISTOGRAM = 'counter', 'gauge', 'histogram'
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Metrics:
+    """Lock-free recording, periodic aggregation, Prometheus rendering"""
+
+    def __init__(self, directory=None, flush_interval=1.0, buckets=DEFAULT_BUCKETS, max_events=100000):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.buckets = np.asarray(buckets, dtype=float)
+
+        self._events = deque(maxlen=max_events)   # (kind, name, labels, value)
+        self._lock = threading.Lock()               # held by the flusher and render, not recorders
+        self._metadata = {}                         # name -> (kind, help)
+        self._ratios = {}                           # name -> (hits name, misses name)
+        self._collectors = []
+        self._thread = None
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        self._counters = defaultdict(float)         # (name, labels) -> value
+        self._gauges = defaultdict(float)
+        self._histograms = {}                       # (name, labels) -> [bucket counts, sum]
+        self._events.clear()
+
+    # ------------------------------------------------------------------
+    # Recording (hot path)
+    # ------------------------------------------------------------------
+
+    def define(self, name, kind, help):
+        self._metadata[name] = (kind, help)
+
+    def ratio(self, name, hits, misses, help):
+        """Gauge hits / (hits + misses), computed after summing every process"""
+        self.define(name, GAUGE, help)
+        self._ratios[name] = (hits, misses)
+
+    def collect(self, collector):
+        """Register collector() -> iterable of (name, labels, value)"""
+        self._collectors.append(collector)
+
+    def inc(self, name, labels=(), value=1.0):
+        self._events.append((COUNTER, name, labels, value))
+
+    def add(self, name, labels=(), value=1.0):
+        """Move a gauge up (or down, with a negative value)"""
+        self._events.append((GAUGE, name, labels, value))
+
+    def observe(self, name, value, labels=()):
+        self._events.append((HISTOGRAM, name, labels, value))
+
+    # ------------------------------------------------------------------
+    # Aggregation
+    # ------------------------------------------------------------------
+
+    def ensure_started(self):
+        """Start the flusher lazily; a forked child starts from empty series"""
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None:
+                return
+            if self._pid is not None:
+                self._reset()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="metrics-flusher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Metrics flush error: {e}")
+
+    def flush(self):
+        """Apply queued events, then publish this process's series if sharing"""
+        with self._lock:
+            observations = defaultdict(list)
+            while True:
+                try:
+                    kind, name, labels, value = self._events.popleft()
+                except IndexError:
+                    break
+                if kind == COUNTER:
+                    self._counters[(name, labels)] += value
+                elif kind == GAUGE:
+                    self._gauges[(name, labels)] += value
+                else:
+                    observations[(name, labels)].append(value)
+
+            for key, values in observations.items():
+                values = np.asarray(values, dtype=float)
+                entry = self._histograms.get(key)
+                if entry is None:
+                    entry = self._histograms[key] = [np.zeros(len(self.buckets) + 1, dtype=np.int64), 0.0]
+                # Bucket i counts values in (buckets[i-1], buckets[i]]; the last one is +Inf
+                entry[0] += np.bincount(np.searchsorted(self.buckets, values), minlength=len(entry[0]))
+                entry[1] += float(values.sum())
+
+            snapshot = self._snapshot()
+
+        if self.directory:
+            self._publish(snapshot)
+        return snapshot
+
+    def _snapshot(self):
+        return {
+            'pid': os.getpid(),
+            'counters': [[n, list(l), v] for (n, l), v in self._counters.items()],
+            'gauges': [[n, list(l), v] for (n, l), v in self._gauges.items()],
+            'histograms': [[n, list(l), c.tolist(), s] for (n, l), (c, s) in self._histograms.items()],
+            'collected': [[n, list(l), v] for n, l, v in self._collect()],
+        }
+
+    def _collect(self):
+        samples = []
+        for collector in self._collectors:
+            try:
+                samples.extend((name, tuple(labels), float(value)) for name, labels, value in collector())
+            except Exception as e:
+                print(f"Metrics collector error: {e}")
+        return samples
+
+    def _publish(self, snapshot):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"metrics-{snapshot['pid']}.json")
+        with open(path + '.tmp', 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(path + '.tmp', path)
+
+    def _snapshots(self, own):
+        """This process's snapshot plus those published by other processes"""
+        snapshots = [own]
+        if not self.directory:
+            return snapshots
+        for path in glob.glob(os.path.join(self.directory, 'metrics-*.json')):
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if snapshot.get('pid') == own['pid']:
+                continue
+            if not _alive(snapshot.get('pid')):
+                snapshot['gauges'], snapshot['collected'] = [], []
+            snapshots.append(snapshot)
+        return snapshots
+
+    # ------------------------------------------------------------------
+    # Rendering
+    # ------------------------------------------------------------------
+
+    def totals(self):
+        """Series summed over every process: (scalars, histograms)"""
+        scalars = defaultdict(float)
+        histograms = {}
+        for snapshot in self._snapshots(self.flush()):
+            for part in ('counters', 'gauges', 'collected'):
+                for name, labels, value in snapshot[part]:
+                    scalars[(name, tuple(map(tuple, labels)))] += value
+            for name, labels, counts, total in snapshot['histograms']:
+                key = (name, tuple(map(tuple, labels)))
+                if key not in histograms:
+                    histograms[key] = [np.zeros(len(counts), dtype=np.int64), 0.0]
+                histograms[key][0] += np.asarray(counts, dtype=np.int64)
+                histograms[key][1] += total
+        return scalars, histograms
+
+    def render(self):
+        """Every series in the Prometheus text exposition format"""
+        scalars, histograms = self.totals()
+        for name, (hits, misses) in self._ratios.items():
+            for (series, labels), value in list(scalars.items()):
+                if series == hits:
+                    lookups = value + scalars.get((misses, labels), 0.0)
+                    scalars[(name, labels)] = value / lookups if lookups else 0.0
+        by_name = defaultdict(list)
+        for (name, labels), value in scalars.items():
+            by_name[name].append((labels, value))
+        for (name, labels), value in histograms.items():
+            by_name[name].append((labels, value))
+
+        bounds = [_number(b) for b in self.buckets] + ['+Inf']
+        lines = []
+        for name in sorted(by_name):
+            kind, help = self._metadata.get(name, (GAUGE, ''))
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+                if kind != HISTOGRAM:
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                    continue
+                counts, total = value
+                for bound, cumulative in zip(bounds, np.cumsum(counts)):
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {int(cumulative)}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+                lines.append(f"{name}_count{_labels(labels)} {int(counts.sum())}")
+        return "\n".join(lines) + "\n"
+
+
+def clear_directory(directory):
+    """Remove published snapshots, e.g. before the workers start"""
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json*')):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except (OSError, TypeError):
+        return False
+    return True
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value):
+    if isinstance(value, float) and math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(float(value))
+    return repr(float(value))
@@ -0,0 +1,3 @@
+"""
+Price prediction models and their on-disk registry.
+"""
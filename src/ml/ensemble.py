@@ -0,0 +1,177 @@
+"""
+Ensembles of price predictors.
+
+EnsemblePredictor trains several StockPredictor members on one training
+set: features are computed once from the DataFrame and every member fits
+on its own bootstrap resample of those rows (with its own seed), so the
+members differ without recomputing anything. Member fits run concurrently,
+on a process pool by default because the mini-batch loop holds the GIL, or
+on threads.
+
+At prediction time every StockPredictor member is evaluated by
+forecast_many in one stacked pass per day, so an ensemble costs about as
+much as its slowest member rather than the sum. Other members (anything
+with forecast(closes, days)) run on a thread pool alongside that pass.
+Member forecasts are combined with equal weights, inverse residual
+variance, or explicit weights.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.ml.predictor import (
+    MIN_TRAINING_ROWS, MODEL_FEATURES, PRICE_COLUMNS, StockPredictor, forecast_many,
+)
+
+WEIGHTINGS = ('equal', 'inverse_variance')
+EXECUTORS = ('process', 'thread', None)
+
+_shared_training_set = None     # (features, targets) in pool worker processes
+
+
+class EnsemblePredictor:
+    """Weighted average of several predictors sharing one feature computation"""
+
+    def __init__(self, members=None, size=5, weighting='equal', bootstrap=True,
+                 executor='process', workers=None, seed=42, learning_rate=0.05, batch_size=32):
+        if executor not in EXECUTORS:
+            raise ValueError(f"executor must be one of {EXECUTORS}")
+        if isinstance(weighting, str) and weighting not in WEIGHTINGS:
+            raise ValueError(f"weighting must be one of {WEIGHTINGS} or a list of weights")
+        if members is None:
+            members = [StockPredictor(learning_rate, batch_size, seed=seed + i) for i in range(size)]
+        self.members = list(members)
+        self.weighting = weighting
+        self.bootstrap = bootstrap
+        self.executor = executor
+        self.workers = workers
+        self.seed = seed
+
+    @property
+    def is_trained(self):
+        return all(getattr(m, 'is_trained', True) for m in self.members)
+
+    def member_weights(self):
+        """Normalized combination weight per member"""
+        if isinstance(self.weighting, str) and self.weighting == 'equal':
+            weights = np.ones(len(self.members))
+        elif isinstance(self.weighting, str):
+            variance = np.array([getattr(m, 'residual_std', 0.0) ** 2 for m in self.members])
+            weights = 1.0 / np.maximum(variance, 1e-12)
+        else:
+            weights = np.asarray(self.weighting, dtype=float)
+            if weights.shape != (len(self.members),) or (weights < 0).any() or weights.sum() <= 0:
+                raise ValueError("weights must be one non-negative value per member")
+        return weights / weights.sum()
+
+    # ------------------------------------------------------------------
+    # Training
+    # ------------------------------------------------------------------
+
+    def train(self, data, epochs=10):
+        """Fit every StockPredictor member from one shared training set"""
+        StockPredictor.validate(data)
+        closes = data['Close'].to_numpy(dtype=float)
+        features, targets = StockPredictor.training_set(closes)
+        if len(features) < MIN_TRAINING_ROWS:
+            raise ValueError(
+                f"Need at least {MIN_TRAINING_ROWS} complete rows to train, got {len(features)}"
+            )
+
+        trainable = [i for i, m in enumerate(self.members) if isinstance(m, StockPredictor)]
+        samples = [self._sample(i, len(features)) for i in trainable]
+        fitted = self._fit_members([self.members[i] for i in trainable], features, targets, samples, epochs)
+
+        prices = data[PRICE_COLUMNS].to_numpy(dtype=float)
+        last_date = pd.Timestamp(data.index[-1]).date()
+        for i, member in zip(trainable, fitted):
+            member.record_training(closes, last_date, float(prices.min()), float(prices.max()))
+            self.members[i] = member
+        return self
+
+    def _sample(self, index, rows):
+        """Row indices for one member: a bootstrap resample, or every row"""
+        if not self.bootstrap:
+            return None
+        return np.random.default_rng(self.seed + index).integers(0, rows, rows)
+
+    def _fit_members(self, members, features, targets, samples, epochs):
+        workers = min(len(members), self.workers or os.cpu_count() or 1)
+        if self.executor is None or workers <= 1 or len(members) <= 1:
+            return [_fit_member(m, features, targets, rows, epochs) for m, rows in zip(members, samples)]
+
+        if self.executor == 'thread':
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ensemble-fit") as pool:
+                return list(pool.map(
+                    lambda job: _fit_member(job[0], features, targets, job[1], epochs),
+                    zip(members, samples),
+                ))
+
+        # Workers receive the training set once, not once per member
+        with ProcessPoolExecutor(max_workers=workers, initializer=_share_training_set,
+                                 initargs=(features, targets)) as pool:
+            return list(pool.map(_fit_shared, members, samples, [epochs] * len(members)))
+
+    # ------------------------------------------------------------------
+    # Prediction
+    # ------------------------------------------------------------------
+
+    def member_forecasts(self, closes, days):
+        """Every member's forecast, shape (len(members), days)"""
+        if not self.is_trained:
+            raise RuntimeError("Model has not been trained")
+        forecasts = np.empty((len(self.members), days))
+        stacked = [i for i, m in enumerate(self.members) if isinstance(m, StockPredictor)]
+        others = [i for i in range(len(self.members)) if i not in set(stacked)]
+
+        pool = ThreadPoolExecutor(max_workers=len(others)) if others else None
+        try:
+            futures = {i: pool.submit(self.members[i].forecast, closes, days) for i in others}
+            if stacked:
+                forecasts[stacked] = forecast_many(
+                    [self.members[i] for i in stacked], [closes] * len(stacked), days,
+                )
+            for i, future in futures.items():
+                forecasts[i] = future.result()
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False)
+        return forecasts
+
+    def forecast(self, closes, days):
+        """Weighted ensemble forecast for the next `days` days after closes"""
+        return self.member_weights() @ self.member_forecasts(closes, days)
+
+    def predict(self, data, days=7):
+        """Predicted closes (list of floats) for `days` days after data"""
+        StockPredictor.validate(data)
+        return self.forecast(data['Close'].to_numpy(dtype=float), days).tolist()
+
+    def get_feature_importance(self):
+        """Member feature importances averaged with the ensemble weights"""
+        weights = self.member_weights()
+        importance = dict.fromkeys(MODEL_FEATURES, 0.0)
+        for weight, member in zip(weights, self.members):
+            if isinstance(member, StockPredictor):
+                for name, share in member.get_feature_importance().items():
+                    importance[name] += weight * share
+        return importance
+
+
+def _fit_member(member, features, targets, rows, epochs):
+    if rows is not None:
+        features, targets = features[rows], targets[rows]
+    return member.fit(features, targets, epochs)
+
+
+def _share_training_set(features, targets):
+    global _shared_training_set
+    _shared_training_set = (features, targets)
+
+
+def _fit_shared(member, rows, epochs):
+    """Process pool entry point: fit one member on the worker's training set"""
+    features, targets = _shared_training_set
+    return _fit_member(member, features, targets, rows, epochs)
@@ -0,0 +1,325 @@
+"""
+Precomputed forecasts in the predictions table.
+
+Forecasts only change when prices or models change, so they are generated
+in bulk after each prices load (see src.stocks.ingest) instead of on every
+request: every published model forecasts MAX days ahead in one vectorized
+batch, and the paths are upserted as one row per (symbol, horizon). A
+shorter horizon is a prefix of the longer forecast, so one path serves
+every `days` value. Each row also stores the Monte Carlo confidence band
+for its day (see predictor.simulate_paths).
+
+ForecastService answers /predict from a small in-process cache in front of
+a primary-key lookup on predictions; tickers it cannot cover fall back to
+on-demand inference in the route. So do stale forecasts: ones older than
+`max_age` seconds, or whose first target date is no longer in the future
+(the prices load or nightly job stopped regenerating them). Bands computed on demand use as many
+paths as a PathBudget says fit the latency budget.
+
+Usage:
+    python -m src.ml.forecasts              # regenerate for every published model
+    python -m src.ml.forecasts LMT --days 30 --paths 5000
+"""
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+
+import numpy as np
+
+from src.ml.predictor import (
+    CONFIDENCE_INTERVAL, CONFIDENCE_PATHS, confidence_bands, forecast_many, simulate_paths,
+)
+
+UPSERT_PREDICTIONS_SQL = """
+    INSERT INTO predictions
+        (symbol, horizon, target_date, predicted_price, model_version, model_trained_at, as_of, generated_at,
+         lower_price, upper_price, confidence)
+    VALUES %s
+    ON CONFLICT (symbol, horizon) DO UPDATE SET
+        target_date = EXCLUDED.target_date,
+        predicted_price = EXCLUDED.predicted_price,
+        model_version = EXCLUDED.model_version,
+        model_trained_at = EXCLUDED.model_trained_at,
+        as_of = EXCLUDED.as_of,
+        generated_at = EXCLUDED.generated_at,
+        lower_price = EXCLUDED.lower_price,
+        upper_price = EXCLUDED.upper_price,
+        confidence = EXCLUDED.confidence
+"""
+
+DELETE_LONGER_SQL = "DELETE FROM predictions WHERE symbol = ANY(%s) AND horizon > %s"
+
+SELECT_PREDICTIONS_SQL = """
+    SELECT symbol, horizon, target_date, predicted_price, model_version, model_trained_at, generated_at,
+           lower_price, upper_price, confidence
+    FROM predictions
+    WHERE symbol = ANY(%s)
+    ORDER BY symbol, horizon
+"""
+
+
+def generate_forecasts(pool, registry, store, symbols=None, days=30, paths=CONFIDENCE_PATHS, report=print):
+    """
+    Forecast `days` ahead for every symbol with a published model and store
+    the paths, with confidence bands from `paths` simulations (0 skips
+    them). Returns the number of symbols written.
+    """
+    started = time.perf_counter()
+    batch = []
+    for symbol in [s.upper() for s in (symbols or registry.symbols())]:
+        try:
+            predictor, meta = registry.get(symbol)
+        except Exception as e:
+            report(f"{symbol}: model load error: {e}")
+            continue
+        if predictor is None:
+            continue
+        series = store.series(symbol) if store is not None else None
+        if series is not None and len(series):
+            closes, as_of = series.close, series.dates[-1].astype(object)
+        else:
+            closes, as_of = predictor.history, predictor.last_date
+        batch.append((symbol, predictor, meta, closes, as_of))
+    if not batch:
+        report("No published models to forecast")
+        return 0
+
+    forecasts = forecast_many([b[1] for b in batch], [b[3] for b in batch], days)
+    rng = np.random.default_rng()
+    empty = [None] * days
+    generated_at = datetime.utcnow()
+    today = generated_at.date()
+    rows = []
+    for (symbol, predictor, meta, closes, as_of), path in zip(batch, forecasts):
+        if paths > 0:
+            bands = confidence_bands(simulate_paths(predictor, closes, days, paths, rng))
+            lower = np.round(bands['lower'], 2).tolist()
+            upper = np.round(bands['upper'], 2).tolist()
+            confidence = bands['confidence'].tolist()
+        else:
+            lower = upper = confidence = empty
+        for horizon, price in enumerate(path):
+            rows.append((
+                symbol, horizon + 1, today + timedelta(days=horizon + 1), round(float(price), 2),
+                meta['version'], parse_timestamp(meta.get('trained_at')), as_of, generated_at,
+                lower[horizon], upper[horizon], confidence[horizon],
+            ))
+
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            execute_values(cursor, UPSERT_PREDICTIONS_SQL, rows, page_size=5000)
+            cursor.execute(DELETE_LONGER_SQL, ([b[0] for b in batch], days))
+            conn.commit()
+        finally:
+            cursor.close()
+
+    report(
+        f"Stored {days}-day forecasts for {len(batch)} symbols "
+        f"({len(rows):,} rows) in {time.perf_counter() - started:.2f}s"
+    )
+    return len(batch)
+
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    return datetime.fromisoformat(value.rstrip('Z'))
+
+
+def format_timestamp(value):
+    return value.isoformat() + 'Z' if value else None
+
+
+class PathBudget:
+    """
+    How many Monte Carlo paths fit a latency budget, from the measured cost
+    of recent simulations (exponentially weighted seconds per path-day).
+    """
+
+    def __init__(self, max_paths=CONFIDENCE_PATHS, min_paths=200, budget_ms=50.0):
+        self.max_paths = max_paths
+        self.min_paths = min(min_paths, max_paths)
+        self.budget = budget_ms / 1000.0
+        self.cost = None
+        self._lock = threading.Lock()
+
+    def paths(self, days):
+        with self._lock:
+            cost = self.cost
+        if cost is None:
+            return self.max_paths
+        fit = int(self.budget / (cost * max(1, days)))
+        return max(self.min_paths, min(self.max_paths, fit))
+
+    def record(self, paths, days, seconds):
+        cost = seconds / max(1, paths * days)
+        with self._lock:
+            self.cost = cost if self.cost is None else 0.8 * self.cost + 0.2 * cost
+
+    def simulate(self, predictor, closes, days, interval=CONFIDENCE_INTERVAL, rng=None):
+        """confidence_bands for the forecast, with the path count the budget allows"""
+        paths = self.paths(days)
+        started = time.perf_counter()
+        bands = confidence_bands(
+            simulate_paths(predictor, closes, days, paths, rng or np.random.default_rng()), interval,
+        )
+        self.record(paths, days, time.perf_counter() - started)
+        bands['paths'] = paths
+        return bands
+
+    def stats(self):
+        with self._lock:
+            cost = self.cost
+        return {
+            "max_paths": self.max_paths,
+            "budget_ms": self.budget * 1000.0,
+            "us_per_path_day": round(cost * 1e6, 3) if cost is not None else None,
+        }
+
+
+class ForecastService:
+    """Reads stored forecasts through a short-lived in-process cache"""
+
+    def __init__(self, pool, cache, max_age=None):
+        self.pool = pool
+        self.cache = cache          # symbol -> forecast dict, or False when not stored
+        self.max_age = max_age      # seconds a stored forecast stays servable (None: no limit)
+        self._lock = threading.Lock()
+        self.db_reads = 0
+        self.db_errors = 0
+        self.stale = 0
+
+    def get(self, ticker, days):
+        return self.get_many({ticker: days}).get(ticker)
+
+    def get_many(self, horizons):
+        """
+        Stored forecasts for {ticker: days}, for each ticker whose stored
+        path is current and covers its horizon:
+        {ticker: {"prices", "dates", "bands", "model_version", "model_trained_at", "generated_at"}}
+        "bands" is {"lower", "upper", "confidence"}, or None when not stored.
+        """
+        found, missing = {}, []
+        for ticker in horizons:
+            entry = self.cache.get(ticker)
+            if entry is None:
+                missing.append(ticker)
+            elif entry:
+                found[ticker] = entry
+
+        if missing:
+            stored = self._read(missing)
+            for ticker in missing:
+                entry = stored.get(ticker, False)
+                self.cache.set(ticker, entry)
+                if entry:
+                    found[ticker] = entry
+
+        result = {}
+        now = datetime.utcnow()
+        for ticker, entry in found.items():
+            days = horizons[ticker]
+            if len(entry['prices']) < days:
+                continue
+            if not self._current(entry, now):
+                with self._lock:
+                    self.stale += 1
+                continue
+            bands = entry['bands']
+            if bands is not None:
+                bands = {name: values[:days] for name, values in bands.items()}
+            result[ticker] = dict(entry, prices=entry['prices'][:days], dates=entry['dates'][:days], bands=bands)
+        return result
+
+    def _current(self, entry, now):
+        """A path starting after today, generated within max_age"""
+        if entry['dates'][0] <= now.date().isoformat():
+            return False
+        if self.max_age is None:
+            return True
+        return now - parse_timestamp(entry['generated_at']) <= timedelta(seconds=self.max_age)
+
+    def _read(self, tickers):
+        with self._lock:
+            self.db_reads += 1
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(SELECT_PREDICTIONS_SQL, (tickers,))
+                    rows = cursor.fetchall()
+                finally:
+                    cursor.close()
+        except Exception as e:
+            with self._lock:
+                self.db_errors += 1
+            print(f"Forecast lookup error: {e}")
+            return {}
+
+        stored = {}
+        for (symbol, horizon, target_date, price, version, trained_at, generated_at,
+             lower, upper, confidence) in rows:
+            entry = stored.setdefault(symbol, {
+                "prices": [], "dates": [],
+                "bands": {"lower": [], "upper": [], "confidence": []},
+                "model_version": version,
+                "model_trained_at": format_timestamp(trained_at),
+                "generated_at": format_timestamp(generated_at),
+            })
+            # Only a gap-free prefix of horizons is usable
+            if horizon != len(entry["prices"]) + 1:
+                continue
+            entry["prices"].append(float(price))
+            entry["dates"].append(target_date.isoformat())
+            if entry["bands"] is not None and None in (lower, upper, confidence):
+                entry["bands"] = None
+            elif entry["bands"] is not None:
+                entry["bands"]["lower"].append(float(lower))
+                entry["bands"]["upper"].append(float(upper))
+                entry["bands"]["confidence"].append(float(confidence))
+        return stored
+
+    def stats(self):
+        cache = self.cache.stats()
+        with self._lock:
+            return {
+                "cache_hits": cache["hits"],
+                "cache_misses": cache["misses"],
+                "cache_size": cache["size"],
+                "db_reads": self.db_reads,
+                "db_errors": self.db_errors,
+                "stale": self.stale,
+            }
+
+
+def main(argv=None):
+    from src.db import pool_from_env
+    from src.ml.registry import ModelRegistry
+    from src.stocks.store import PriceStore
+
+    parser = argparse.ArgumentParser(description="Regenerate stored forecasts")
+    parser.add_argument("symbols", nargs="*", help="symbols to forecast (default: all published models)")
+    parser.add_argument("--days", type=int, default=30, help="forecast horizon in days")
+    parser.add_argument("--paths", type=int, default=CONFIDENCE_PATHS,
+                        help="simulated paths behind the confidence bands (0 to skip)")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    registry = ModelRegistry(os.getenv('MODEL_DIR', 'data/models'))
+    store = PriceStore(os.getenv('PRICE_STORE_DIR', 'data/price_store'))
+    pool = pool_from_env(minconn=0, maxconn=1)
+    try:
+        generate_forecasts(pool, registry, store, args.symbols or None, days=args.days, paths=args.paths)
+    finally:
+        pool.close_all()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
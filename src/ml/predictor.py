@@ -0,0 +1,516 @@
+"""
+Per-symbol stock price predictor.
+
+A linear model over scale-free technical features (recent log returns,
+moving-average gaps, RSI, MACD, volatility) predicts the next day's log
+return. Multi-day forecasts apply it recursively: each step appends the
+predicted close and advances the EMA/RSI state by one day. forecast_many
+does this for many models at once, with one stacked matrix product per day.
+
+Confidence bands come from the same engine: simulate_paths runs thousands
+of copies of one forecast side by side, each step shocked with a residual
+drawn from the model's own in-sample errors, and the bands are quantiles
+across the simulated paths.
+
+Weights are fitted with mini-batch gradient descent on standardized
+features, so the fitted scaler and weights can be saved, reloaded and
+fine-tuned later. Everything is NumPy; there is no deep learning dependency.
+"""
+import io
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.stocks.indicators import (
+    MACD_FAST, MACD_SLOW, RSI_PERIOD, compute_indicators, rolling_mean,
+)
+
+REQUIRED_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+MODEL_FEATURES = ['RETURN_1', 'RETURN_5', 'MA_7_GAP', 'MA_30_GAP', 'RSI', 'MACD', 'VOLATILITY']
+
+MIN_TRAINING_ROWS = 20       # complete feature rows needed to fit
+HISTORY_WINDOW = 120         # closes used when forecasting recursively
+MAX_DAILY_RETURN = 0.08      # predicted moves are clipped to this (log return)
+L2_PENALTY = 1e-3
+FEATURE_CLIP = 4.0           # standardized inputs are clipped to +/- this
+RESIDUAL_SAMPLE = 500        # recent in-sample residuals kept for bootstrapping
+CONFIDENCE_PATHS = 2000      # simulated paths behind predict_with_confidence
+CONFIDENCE_INTERVAL = 0.9    # central share of simulated paths inside the bands
+CONFIDENCE_TOLERANCE = 0.02  # "confidence" = share of paths within this of the prediction
+
+
+def feature_matrix(closes):
+    """
+    Model inputs for every close, shape (len(closes), len(MODEL_FEATURES)).
+    Rows without enough history contain NaN.
+    """
+    closes = np.asarray(closes, dtype=float)
+    n = len(closes)
+    logs = np.log(closes)
+    indicators, _ = compute_indicators(closes, n)
+
+    returns = np.full(n, np.nan)
+    returns[1:] = np.diff(logs)
+    returns_5 = np.full(n, np.nan)
+    returns_5[5:] = logs[5:] - logs[:-5]
+
+    volatility = np.full(n, np.nan)
+    if n > 10:
+        window = np.lib.stride_tricks.sliding_window_view(returns[1:], 10)
+        volatility[10:] = window.std(axis=1)
+
+    return np.column_stack([
+        returns,
+        returns_5,
+        rolling_mean(closes, 7) / closes - 1.0,
+        rolling_mean(closes, 30) / closes - 1.0,
+        (indicators['rsi'] - 50.0) / 50.0,
+        indicators['macd'] / closes,
+        volatility,
+    ])
+
+
+class StockPredictor:
+    """Linear next-day return model with recursive multi-day forecasts"""
+
+    def __init__(self, learning_rate=0.05, batch_size=32, seed=42):
+        self.learning_rate = learning_rate
+        self.batch_size = batch_size
+        self.seed = seed
+
+        self.weights = None
+        self.bias = 0.0
+        self.feature_mean = None
+        self.feature_std = None
+        self.target_scale = 1.0
+        self.residual_std = 0.0
+        self.residuals = None        # recent in-sample residuals (log returns)
+        self.price_min = None
+        self.price_max = None
+
+        self.trained_at = None
+        self.last_date = None
+        self.training_rows = 0
+        self.history = None          # trailing closes seen in training
+
+    @property
+    def is_trained(self):
+        return self.weights is not None
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the fitted model"""
+        arrays = (self.weights, self.feature_mean, self.feature_std, self.history, self.residuals)
+        return 1024 + sum(a.nbytes for a in arrays if a is not None)
+
+    # ------------------------------------------------------------------
+    # Data preparation
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def validate(data):
+        """Reject empty frames and frames missing OHLCV columns"""
+        if data is None or len(data) == 0:
+            raise ValueError("No price data provided")
+        missing = [c for c in REQUIRED_COLUMNS if c not in data.columns]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        closes = data['Close'].to_numpy(dtype=float)
+        if not np.isfinite(closes).all() or (closes <= 0).any():
+            raise ValueError("Close prices must be positive numbers")
+        return data
+
+    def normalize_data(self, data):
+        """Min-max scale OHLC columns to [0, 1] (training range once fitted)"""
+        normalized = data.copy()
+        prices = data[[c for c in PRICE_COLUMNS if c in data.columns]].to_numpy(dtype=float)
+        low = self.price_min if self.price_min is not None else np.nanmin(prices)
+        high = self.price_max if self.price_max is not None else np.nanmax(prices)
+        span = (high - low) or 1.0
+        for column in PRICE_COLUMNS:
+            if column in normalized.columns:
+                normalized[column] = ((normalized[column] - low) / span).clip(0.0, 1.0)
+        return normalized
+
+    def extract_features(self, data):
+        """Technical indicators (MA_7, MA_30, RSI, MACD) plus the model inputs"""
+        self.validate(data)
+        closes = data['Close'].to_numpy(dtype=float)
+        indicators, _ = compute_indicators(closes, len(closes))
+
+        features = pd.DataFrame(feature_matrix(closes), index=data.index, columns=MODEL_FEATURES)
+        features.insert(0, 'MA_7', rolling_mean(closes, 7))
+        features.insert(1, 'MA_30', rolling_mean(closes, 30))
+        features['RSI'] = indicators['rsi']
+        features['MACD'] = indicators['macd']
+        return features
+
+    @staticmethod
+    def training_set(closes):
+        """(features, next-day log return) for rows with complete features"""
+        closes = np.asarray(closes, dtype=float)
+        features = feature_matrix(closes)[:-1]
+        targets = np.diff(np.log(closes))
+        complete = ~np.isnan(features).any(axis=1)
+        return features[complete], targets[complete]
+
+    # ------------------------------------------------------------------
+    # Training
+    # ------------------------------------------------------------------
+
+    def train(self, data, epochs=10):
+        """Fit scaler and weights from scratch on OHLCV history"""
+        self.validate(data)
+        closes = data['Close'].to_numpy(dtype=float)
+        features, targets = self.training_set(closes)
+        self.fit(features, targets, epochs)
+
+        prices = data[PRICE_COLUMNS].to_numpy(dtype=float)
+        self.record_training(
+            closes, pd.Timestamp(data.index[-1]).date(),
+            float(prices.min()), float(prices.max()),
+        )
+        return self
+
+    def fit(self, features, targets, epochs=10):
+        """Fit scaler and weights from scratch on a prepared training set"""
+        if len(features) < MIN_TRAINING_ROWS:
+            raise ValueError(
+                f"Need at least {MIN_TRAINING_ROWS} complete rows to train, got {len(features)}"
+            )
+
+        self.feature_mean = features.mean(axis=0)
+        std = features.std(axis=0)
+        self.feature_std = np.where(std > 1e-12, std, 1.0)
+        self.target_scale = float(targets.std()) or 1.0
+        self.weights = np.zeros(features.shape[1])
+        self.bias = float(targets.mean()) / self.target_scale
+
+        residuals = self._fit(features, targets, epochs)
+        self.residual_std = float(residuals.std())
+        self.residuals = residuals[-RESIDUAL_SAMPLE:]
+        return self
+
+    def record_training(self, closes, last_date, price_min, price_max, rows=None):
+        """Set the training window metadata after fit()"""
+        self.price_min, self.price_max = price_min, price_max
+        self.training_rows = len(closes) if rows is None else rows
+        self._remember(last_date, closes)
+
+    def update(self, new_data, epochs=5):
+        """
+        Warm-start fine-tuning on rows after last_date. The fitted scaler
+        and weights are kept; the saved trailing closes supply feature
+        context, so the cost depends only on the number of new rows.
+        """
+        if not self.is_trained:
+            return self.train(new_data, epochs=epochs)
+        self.validate(new_data)
+        if self.last_date is not None:
+            dates = pd.DatetimeIndex(new_data.index).date
+            new_data = new_data[dates > self.last_date]
+        if len(new_data) == 0:
+            return self
+
+        new_closes = new_data['Close'].to_numpy(dtype=float)
+        closes = np.concatenate([self.history, new_closes])
+        features = feature_matrix(closes)[:-1]
+        targets = np.diff(np.log(closes))
+        # Sample i predicts close i+1; keep those whose target is a new close
+        first = len(self.history) - 1
+        features, targets = features[first:], targets[first:]
+        complete = ~np.isnan(features).any(axis=1)
+        features, targets = features[complete], targets[complete]
+
+        if len(features):
+            residuals = self._fit(features, targets, epochs)
+            old_weight = self.training_rows / (self.training_rows + len(features))
+            self.residual_std = float(np.sqrt(
+                old_weight * self.residual_std ** 2 + (1 - old_weight) * residuals.std() ** 2
+            ))
+            if self.residuals is not None:
+                residuals = np.concatenate([self.residuals, residuals])
+            self.residuals = residuals[-RESIDUAL_SAMPLE:]
+
+        prices = new_data[PRICE_COLUMNS].to_numpy(dtype=float)
+        self.price_min = min(self.price_min, float(prices.min()))
+        self.price_max = max(self.price_max, float(prices.max()))
+        self.training_rows += len(new_closes)
+        self._remember(pd.Timestamp(new_data.index[-1]).date(), closes)
+        return self
+
+    def _fit(self, features, targets, epochs):
+        """
+        Mini-batch gradient descent on squared error with L2 shrinkage,
+        starting from the current weights. Returns the residuals.
+        """
+        x = self._standardize(features)
+        y = targets / self.target_scale
+        rng = np.random.default_rng(self.seed)
+
+        for _ in range(max(1, int(epochs))):
+            order = rng.permutation(len(x))
+            for start in range(0, len(order), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                error = x[batch] @ self.weights + self.bias - y[batch]
+                gradient = x[batch].T @ error / len(batch) + L2_PENALTY * self.weights
+                # Normalized step: stays stable when new data sits far from the scaler's range
+                energy = float((x[batch] ** 2).sum(axis=1).mean()) / x.shape[1]
+                step = self.learning_rate / max(1.0, energy)
+                self.weights -= step * gradient
+                self.bias -= step * float(error.mean())
+
+        return targets - self._predict_returns(features)
+
+    def _remember(self, last_date, closes):
+        self.trained_at = datetime.utcnow()
+        self.last_date = last_date
+        self.history = np.array(closes[-HISTORY_WINDOW:], dtype=float)
+
+    # ------------------------------------------------------------------
+    # Prediction
+    # ------------------------------------------------------------------
+
+    def _standardize(self, features):
+        x = (features - self.feature_mean) / self.feature_std
+        return np.clip(x, -FEATURE_CLIP, FEATURE_CLIP)
+
+    def _predict_returns(self, features):
+        x = self._standardize(features)
+        returns = (x @ self.weights + self.bias) * self.target_scale
+        return np.clip(returns, -MAX_DAILY_RETURN, MAX_DAILY_RETURN)
+
+    def forecast(self, closes, days):
+        """Predicted closes for the next `days` days after `closes`"""
+        return forecast_many([self], [closes], days)[0]
+
+    def predict(self, data, days=7):
+        """Predicted closes (list of floats) for `days` days after data"""
+        self.validate(data)
+        return self.forecast(data['Close'].to_numpy(dtype=float), days).tolist()
+
+    def predict_with_confidence(self, data, days=7, paths=CONFIDENCE_PATHS,
+                                interval=CONFIDENCE_INTERVAL, seed=None):
+        """
+        Predicted closes with Monte Carlo bands for `days` days after data:
+        [{"day", "predicted_price", "lower", "upper", "confidence"}, ...]
+        """
+        self.validate(data)
+        closes = data['Close'].to_numpy(dtype=float)
+        bands = confidence_bands(
+            simulate_paths(self, closes, days, paths, np.random.default_rng(seed)), interval,
+        )
+        return [
+            {
+                'day': day + 1,
+                'predicted_price': float(bands['predicted'][day]),
+                'lower': float(bands['lower'][day]),
+                'upper': float(bands['upper'][day]),
+                'confidence': float(bands['confidence'][day]),
+            }
+            for day in range(days)
+        ]
+
+    def sample_residuals(self, rng, shape):
+        """Bootstrapped one-day shocks; Gaussian for models saved without residuals"""
+        if self.residuals is not None and len(self.residuals):
+            return rng.choice(self.residuals, size=shape)
+        return rng.normal(0.0, self.residual_std, size=shape)
+
+    def get_feature_importance(self):
+        """Share of the standardized weight magnitude per model feature"""
+        if not self.is_trained:
+            raise RuntimeError("Model has not been trained")
+        magnitude = np.abs(self.weights)
+        total = magnitude.sum() or 1.0
+        return {name: float(m / total) for name, m in zip(MODEL_FEATURES, magnitude)}
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def metadata(self):
+        return {
+            'trained_at': self.trained_at.isoformat() + 'Z' if self.trained_at else None,
+            'last_date': self.last_date.isoformat() if self.last_date else None,
+            'training_rows': self.training_rows,
+            'residual_std': self.residual_std,
+            'features': MODEL_FEATURES,
+        }
+
+    def to_bytes(self):
+        """Serialize the fitted model as an .npz archive"""
+        if not self.is_trained:
+            raise RuntimeError("Model has not been trained")
+        params = {
+            'learning_rate': self.learning_rate, 'batch_size': self.batch_size, 'seed': self.seed,
+            'bias': self.bias, 'target_scale': self.target_scale,
+            'price_min': self.price_min, 'price_max': self.price_max,
+            **self.metadata(),
+        }
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            weights=self.weights, feature_mean=self.feature_mean,
+            feature_std=self.feature_std, history=self.history,
+            residuals=self.residuals if self.residuals is not None else np.empty(0),
+            params=np.frombuffer(json.dumps(params).encode(), dtype=np.uint8),
+        )
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, payload):
+        with np.load(io.BytesIO(payload)) as archive:
+            params = json.loads(archive['params'].tobytes().decode())
+            if params.get('features') != MODEL_FEATURES:
+                raise ValueError("Saved model uses a different feature set")
+            model = cls(params['learning_rate'], params['batch_size'], params['seed'])
+            model.weights = archive['weights']
+            model.feature_mean = archive['feature_mean']
+            model.feature_std = archive['feature_std']
+            model.history = archive['history']
+            if 'residuals' in archive.files and len(archive['residuals']):
+                model.residuals = archive['residuals']
+
+        model.bias = params['bias']
+        model.target_scale = params['target_scale']
+        model.residual_std = params['residual_std']
+        model.price_min, model.price_max = params['price_min'], params['price_max']
+        model.training_rows = params['training_rows']
+        if params['trained_at']:
+            model.trained_at = datetime.fromisoformat(params['trained_at'].rstrip('Z'))
+        if params['last_date']:
+            model.last_date = datetime.fromisoformat(params['last_date']).date()
+        return model
+
+
+def forecast_many(predictors, windows, days):
+    """
+    Forecasts for several trained models at once, shape (len(predictors), days).
+
+    windows holds each model's recent closes (its saved history is used to
+    fill in short windows). Indicator state is computed once per window and
+    then advanced for every model together, so each forecast day is a
+    handful of array operations regardless of the number of models.
+    """
+    count = len(predictors)
+    if any(not p.is_trained for p in predictors):
+        raise RuntimeError("Model has not been trained")
+    if count == 0 or days <= 0:
+        return np.empty((count, max(days, 0)))
+
+    buffer, state = _start_paths(predictors, windows, days)
+    return _advance_paths(buffer, state, _stack_params(predictors), days)
+
+
+def simulate_paths(predictor, closes, days, paths, rng):
+    """
+    Residual-bootstrapped forecasts, shape (paths + 1, days). Row 0 is the
+    unshocked forecast; every other row adds a resampled model residual to
+    each day's predicted return. All paths advance together, one vectorized
+    step per day.
+    """
+    if not predictor.is_trained:
+        raise RuntimeError("Model has not been trained")
+    if days <= 0:
+        return np.empty((paths + 1, 0))
+
+    buffer, state = _start_paths([predictor], [closes], days)
+    shocks = np.zeros((paths + 1, days))
+    shocks[1:] = predictor.sample_residuals(rng, (paths, days))
+    return _advance_paths(
+        np.repeat(buffer, paths + 1, axis=0), np.repeat(state, paths + 1, axis=0),
+        _stack_params([predictor]), days, shocks,
+    )
+
+
+def confidence_bands(paths, interval=CONFIDENCE_INTERVAL):
+    """
+    Per-day bands from simulate_paths output: the unshocked prediction,
+    the central `interval` quantile range, and the share of simulated
+    paths within CONFIDENCE_TOLERANCE of the prediction (0..1).
+    """
+    predicted, simulated = paths[0], paths[1:]
+    tail = (1.0 - interval) / 2.0
+    lower, upper = np.quantile(simulated, [tail, 1.0 - tail], axis=0)
+    near = np.abs(simulated / predicted - 1.0) <= CONFIDENCE_TOLERANCE
+    return {
+        'predicted': predicted,
+        'lower': lower,
+        'upper': upper,
+        'confidence': near.mean(axis=0),
+    }
+
+
+def _start_paths(predictors, windows, days):
+    """NaN-padded close buffer and indicator state for each window"""
+    count = len(predictors)
+    buffer = np.full((count, HISTORY_WINDOW + days), np.nan)
+    state = np.empty((count, 5))      # ema_fast, ema_slow, avg_gain, avg_loss, observations
+    for i, (predictor, closes) in enumerate(zip(predictors, windows)):
+        window = np.asarray(closes, dtype=float)[-HISTORY_WINDOW:]
+        if len(window) < 31 and predictor.history is not None:
+            window = np.concatenate([predictor.history, window])[-HISTORY_WINDOW:]
+        buffer[i, HISTORY_WINDOW - len(window):HISTORY_WINDOW] = window
+        _, s = compute_indicators(window, len(window))
+        state[i] = s['ema_fast'], s['ema_slow'], s['avg_gain'], s['avg_loss'], s['count']
+    return buffer, state
+
+
+def _stack_params(predictors):
+    return {
+        'weights': np.stack([p.weights for p in predictors]),
+        'bias': np.array([p.bias for p in predictors]),
+        'mean': np.stack([p.feature_mean for p in predictors]),
+        'std': np.stack([p.feature_std for p in predictors]),
+        'scale': np.array([p.target_scale for p in predictors]),
+    }
+
+
+def _advance_paths(buffer, state, params, days, shocks=None):
+    """
+    Extend every row of buffer by `days` predicted closes. params rows
+    match the buffer rows or are a single row shared by all of them.
+    """
+    weights, bias, mean, std, scale = (
+        params['weights'], params['bias'], params['mean'], params['std'], params['scale'],
+    )
+    fast_alpha, slow_alpha = 2.0 / (MACD_FAST + 1), 2.0 / (MACD_SLOW + 1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for step in range(days):
+            end = HISTORY_WINDOW + step
+            last = buffer[:, end - 1]
+            logs = np.log(buffer[:, end - 11:end])
+            rsi = np.where(state[:, 3] == 0, 100.0, 100.0 - 100.0 / (1.0 + state[:, 2] / state[:, 3]))
+            features = np.column_stack([
+                logs[:, -1] - logs[:, -2],
+                logs[:, -1] - logs[:, -6],
+                buffer[:, end - 7:end].mean(axis=1) / last - 1.0,
+                buffer[:, end - 30:end].mean(axis=1) / last - 1.0,
+                np.where(state[:, 4] > RSI_PERIOD, (rsi - 50.0) / 50.0, np.nan),
+                np.where(state[:, 4] >= MACD_SLOW, (state[:, 0] - state[:, 1]) / last, np.nan),
+                np.diff(logs, axis=1).std(axis=1),
+            ])
+            features = np.where(np.isnan(features), mean, features)
+
+            x = np.clip((features - mean) / std, -FEATURE_CLIP, FEATURE_CLIP)
+            returns = np.clip(((x * weights).sum(axis=1) + bias) * scale,
+                              -MAX_DAILY_RETURN, MAX_DAILY_RETURN)
+            if shocks is not None:
+                returns = returns + shocks[:, step]
+            new = last * np.exp(returns)
+            buffer[:, end] = new
+
+            change = new - last
+            state[:, 0] += fast_alpha * (new - state[:, 0])
+            state[:, 1] += slow_alpha * (new - state[:, 1])
+            state[:, 2] += (np.maximum(change, 0.0) - state[:, 2]) / RSI_PERIOD
+            state[:, 3] += (np.maximum(-change, 0.0) - state[:, 3]) / RSI_PERIOD
+            state[:, 4] += 1
+
+    return buffer[:, HISTORY_WINDOW:]
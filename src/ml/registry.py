@@ -0,0 +1,228 @@
+"""
+Versioned on-disk registry of trained per-symbol models.
+
+Layout:
+
+    <root>/LMT/v000003.npz      serialized StockPredictor
+    <root>/LMT/current.json     {"version": 3, "file": "v000003.npz", ...metadata}
+
+Publishing writes the new model file, then atomically replaces current.json,
+so readers never see a half-written model. Workers load models lazily on
+first use and keep the most recently used ones in memory, bounded by both a
+model count and a byte budget. A cached model is re-checked against
+current.json every `check_interval` seconds and replaced in place when a
+newer version has been published, without a restart. Symbols without a
+published model are re-checked on the same interval, not on every call.
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+
+from src.ml.predictor import StockPredictor
+from src.stocks.cache import SingleFlight
+
+KEEP_VERSIONS = 3    # older model files are deleted on publish
+MAX_ABSENT = 1024    # symbols remembered as having no published model
+
+
+class ModelRegistry:
+    """Per-symbol model versions on disk with an in-memory LRU"""
+
+    def __init__(self, root, max_models=32, memory_budget=64 * 1024 * 1024, check_interval=5.0):
+        self.root = root
+        self.max_models = max_models
+        self.memory_budget = memory_budget
+        self.check_interval = check_interval
+
+        self._models = OrderedDict()   # symbol -> [version, checked_at, predictor, meta]
+        self._absent = OrderedDict()   # symbol -> checked_at, for symbols with no model
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.swaps = 0
+        self.evictions = 0
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get(self, symbol):
+        """(predictor, metadata) for symbol's current version, or (None, None)"""
+        symbol = symbol.upper()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._models.get(symbol)
+            if entry:
+                self._models.move_to_end(symbol)
+                if now - entry[1] < self.check_interval:
+                    self.hits += 1
+                    return entry[2], entry[3]
+            else:
+                checked_at = self._absent.get(symbol)
+                if checked_at is not None and now - checked_at < self.check_interval:
+                    self.misses += 1
+                    return None, None
+
+        meta = self.current(symbol)
+        if meta is None:
+            if entry:
+                self.evict(symbol)
+            with self._lock:
+                self.misses += 1
+                self._absent[symbol] = now
+                self._absent.move_to_end(symbol)
+                if len(self._absent) > MAX_ABSENT:
+                    self._absent.popitem(last=False)
+            return None, None
+
+        if entry and entry[0] == meta['version']:
+            with self._lock:
+                entry[1] = now
+                self.hits += 1
+            return entry[2], entry[3]
+
+        with self._lock:
+            self.misses += 1
+        return self._flight.do(symbol, lambda: self._load(symbol, meta))
+
+    def current(self, symbol):
+        """Metadata of the published version, or None"""
+        try:
+            with open(os.path.join(self.root, symbol.upper(), 'current.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def symbols(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, 'current.json'))
+        )
+
+    def _load(self, symbol, meta):
+        with self._lock:
+            entry = self._models.get(symbol)
+            if entry and entry[0] == meta['version']:
+                return entry[2], entry[3]
+
+        with open(os.path.join(self.root, symbol, meta['file']), 'rb') as f:
+            predictor = StockPredictor.from_bytes(f.read())
+
+        with self._lock:
+            previous = self._models.pop(symbol, None)
+            if previous:
+                self._bytes -= previous[2].nbytes
+                self.swaps += 1
+            self._models[symbol] = [meta['version'], time.monotonic(), predictor, meta]
+            self._bytes += predictor.nbytes
+            self.loads += 1
+            self._evict_over_budget()
+        return predictor, meta
+
+    def _evict_over_budget(self):
+        # Never evict the entry just inserted (the last one)
+        while len(self._models) > 1 and (
+            len(self._models) > self.max_models or self._bytes > self.memory_budget
+        ):
+            _, entry = self._models.popitem(last=False)
+            self._bytes -= entry[2].nbytes
+            self.evictions += 1
+
+    def evict(self, symbol):
+        with self._lock:
+            entry = self._models.pop(symbol.upper(), None)
+            if entry:
+                self._bytes -= entry[2].nbytes
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def publish(self, symbol, predictor, metrics=None):
+        """
+        Save predictor as symbol's next version and make it current.
+        Returns the metadata written to current.json.
+        """
+        symbol = symbol.upper()
+        payload = predictor.to_bytes()
+        directory = os.path.join(self.root, symbol)
+        os.makedirs(directory, exist_ok=True)
+
+        with self._writer_lock(directory):
+            previous = self.current(symbol)
+            version = (previous['version'] if previous else 0) + 1
+            filename = f'v{version:06d}.npz'
+
+            tmp = os.path.join(directory, filename + '.tmp')
+            with open(tmp, 'wb') as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, os.path.join(directory, filename))
+
+            meta = {
+                'symbol': symbol,
+                'version': version,
+                'file': filename,
+                'published_at': datetime.utcnow().isoformat() + 'Z',
+                'size_bytes': len(payload),
+                'metrics': metrics or {},
+                **predictor.metadata(),
+            }
+            tmp = os.path.join(directory, 'current.json.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(meta, f)
+            os.replace(tmp, os.path.join(directory, 'current.json'))
+
+            self._prune(directory, version)
+
+        # Readers in this process see the new version immediately
+        with self._lock:
+            self._absent.pop(symbol, None)
+            entry = self._models.get(symbol)
+            if entry:
+                entry[1] = float('-inf')
+        return meta
+
+    def _prune(self, directory, version):
+        for name in os.listdir(directory):
+            if name.startswith('v') and name.endswith('.npz'):
+                try:
+                    if int(name[1:-4]) <= version - KEEP_VERSIONS:
+                        os.remove(os.path.join(directory, name))
+                except (ValueError, OSError):
+                    pass
+
+    @contextmanager
+    def _writer_lock(self, directory):
+        with open(os.path.join(directory, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "loaded": len(self._models),
+                "max_models": self.max_models,
+                "bytes": self._bytes,
+                "memory_budget": self.memory_budget,
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+                "swaps": self.swaps,
+                "evictions": self.evictions,
+            }
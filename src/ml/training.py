@@ -0,0 +1,334 @@
+"""
+Train per-symbol models and publish them to the registry.
+
+Full training reads each symbol's history from the price store and trains
+symbols in parallel on a process pool. The parent builds every training
+set once and packs them into a single shared-memory block; workers attach to
+it and train on zero-copy views, then publish their model to the registry
+directly. Concurrency is the smaller of the CPU count and what fits in the
+memory budget (per-worker overhead plus the largest training set).
+
+The nightly update instead fine-tunes each published model on only the
+prices rows after its last training date, and reports the time saved
+compared with retraining from scratch (estimated from the model's last full
+training, scaled by row count). Stored forecasts are then regenerated so
+they use the new model versions.
+
+Usage:
+    python -m src.ml.training                   # full training, every stored symbol
+    python -m src.ml.training LMT RTX --epochs 20 --workers 2
+    python -m src.ml.training --memory-mb 1024  # cap concurrency by memory
+    python -m src.ml.training --update          # nightly warm-start update of every model
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+
+from src.ml.predictor import HISTORY_WINDOW, MODEL_FEATURES, StockPredictor
+from src.ml.registry import ModelRegistry
+from src.stocks.store import PriceStore
+
+WORKER_BASE_BYTES = 128 * 1024 * 1024   # interpreter, NumPy and pandas per worker process
+WORKER_COPIES = 3                        # standardized copy and gradient temporaries per training set
+
+SELECT_NEW_PRICES_SQL = """
+    SELECT price_date, open_price, high_price, low_price, close_price, volume
+    FROM prices
+    WHERE symbol = %s AND price_date > %s
+    ORDER BY price_date
+"""
+
+
+def series_to_frame(series):
+    """OHLCV DataFrame indexed by Date from a PriceSeries"""
+    return pd.DataFrame({
+        'Open': series.open, 'High': series.high, 'Low': series.low,
+        'Close': series.close, 'Volume': series.volume,
+    }, index=pd.DatetimeIndex(series.dates, name='Date'))
+
+
+def rows_to_frame(rows):
+    """OHLCV DataFrame indexed by Date from prices rows"""
+    frame = pd.DataFrame(
+        [(d, float(o), float(h), float(l), float(c), v or 0) for d, o, h, l, c, v in rows],
+        columns=['Date', 'Open', 'High', 'Low', 'Close', 'Volume'],
+    )
+    frame['Date'] = pd.to_datetime(frame['Date'])
+    return frame.set_index('Date')
+
+
+class TrainingResult:
+    """Outcome of training one symbol"""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.rows = 0
+        self.samples = 0
+        self.version = None
+        self.seconds = 0.0
+        self.pid = None
+        self.error = None
+
+    def __repr__(self):
+        if self.error:
+            return f"{self.symbol}: FAILED ({self.error})"
+        return (
+            f"{self.symbol}: v{self.version}, {self.samples} samples from {self.rows} rows "
+            f"in {self.seconds:.2f}s (pid {self.pid})"
+        )
+
+
+def plan_workers(task_bytes, workers=None, memory_budget=None):
+    """Worker processes to run: CPU count, capped by memory budget and task count"""
+    limit = workers or os.cpu_count() or 1
+    if memory_budget:
+        per_worker = WORKER_BASE_BYTES + WORKER_COPIES * max(task_bytes, default=0)
+        limit = min(limit, memory_budget // per_worker)
+    return max(1, min(limit, len(task_bytes)))
+
+
+def train_many(store, registry_root, symbols=None, epochs=10, workers=None,
+               memory_budget=None, report=print):
+    """
+    Train symbols from the price store in parallel and publish each model.
+    Returns the list of TrainingResult.
+    """
+    started = time.perf_counter()
+    results, tasks, blocks = [], [], []
+    offset = 0
+    width = len(MODEL_FEATURES)
+
+    for symbol in [s.upper() for s in (symbols or store.symbols())]:
+        series = store.series(symbol)
+        if series is None or len(series) == 0:
+            result = TrainingResult(symbol)
+            result.error = "no stored prices"
+            results.append(result)
+            continue
+        closes = np.asarray(series.close, dtype=float)
+        features, targets = StockPredictor.training_set(closes)
+        tasks.append({
+            'symbol': symbol,
+            'offset': offset,
+            'samples': len(targets),
+            'rows': len(closes),
+            'history': closes[-HISTORY_WINDOW:].copy(),
+            'last_date': series.dates[-1].astype(object),
+            'price_min': float(min(series.low.min(), series.close.min())),
+            'price_max': float(max(series.high.max(), series.close.max())),
+        })
+        blocks.append((features, targets))
+        offset += len(targets) * (width + 1)
+
+    if tasks:
+        shm = shared_memory.SharedMemory(create=True, size=max(8, offset * 8))
+        try:
+            buffer = np.ndarray((offset,), dtype=np.float64, buffer=shm.buf)
+            for task, (features, targets) in zip(tasks, blocks):
+                start, n = task['offset'], task['samples']
+                buffer[start:start + n * width] = features.ravel()
+                buffer[start + n * width:start + n * (width + 1)] = targets
+            del buffer, blocks
+
+            count = plan_workers(
+                [t['samples'] * (width + 1) * 8 for t in tasks], workers, memory_budget,
+            )
+            report(f"Training {len(tasks)} symbols on {count} worker processes")
+            with ProcessPoolExecutor(max_workers=count) as executor:
+                futures = {
+                    executor.submit(_train_worker, shm.name, offset, task, registry_root, epochs):
+                        task['symbol']
+                    for task in tasks
+                }
+                for future in as_completed(futures):
+                    try:
+                        result = future.result()
+                    except Exception as e:   # worker process died
+                        result = TrainingResult(futures[future])
+                        result.error = str(e) or type(e).__name__
+                    results.append(result)
+                    report(repr(result))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    elapsed = time.perf_counter() - started
+    failed = [r.symbol for r in results if r.error]
+    busy = sum(r.seconds for r in results)
+    report(
+        f"Trained {len(results) - len(failed)}/{len(results)} symbols in {elapsed:.2f}s "
+        f"({busy:.2f}s of training, {busy / elapsed if elapsed else 0:.1f}x parallel)"
+    )
+    if failed:
+        report(f"Failed: {', '.join(sorted(failed))}")
+    return results
+
+
+def _train_worker(shm_name, size, task, registry_root, epochs):
+    """Process pool entry point: train one symbol from the shared block"""
+    result = TrainingResult(task['symbol'])
+    result.pid = os.getpid()
+    result.rows = task['rows']
+    result.samples = task['samples']
+    started = time.perf_counter()
+    try:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        try:
+            buffer = np.ndarray((size,), dtype=np.float64, buffer=shm.buf)
+            width = len(MODEL_FEATURES)
+            start, n = task['offset'], task['samples']
+            features = buffer[start:start + n * width].reshape(n, width)
+            targets = buffer[start + n * width:start + n * (width + 1)]
+            predictor = StockPredictor().fit(features, targets, epochs)
+            del buffer, features, targets    # views must go before the block is closed
+        finally:
+            shm.close()
+
+        predictor.record_training(
+            task['history'], task['last_date'], task['price_min'], task['price_max'],
+            rows=task['rows'],
+        )
+        result.seconds = time.perf_counter() - started
+        meta = ModelRegistry(registry_root).publish(task['symbol'], predictor, metrics={
+            'train_seconds': round(result.seconds, 3),
+            'full_train_seconds': round(result.seconds, 3),
+            'full_train_rows': task['rows'],
+            'residual_std': predictor.residual_std,
+            'epochs': epochs,
+        })
+        result.version = meta['version']
+    except Exception as e:
+        result.error = str(e)
+        result.seconds = time.perf_counter() - started
+    return result
+
+
+def update_symbol(pool, registry, symbol, epochs=5):
+    """
+    Fine-tune symbol's published model on prices rows after its last
+    training date and publish the result as a new version.
+    Returns a report dict (new_rows == 0 means nothing was published).
+    """
+    current, meta = registry.get(symbol)
+    if current is None:
+        raise ValueError(f"No published model for {symbol}")
+    # The registry's instance may be serving requests; tune a private copy
+    predictor = StockPredictor.from_bytes(current.to_bytes())
+
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(SELECT_NEW_PRICES_SQL, (symbol, predictor.last_date))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+    report = {'symbol': symbol, 'new_rows': len(rows), 'version': meta['version'],
+              'update_seconds': 0.0, 'estimated_full_seconds': 0.0}
+    if not rows:
+        return report
+
+    started = time.perf_counter()
+    predictor.update(rows_to_frame(rows), epochs=epochs)
+    seconds = time.perf_counter() - started
+
+    metrics = meta.get('metrics', {})
+    full_seconds = metrics.get('full_train_seconds', 0.0)
+    full_rows = metrics.get('full_train_rows') or predictor.training_rows
+    estimated = full_seconds * predictor.training_rows / full_rows
+
+    published = registry.publish(symbol, predictor, metrics={
+        'train_seconds': round(seconds, 3),
+        'full_train_seconds': full_seconds,
+        'full_train_rows': full_rows,
+        'residual_std': predictor.residual_std,
+        'epochs': epochs,
+        'new_rows': len(rows),
+    })
+    report.update(
+        version=published['version'],
+        update_seconds=seconds,
+        estimated_full_seconds=estimated,
+    )
+    return report
+
+
+def update_all(pool, registry, symbols=None, epochs=5, report=print):
+    """Nightly job: warm-start update every published model"""
+    started = time.perf_counter()
+    results, failed = [], []
+    for symbol in symbols or registry.symbols():
+        try:
+            result = update_symbol(pool, registry, symbol.upper(), epochs=epochs)
+        except Exception as e:
+            failed.append(symbol.upper())
+            report(f"{symbol.upper()}: update error: {e}")
+            continue
+        results.append(result)
+        if result['new_rows']:
+            report(
+                f"{result['symbol']}: v{result['version']} +{result['new_rows']} rows "
+                f"in {result['update_seconds']:.3f}s (full retrain ~{result['estimated_full_seconds']:.3f}s)"
+            )
+        else:
+            report(f"{result['symbol']}: up to date")
+
+    spent = sum(r['update_seconds'] for r in results)
+    full = sum(r['estimated_full_seconds'] for r in results if r['new_rows'])
+    report(
+        f"Updated {sum(1 for r in results if r['new_rows'])}/{len(results) + len(failed)} models "
+        f"in {time.perf_counter() - started:.2f}s; training {spent:.2f}s vs ~{full:.2f}s "
+        f"for full retraining (saved ~{max(0.0, full - spent):.2f}s)"
+    )
+    return results, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train and publish per-symbol models")
+    parser.add_argument("symbols", nargs="*", help="symbols to train (default: all)")
+    parser.add_argument("--epochs", type=int, default=None,
+                        help="passes over the training data (default: 10, or 5 with --update)")
+    parser.add_argument("--update", action="store_true",
+                        help="fine-tune published models on new prices rows only")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="training processes (default: CPU count)")
+    parser.add_argument("--memory-mb", type=int, default=None,
+                        help="memory budget for training (default: TRAIN_MEMORY_MB)")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    model_dir = os.getenv('MODEL_DIR', 'data/models')
+    registry = ModelRegistry(model_dir)
+
+    if args.update:
+        from src.db import pool_from_env
+        pool = pool_from_env(minconn=0, maxconn=1)
+        try:
+            _, failed = update_all(pool, registry, args.symbols or None, epochs=args.epochs or 5)
+            from src.ml.forecasts import generate_forecasts
+            store = PriceStore(os.getenv('PRICE_STORE_DIR', 'data/price_store'))
+            generate_forecasts(pool, registry, store, args.symbols or None,
+                               days=int(os.getenv('FORECAST_DAYS', '30')))
+        finally:
+            pool.close_all()
+        return 1 if failed else 0
+
+    store = PriceStore(os.getenv('PRICE_STORE_DIR', 'data/price_store'))
+    memory_mb = args.memory_mb or int(os.getenv('TRAIN_MEMORY_MB', '2048'))
+    results = train_many(
+        store, model_dir, args.symbols or None,
+        epochs=args.epochs or 10,
+        workers=args.workers,
+        memory_budget=memory_mb * 1024 * 1024,
+    )
+    return 1 if any(r.error for r in results) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
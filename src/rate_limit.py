@@ -0,0 +1,263 @@
+"""
+Sliding-window rate limiting with pluggable storage.
+
+Each key keeps only two counters: hits in the current fixed window and hits in
+the previous one. The request rate is estimated as
+
+    previous * (1 - elapsed / window) + current
+
+which approximates a true sliding window in O(1) time and memory per key.
+
+Backends:
+- MemoryBackend:        per-process dict, idle keys swept periodically
+- SharedMemoryBackend:  fixed-size table in a memory-mapped file, shared by
+                        every worker process on the host
+- RedisBackend:         any Redis-compatible server, shared across hosts
+
+Use `rate_limit(limiter)` to guard a Flask view; blocked requests get a 429
+with a Retry-After header.
+"""
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify, request
+
+
+class MemoryBackend:
+    """In-process counters; keys idle for two windows are evicted"""
+
+    def __init__(self, sweep_interval=60.0):
+        self.sweep_interval = sweep_interval
+        self._counters = {}     # key -> [window_index, current, previous, window]
+        self._lock = threading.Lock()
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def hit(self, key, window, now):
+        """Count one hit and return (current, previous)"""
+        index = int(now // window)
+        with self._lock:
+            entry = self._counters.get(key)
+            if entry is None:
+                entry = self._counters[key] = [index, 0, 0, window]
+            _roll(entry, index)
+            entry[1] += 1
+            result = (entry[1], entry[2])
+
+            if time.monotonic() >= self._next_sweep:
+                self._sweep(now)
+        return result
+
+    def __len__(self):
+        return len(self._counters)
+
+    def _sweep(self, now):
+        self._next_sweep = time.monotonic() + self.sweep_interval
+        # A key whose last hit is two windows old contributes nothing anymore
+        stale = [
+            k for k, entry in self._counters.items()
+            if entry[0] < int(now // entry[3]) - 1
+        ]
+        for key in stale:
+            del self._counters[key]
+
+
+class SharedMemoryBackend:
+    """
+    Fixed-size open-addressing table in a memory-mapped file (e.g. under
+    /dev/shm) so every worker process on the machine sees the same counters.
+
+    Limiters with different window lengths can share one file: each slot
+    stores its own window length, so whether it went idle (and which probed
+    slot expires first, to be taken over when every one is busy) is judged
+    on the slot's clock, not the caller's. Memory use is constant. Updates
+    are serialized with an flock on the backing file.
+    """
+
+    HEADER = struct.Struct('<8sQ')     # layout tag, slot count
+    MAGIC = b'RLSHM\x00\x00\x02'
+    SLOT = struct.Struct('<QqIId')     # key hash, window index, current, previous, window seconds
+    PROBES = 8
+
+    def __init__(self, path, slots=65536):
+        self.path = path
+        self.slots = slots
+        size = self.HEADER.size + self.SLOT.size * slots
+
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._lock_file = None
+        self._lock_pid = None
+        self._thread_lock = threading.Lock()
+
+        # A file left behind by an older layout (or slot count) is reset
+        lock_file = self._process_lock_file()
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            if self.HEADER.unpack_from(self._map, 0) != (self.MAGIC, slots):
+                self._map[:] = bytes(size)
+                self.HEADER.pack_into(self._map, 0, self.MAGIC, slots)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def hit(self, key, window, now):
+        index = int(now // window)
+        digest = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+        with self._thread_lock:
+            lock_file = self._process_lock_file()
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                offset, entry = self._find_slot(digest, window, now)
+                _roll(entry, index)
+                entry[1] += 1
+                self.SLOT.pack_into(self._map, offset, digest, entry[0], entry[1], entry[2], window)
+                return entry[1], entry[2]
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def close(self):
+        self._map.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+
+    def _process_lock_file(self):
+        """
+        flock() locks belong to the open file description, which a forked
+        child shares with its parent, so each process opens its own.
+        """
+        if self._lock_pid != os.getpid():
+            self._lock_file = open(self.path, 'rb')
+            self._lock_pid = os.getpid()
+        return self._lock_file
+
+    def _find_slot(self, digest, window, now):
+        """Return (offset, [window index, current, previous]) for the key's slot"""
+        index = int(now // window)
+        start = digest % self.slots
+        victim = None
+
+        for probe in range(self.PROBES):
+            offset = self.HEADER.size + ((start + probe) % self.slots) * self.SLOT.size
+            slot_hash, slot_window, current, previous, slot_length = self.SLOT.unpack_from(self._map, offset)
+
+            if slot_hash == digest:
+                return offset, [slot_window, current, previous]
+            # A slot's hits stop counting once the window after its last one ends
+            expires = (slot_window + 2) * slot_length
+            if slot_hash == 0 or expires <= now:
+                # Empty, or owned by a key that has been idle long enough to forget
+                return offset, [index, 0, 0]
+            if victim is None or expires < victim[1]:
+                victim = (offset, expires)
+
+        return victim[0], [index, 0, 0]
+
+
+class RedisBackend:
+    """
+    Counters in a Redis-compatible server; one pipelined round trip per hit.
+    Keys expire on their own after two windows.
+    """
+
+    def __init__(self, url, prefix='rl'):
+        import redis   # optional dependency, only needed for this backend
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def hit(self, key, window, now):
+        index = int(now // window)
+        current_key = f"{self.prefix}:{key}:{index}"
+        previous_key = f"{self.prefix}:{key}:{index - 1}"
+
+        pipe = self.client.pipeline(transaction=False)
+        pipe.incr(current_key)
+        pipe.expire(current_key, int(math.ceil(window * 2)))
+        pipe.get(previous_key)
+        current, _, previous = pipe.execute()
+        return int(current), int(previous or 0)
+
+
+class RateLimiter:
+    """Allow at most `limit` hits per key in any `window`-second span"""
+
+    def __init__(self, backend, limit, window, scope='default'):
+        self.backend = backend
+        self.limit = limit
+        self.window = window
+        self.scope = scope
+
+    def hit(self, key):
+        """
+        Record a hit for key.
+        Returns (allowed, retry_after_seconds).
+        """
+        now = time.time()
+        current, previous = self.backend.hit(f"{self.scope}:{key}", self.window, now)
+
+        elapsed = now % self.window
+        weight = 1 - elapsed / self.window
+        estimate = previous * weight + current
+        if estimate <= self.limit:
+            return True, 0
+
+        # Time until the weighted previous window has decayed enough
+        if current > self.limit or previous == 0:
+            wait = self.window - elapsed
+        else:
+            wait = self.window * (1 - (self.limit - current) / previous) - elapsed
+        return False, max(1, int(math.ceil(wait)))
+
+
+def create_backend(kind='memory', shm_path=None, redis_url=None):
+    """Build a backend from configuration ('memory', 'shm' or 'redis')"""
+    if kind == 'memory':
+        return MemoryBackend()
+    if kind == 'shm':
+        return SharedMemoryBackend(shm_path or '/dev/shm/stock_predictor_ratelimit')
+    if kind == 'redis':
+        return RedisBackend(redis_url or 'redis://localhost:6379/0')
+    raise ValueError(f"Unknown rate limit backend: {kind}")
+
+
+def rate_limit(limiter, key_func=None):
+    """
+    Decorator for Flask views: answer 429 + Retry-After once the caller
+    (by default, the client IP) exceeds the limiter's budget.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            key = key_func() if key_func else (request.remote_addr or 'unknown')
+            allowed, retry_after = limiter.hit(key)
+            if not allowed:
+                response = jsonify({"error": "Too many requests. Please try again later."})
+                response.status_code = 429
+                response.headers['Retry-After'] = str(retry_after)
+                return response
+            return view(*args, **kwargs)
+        return wrapped
+    return decorator
+
+
+def _roll(entry, index):
+    """Advance [window, current, previous] to the given window index"""
+    if entry[0] == index:
+        return
+    if entry[0] == index - 1:
+        entry[2] = entry[1]
+    else:
+        entry[2] = 0
+    entry[0] = index
+    entry[1] = 0
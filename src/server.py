@@ -0,0 +1,157 @@
+"""
+Pre-fork production serving with gunicorn (settings in gunicorn.conf.py).
+
+The master imports app.py once (preload_app) and warms it before any worker
+is forked:
+
+- every published model is loaded into the registry and run once, so the
+  forecasting code paths are initialized
+- every stored symbol's price columns are memory-mapped and read through,
+  which pulls them into the page cache
+- optional encoders (pyarrow, msgpack) are imported if installed
+
+gc.freeze() then moves everything allocated so far into a permanent
+generation. The garbage collector in the workers never visits those objects,
+so it does not write to their pages, and the pages stay shared
+copy-on-write between all workers.
+
+Nothing warmed here opens a socket or starts a thread. Every worker still
+resets its database pool, bcrypt pool and audit writer after the fork, in
+case something did: threads and connections do not survive a fork. The
+metrics flusher, the health prober and the slow-query EXPLAIN worker notice
+the new pid and start lazily in each worker.
+
+Startup time and memory are logged: once for the master when it is warm,
+and once for each worker when it has booted. Memory is reported as RSS and
+as how much of it is still shared.
+"""
+import gc
+import importlib
+import os
+import time
+
+STARTED = time.monotonic()
+OPTIONAL_MODULES = ('pyarrow', 'msgpack')
+
+
+def default_workers(cpus=None):
+    """One worker per CPU (at least two); threads cover time spent waiting"""
+    return max(2, cpus or os.cpu_count() or 1)
+
+
+def configure_environment(workers):
+    """
+    Defaults that only make sense with several worker processes. Must run
+    before app.py is imported. Values already set (or in .env) win, except
+    that an empty METRICS_DIR is replaced.
+    """
+    from src.metrics import clear_directory
+
+    # Workers must share a metrics directory for /metrics to add them up
+    if not os.getenv('METRICS_DIR'):
+        shm = '/dev/shm' if os.path.isdir('/dev/shm') else '/tmp'
+        os.environ['METRICS_DIR'] = os.path.join(shm, 'stock_predictor_metrics')
+    clear_directory(os.environ['METRICS_DIR'])
+
+    # Each worker has its own bcrypt pool; together they should match the CPUs
+    os.environ.setdefault('BCRYPT_WORKERS', str(max(1, (os.cpu_count() or 1) // workers)))
+
+    if workers > 1 and os.getenv('RATE_LIMIT_BACKEND', 'memory') == 'memory':
+        print("Rate limits are per worker with RATE_LIMIT_BACKEND=memory; "
+              "use shm or redis to share them")
+
+
+def warm(app_module):
+    """Load what the workers will share; returns counts of what was warmed"""
+    registry = app_module.model_registry
+    models = 0
+    for symbol in registry.symbols()[:registry.max_models]:
+        predictor, _ = registry.get(symbol)
+        if predictor is None:
+            continue
+        predictor.forecast(predictor.history, 1)
+        models += 1
+
+    store = app_module.price_store
+    series = 0
+    for symbol in store.symbols():
+        columns = store.series(symbol)
+        if columns is None:
+            continue
+        for column in (columns.open, columns.high, columns.low, columns.close, columns.volume):
+            column.sum()
+        series += 1
+
+    modules = []
+    for name in OPTIONAL_MODULES:
+        try:
+            importlib.import_module(name)
+            modules.append(name)
+        except ImportError:
+            pass
+
+    return {"models": models, "price_series": series, "modules": modules}
+
+
+def memory_usage():
+    """RSS and its shared/private split in MiB, from /proc/self/smaps_rollup"""
+    fields = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == 'kB':
+                    fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    except OSError:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return {"rss_mb": round(rss, 1)}
+
+    return {
+        "rss_mb": round(fields.get('Rss', 0.0), 1),
+        "pss_mb": round(fields.get('Pss', 0.0), 1),
+        "shared_mb": round(fields.get('Shared_Clean', 0.0) + fields.get('Shared_Dirty', 0.0), 1),
+        "private_mb": round(fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0), 1),
+    }
+
+
+def _describe(memory):
+    return ", ".join(f"{key[:-3]} {value:.1f} MiB" for key, value in memory.items())
+
+
+# ----------------------------------------------------------------------
+# gunicorn server hooks
+# ----------------------------------------------------------------------
+
+def on_starting(server):
+    """Master, after the app is preloaded and before any worker is forked"""
+    import app as app_module
+
+    started = time.monotonic()
+    warmed = warm(app_module)
+    gc.collect()
+    gc.freeze()
+    server.log.info(
+        "Warmed %d models and %d price series in %.2fs (%s); master %s",
+        warmed["models"], warmed["price_series"], time.monotonic() - started,
+        ", ".join(warmed["modules"]) or "no optional encoders", _describe(memory_usage()),
+    )
+
+
+def when_ready(server):
+    server.log.info("Ready %.2fs after start", time.monotonic() - STARTED)
+
+
+def post_fork(server, worker):
+    """Worker, right after the fork: drop connections and threads inherited from the master"""
+    import app as app_module
+    app_module.db_pool.reset()
+    app_module.password_hasher.reset()
+    app_module.audit_writer.reset()
+
+
+def post_worker_init(worker):
+    worker.log.info(
+        "Worker %s booted %.2fs after start: %s",
+        worker.pid, time.monotonic() - STARTED, _describe(memory_usage()),
+    )
@@ -0,0 +1,254 @@
+"""
+Per-statement timing and a slow-query log with EXPLAIN capture.
+
+SlowQueryLog.record() is registered with src.db.observe_queries(), so it
+sees every cursor.execute() on connections from timed_connect. Each
+statement is reduced to a fingerprint (literals and placeholders become ?,
+IN lists and VALUES lists collapse to one item, whitespace is normalized)
+and gets a call count, total and maximum time, and a window of recent
+durations for percentiles. Only statements executed with separate params
+have their fingerprint memoized: execute_values() inlines every row, so
+each batch is a new, large text that would never be looked up again.
+
+Statements slower than `threshold` seconds are sampled (`sample_rate`) and
+rate-limited (at most one capture per fingerprint per `interval` seconds,
+and at most `max_pending` waiting). Each selected statement is explained by
+a background thread on its own pooled connection. Read-only SELECT and
+WITH statements get EXPLAIN (ANALYZE, BUFFERS). ANALYZE really runs the
+statement, and a rollback does not undo the row locks it takes or the
+sequences it advances while the app is live. So statements that write (a
+data-modifying CTE, SELECT INTO, nextval/setval) or lock rows (FOR UPDATE
+and FOR SHARE) get a plain EXPLAIN, like every other statement. Either way the EXPLAIN runs
+under a statement_timeout and is rolled back. Captured plans are kept in a
+ring buffer of the last `capacity` slow statements, with literals
+scrubbed from the stored text so inlined emails and addresses are not kept.
+"""
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+QUERY_TEXT_LIMIT = 2000      # characters of each statement kept with a capture
+RECENT_DURATIONS = 256       # per-fingerprint window behind the percentiles
+MAX_FINGERPRINTS = 1000      # further distinct statements are counted as "other"
+
+# A VALUES list of literal or placeholder rows, up to one level of nested parens
+_VALUES = re.compile(
+    r"\bVALUES\s*\((?:[^()']++|'(?:[^']|'')*+'|\([^()']*+\))*+\)"
+    r"(?:\s*,\s*\((?:[^()']++|'(?:[^']|'')*+'|\([^()']*+\))*+\))*+",
+    re.IGNORECASE,
+)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_SPACE = re.compile(r"\s+")
+_ANALYZABLE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_WRITES = re.compile(
+    r"\b(INSERT|UPDATE|DELETE|MERGE|INTO|NEXTVAL|SETVAL)\b|\bFOR\s+(KEY\s+)?SHARE\b",
+    re.IGNORECASE,
+)
+
+
+def query_text(query):
+    """psycopg2 accepts str, bytes and sql.Composed; fingerprints need str"""
+    if isinstance(query, bytes):
+        return query.decode('utf-8', 'replace')
+    return query if isinstance(query, str) else str(query)
+
+
+def scrub(query):
+    """Statement with its VALUES list collapsed and string and number literals replaced"""
+    text = _VALUES.sub('VALUES (?)', query_text(query), count=1)
+    text = _STRING.sub('?', text)
+    return _NUMBER.sub('?', text)
+
+
+def fingerprint(query):
+    """Statement with literals and placeholders replaced, lists collapsed"""
+    text = _PLACEHOLDER.sub('?', scrub(query))
+    text = _LIST.sub('(?)', text)
+    text = _ROWS.sub('(?)', text)
+    return _SPACE.sub(' ', text).strip()
+
+
+class SlowQueryLog:
+    """Statement statistics plus sampled EXPLAIN plans of slow statements"""
+
+    def __init__(self, pool, threshold=0.2, sample_rate=1.0, interval=60.0,
+                 capacity=100, max_pending=16, explain_timeout=5.0):
+        self.pool = pool
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.capacity = capacity
+        self.explain_timeout = explain_timeout
+
+        self._lock = threading.Lock()
+        self._stats = {}                  # fingerprint -> [calls, total, max, recent durations]
+        self._fingerprints = {}           # raw parameterized statement -> fingerprint
+        self._last_capture = {}           # fingerprint -> monotonic time
+        self._captures = deque(maxlen=capacity)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._explaining = threading.local()
+        self._thread = None
+        self._pid = None
+
+        self.slow = 0
+        self.skipped = 0
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record(self, seconds, query, params=None):
+        """Query observer: count the statement and queue an EXPLAIN if slow"""
+        if getattr(self._explaining, 'active', False):
+            return
+        text = query_text(query)
+        key = self._fingerprints.get(text)
+        if key is None:
+            key = fingerprint(text)
+            if params is not None and len(self._fingerprints) < MAX_FINGERPRINTS * 4:
+                self._fingerprints[text] = key
+
+        with self._lock:
+            entry = self._stats.get(key)
+            if entry is None:
+                if len(self._stats) >= MAX_FINGERPRINTS:
+                    key = 'other'
+                    entry = self._stats.get(key)
+                if entry is None:
+                    entry = self._stats[key] = [0, 0.0, 0.0, deque(maxlen=RECENT_DURATIONS)]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+            entry[3].append(seconds)
+
+            if seconds < self.threshold:
+                return
+            self.slow += 1
+            now = time.monotonic()
+            if (random.random() >= self.sample_rate
+                    or now - self._last_capture.get(key, -self.interval) < self.interval):
+                self.skipped += 1
+                return
+            self._last_capture[key] = now
+
+        try:
+            self._queue.put_nowait((key, text, params, seconds, datetime.utcnow()))
+        except queue.Full:
+            with self._lock:
+                self.skipped += 1
+            return
+        self._ensure_started()
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def statements(self, limit=20):
+        """Fingerprints with the most total time first"""
+        with self._lock:
+            rows = [(key, e[0], e[1], e[2], np.array(e[3])) for key, e in self._stats.items()]
+        rows.sort(key=lambda row: row[2], reverse=True)
+
+        result = []
+        for key, calls, total, longest, recent in rows[:limit]:
+            p50, p95, p99 = np.percentile(recent, (50, 95, 99)) * 1000
+            result.append({
+                "fingerprint": key,
+                "calls": calls,
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total / calls * 1000, 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(longest * 1000, 3),
+            })
+        return result
+
+    def captures(self, limit=None):
+        """Captured slow statements, newest first"""
+        with self._lock:
+            captures = list(self._captures)[::-1]
+        return captures[:limit] if limit else captures
+
+    def stats(self):
+        with self._lock:
+            return {
+                "threshold_ms": self.threshold * 1000,
+                "fingerprints": len(self._stats),
+                "slow": self.slow,
+                "captured": len(self._captures),
+                "skipped": self.skipped,
+                "pending": self._queue.qsize(),
+            }
+
+    def join(self):
+        """Wait until every queued statement has been explained"""
+        self._queue.join()
+
+    # ------------------------------------------------------------------
+    # EXPLAIN worker
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self):
+        """Start the worker lazily (and again in a forked child process)"""
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name="slow-query-explain", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        self._explaining.active = True
+        while True:
+            job = self._queue.get()
+            try:
+                capture = self._explain(*job)
+                with self._lock:
+                    self._captures.append(capture)
+            finally:
+                self._queue.task_done()
+
+    def _explain(self, key, text, params, seconds, seen_at):
+        analyze = bool(_ANALYZABLE.match(text)) and not _WRITES.search(_STRING.sub("''", text))
+        capture = {
+            "fingerprint": key,
+            "query": scrub(text)[:QUERY_TEXT_LIMIT],
+            "duration_ms": round(seconds * 1000, 3),
+            "captured_at": seen_at.isoformat(),
+            "analyzed": analyze,
+            "plan": None,
+        }
+        if params is None and _PLACEHOLDER.search(text):
+            capture["error"] = "Statement parameters were not available"
+            return capture
+
+        options = "(ANALYZE, BUFFERS) " if analyze else ""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("SET LOCAL statement_timeout = %s", (int(self.explain_timeout * 1000),))
+                    cursor.execute(f"EXPLAIN {options}{text}", params)
+                    capture["plan"] = "\n".join(row[0] for row in cursor.fetchall())
+                finally:
+                    cursor.close()
+                    conn.rollback()
+        except Exception as e:
+            print(f"Slow query EXPLAIN error: {e}")
+            capture["error"] = str(e)
+        return capture
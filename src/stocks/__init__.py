@@ -0,0 +1,3 @@
+"""
+Stock price data: caching, storage and retrieval.
+"""
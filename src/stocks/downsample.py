@@ -0,0 +1,57 @@
+"""
+Largest-Triangle-Three-Buckets (LTTB) downsampling for chart payloads.
+
+The first and last points are always kept. The points in between are split
+into max_points - 2 buckets, and from each bucket LTTB keeps the point that
+forms the largest triangle with the point kept from the previous bucket and
+the average of the next bucket. That keeps peaks and troughs that taking
+every n-th point would drop.
+
+Everything that does not depend on the previous choice (bucket averages and
+the triangle terms for every candidate) is computed up front as (bucket,
+candidate) arrays, so the remaining per-bucket step is one short vector
+expression and an argmax.
+"""
+import numpy as np
+
+
+def lttb(x, y, max_points):
+    """Sorted indices of at most max_points points of (x, y) to keep"""
+    n = len(y)
+    if n <= max_points or n <= 2:
+        return np.arange(n)
+    if max_points < 3:
+        return np.array([0, n - 1])
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    buckets = max_points - 2
+
+    # Bucket b covers [edges[b], edges[b + 1]) of the interior points 1..n-2
+    edges = (np.arange(buckets + 1) * ((n - 2) / buckets)).astype(np.int64) + 1
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[:n - 1], edges[:-1]) / counts
+    avg_y = np.add.reduceat(y[:n - 1], edges[:-1]) / counts
+    # The point each bucket looks ahead to: the next bucket's average, then the last point
+    cx = np.append(avg_x[1:], x[-1])[:, None]
+    cy = np.append(avg_y[1:], y[-1])[:, None]
+
+    width = int(counts.max())
+    index = edges[:-1, None] + np.arange(width)[None, :]
+    valid = np.arange(width)[None, :] < counts[:, None]
+    index = np.where(valid, index, edges[:-1, None])
+    bx, by = x[index], y[index]
+
+    # Twice the triangle area for previous point a is |ax * p + q + ay * r|
+    p = by - cy
+    q = bx * cy - cx * by
+    r = cx - bx
+
+    keep = np.empty(max_points, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for b in range(buckets):
+        area = np.abs(x[a] * p[b] + q[b] + y[a] * r[b])
+        a = index[b, np.argmax(area)]
+        keep[b + 1] = a
+    return keep
@@ -0,0 +1,622 @@
+"""
+Tiered read path for historical OHLCV data.
+
+A request for (ticker, period) is answered from the first tier that has it:
+
+    L1  in-process TTL/LRU cache
+    L2  the memory-mapped PriceStore, then the `prices` table (only if the
+        data is fresh and covers the whole period)
+    L3  yfinance
+
+Misses are funnelled through a SingleFlight so concurrent requests for the
+same (ticker, period) cause one L2 query / upstream call. Rows fetched from
+upstream are written back to `prices` so the next process start is served by L2.
+
+Batch reads (get_many) look up every L1 miss with a single
+`symbol = ANY(%s)` query and fetch whatever is still missing from upstream
+concurrently on a bounded thread pool.
+
+Long ranges can be streamed instead (stream): stored rows are read
+HISTORY_CHUNK_ROWS at a time from the price store or with one keyset-paged
+query per chunk and encoded chunk by chunk, so memory stays flat however
+many years are requested. Each page is copied out and its pooled connection
+released before the chunk is yielded, so a slow client holds no connection
+or transaction while it reads.
+
+Charts that only need the shape of a long range ask for a point budget
+(downsampled): the columns are reduced with LTTB and the result is cached
+in L1 under (ticker, period, max_points).
+"""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import execute_values
+
+from src.db import PoolError
+from src.stocks.cache import SingleFlight
+from src.stocks.downsample import lttb
+from src.stocks.store import PriceSeries
+
+VALID_PERIODS = ('1d', '5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', 'ytd', 'max')
+
+PERIOD_DAYS = {
+    '1d': 1, '5d': 5, '1mo': 31, '3mo': 92, '6mo': 183,
+    '1y': 365, '2y': 730, '5y': 1826, '10y': 3652,
+}
+
+# Periods long enough that fewer points than this deserves a warning
+MIN_HISTORY_POINTS = 200
+LONG_PERIODS = ('1y', '2y', '5y', '10y', 'max')
+
+# Allow for weekends/holidays between the period start and the first bar
+COVERAGE_SLACK_DAYS = 5
+
+SELECT_PRICES_SQL = """
+    SELECT symbol, price_date, open_price, high_price, low_price, close_price, volume
+    FROM prices
+    WHERE symbol = ANY(%s) AND price_date >= %s
+    ORDER BY symbol, price_date
+"""
+
+SELECT_RANGE_SQL = """
+    SELECT min(price_date), max(price_date)
+    FROM prices
+    WHERE symbol = %s AND price_date >= COALESCE(%s::date, '-infinity'::date)
+"""
+
+STREAM_PRICES_SQL = """
+    SELECT price_date, open_price, high_price, low_price, close_price, volume
+    FROM prices
+    WHERE symbol = %s AND price_date >= COALESCE(%s::date, '-infinity'::date)
+    ORDER BY price_date
+    LIMIT %s
+"""
+
+# Rows per streamed chunk (and per prices page query)
+HISTORY_CHUNK_ROWS = 1000
+
+ROW_FORMAT = '{"Date":"%s","Open":%r,"High":%r,"Low":%r,"Close":%r,"Volume":%d}'
+
+UPSERT_PRICES_SQL = """
+    INSERT INTO prices (symbol, price_date, open_price, high_price, low_price, close_price, volume)
+    VALUES %s
+    ON CONFLICT (symbol, price_date) DO UPDATE SET
+        open_price = EXCLUDED.open_price,
+        high_price = EXCLUDED.high_price,
+        low_price = EXCLUDED.low_price,
+        close_price = EXCLUDED.close_price,
+        volume = EXCLUDED.volume
+"""
+
+
+class StockNotFound(Exception):
+    """Upstream returned no data for the ticker"""
+
+
+class UpstreamError(Exception):
+    """The market data provider failed; status_code is the HTTP status to return"""
+
+    def __init__(self, message, status_code=503):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def fetch_from_yfinance(ticker, period):
+    """
+    Fetch daily bars from Yahoo Finance.
+    Returns a list of (date, open, high, low, close, volume) tuples.
+    """
+    import yfinance   # optional dependency, only needed on a cache miss
+
+    try:
+        frame = yfinance.Ticker(ticker).history(period=period)
+    except TimeoutError as e:
+        raise UpstreamError("Stock data provider timed out", 504) from e
+    except Exception as e:
+        message = str(e)
+        if '429' in message or 'Too Many Requests' in message:
+            raise UpstreamError("Stock data provider rate limit reached", 429) from e
+        raise UpstreamError("Stock data provider unavailable", 503) from e
+
+    return frame_to_rows(frame)
+
+
+def frame_to_rows(frame):
+    """
+    Convert a yfinance-style DataFrame into (date, o, h, l, c, v) tuples.
+    Bars without finite prices (yfinance pads halted days with NaN) are
+    dropped, and a missing volume counts as 0.
+    """
+    if frame is None or len(frame) == 0:
+        return []
+
+    prices = ['Open', 'High', 'Low', 'Close']
+    finite = np.isfinite(frame[prices].to_numpy(dtype=float)).all(axis=1)
+    frame = frame[finite]
+
+    if 'Date' in frame.columns:
+        dates = frame['Date']
+    else:
+        dates = frame.index
+    dates = [d.date() if hasattr(d, 'date') else d for d in dates]
+
+    volume = np.nan_to_num(frame['Volume'].to_numpy(dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+    columns = [frame[name].tolist() for name in prices] + [volume.tolist()]
+    return [
+        (d, float(o), float(h), float(l), float(c), int(v))
+        for d, o, h, l, c, v in zip(dates, *columns)
+    ]
+
+
+def period_start(period, today=None):
+    """First calendar date covered by a period, or None for 'max'"""
+    today = today or date.today()
+    if period == 'ytd':
+        return date(today.year, 1, 1)
+    if period == 'max':
+        return None
+    return today - timedelta(days=PERIOD_DAYS[period])
+
+
+class StockHistoryService:
+    """Answer history requests from L1 cache, then the prices table, then upstream"""
+
+    def __init__(self, pool, cache, fetch=fetch_from_yfinance, max_age_days=4, write_back=True,
+                 fetch_workers=8, store=None):
+        self.pool = pool
+        self.cache = cache
+        self.store = store
+        self.fetch = fetch
+        self.max_age_days = max_age_days
+        self.write_back = write_back
+
+        self._executor = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="stock-fetch")
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+        self.l2_hits = 0
+        self.upstream_fetches = 0
+
+    def get(self, ticker, period):
+        """Return the JSON-ready payload for ticker/period"""
+        key = (ticker, period)
+        payload = self.cache.get(key)
+        if payload is not None:
+            return payload
+        return self._flight.do(key, lambda: self._load(ticker, period))
+
+    def get_many(self, tickers, period):
+        """
+        Load several tickers at once.
+        Returns (payloads, errors): ticker -> payload and ticker -> exception.
+        """
+        payloads, errors = {}, {}
+        missing = []
+        for ticker in dict.fromkeys(tickers):
+            payload = self.cache.get((ticker, period))
+            if payload is not None:
+                payloads[ticker] = payload
+            else:
+                missing.append(ticker)
+        if not missing:
+            return payloads, errors
+
+        # One round trip for every L1 miss
+        stored = self._read_prices(missing, period)
+        upstream = []
+        for ticker in missing:
+            rows = stored.get(ticker)
+            if rows is None:
+                upstream.append(ticker)
+                continue
+            with self._lock:
+                self.l2_hits += 1
+            payloads[ticker] = self._remember(ticker, period, rows)
+
+        # Whatever is left comes from upstream, in parallel
+        futures = {
+            ticker: self._executor.submit(
+                self._flight.do, (ticker, period),
+                lambda t=ticker: self._load_upstream(t, period),
+            )
+            for ticker in upstream
+        }
+        for ticker, future in futures.items():
+            try:
+                payloads[ticker] = future.result()
+            except Exception as e:
+                errors[ticker] = e
+        return payloads, errors
+
+    def stream(self, ticker, period, ndjson=False):
+        """
+        The history for ticker/period as an iterator of JSON text chunks:
+        one object like get() returns (with "count" after the rows), or one
+        NDJSON line per row. Stored rows are never all held in memory.
+        StockNotFound / UpstreamError are raised before the first chunk.
+        """
+        key = (ticker, period)
+        payload = self.cache.get(key)
+        if payload is not None:
+            chunks = payload_chunks(payload)
+        else:
+            chunks = self._stored_chunks(ticker, period)
+            if chunks is None:
+                payload = self._flight.do(key, lambda: self._load_upstream(ticker, period))
+                chunks = payload_chunks(payload)
+            else:
+                with self._lock:
+                    self.l2_hits += 1
+
+        if ndjson:
+            return encode_ndjson(chunks)
+        return encode_json(ticker, period, chunks)
+
+    def series(self, ticker, period):
+        """
+        The history for ticker/period as a PriceSeries of columns: a zero-copy
+        window of the price store when it covers the period, otherwise built
+        from the payload get() returns.
+        """
+        window = self._store_window(ticker, period_start(period))
+        if window is not None:
+            with self._lock:
+                self.l2_hits += 1
+            return window
+        return payload_series(ticker, self.get(ticker, period))
+
+    def series_many(self, tickers, period):
+        """Columns for several tickers: (ticker -> PriceSeries, ticker -> exception)"""
+        start = period_start(period)
+        found, missing = {}, []
+        for ticker in dict.fromkeys(tickers):
+            window = self._store_window(ticker, start)
+            if window is None:
+                missing.append(ticker)
+            else:
+                found[ticker] = window
+        with self._lock:
+            self.l2_hits += len(found)
+
+        payloads, errors = self.get_many(missing, period) if missing else ({}, {})
+        for ticker, payload in payloads.items():
+            found[ticker] = payload_series(ticker, payload)
+        return {t: found[t] for t in dict.fromkeys(tickers) if t in found}, errors
+
+    def downsampled(self, ticker, period, max_points):
+        """(PriceSeries of at most max_points rows, rows before downsampling)"""
+        key = (ticker, period, max_points)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return self._downsample(key, self.series(ticker, period))
+
+    def downsampled_many(self, tickers, period, max_points):
+        """
+        downsampled() for several tickers:
+        (ticker -> (PriceSeries, rows before downsampling), ticker -> exception)
+        """
+        found, missing = {}, []
+        for ticker in dict.fromkeys(tickers):
+            cached = self.cache.get((ticker, period, max_points))
+            if cached is None:
+                missing.append(ticker)
+            else:
+                found[ticker] = cached
+
+        series, errors = self.series_many(missing, period) if missing else ({}, {})
+        for ticker, full in series.items():
+            found[ticker] = self._downsample((ticker, period, max_points), full)
+        return {t: found[t] for t in dict.fromkeys(tickers) if t in found}, errors
+
+    def stats(self):
+        l1 = self.cache.stats()
+        with self._lock:
+            return {
+                "l1_hits": l1["hits"],
+                "l1_misses": l1["misses"],
+                "l1_size": l1["size"],
+                "l2_hits": self.l2_hits,
+                "upstream_fetches": self.upstream_fetches,
+                "coalesced": self._flight.coalesced,
+            }
+
+    def _load(self, ticker, period):
+        # Another request may have filled L1 while this one waited to lead
+        payload = self.cache.get((ticker, period), record=False)
+        if payload is not None:
+            return payload
+
+        rows = self._read_prices([ticker], period).get(ticker)
+        if rows is None:
+            return self._load_upstream(ticker, period)
+
+        with self._lock:
+            self.l2_hits += 1
+        return self._remember(ticker, period, rows)
+
+    def _load_upstream(self, ticker, period):
+        with self._lock:
+            self.upstream_fetches += 1
+        rows = self.fetch(ticker, period)
+        if not rows:
+            raise StockNotFound(f"No data found for ticker {ticker}")
+        if self.write_back:
+            self._write_prices(ticker, rows)
+        return self._remember(ticker, period, rows)
+
+    def _remember(self, ticker, period, rows):
+        payload = build_payload(ticker, period, rows)
+        self.cache.set((ticker, period), payload)
+        return payload
+
+    def _read_prices(self, tickers, period):
+        """
+        Stored rows for each ticker: from the price store when it has them,
+        otherwise from the prices table in one query.
+        Tickers whose rows are stale or do not cover the period are left out.
+        """
+        start = period_start(period)
+        if start is None:
+            return {}
+
+        found, remaining = {}, []
+        for ticker in tickers:
+            window = self._store_window(ticker, start)
+            if window is None:
+                remaining.append(ticker)
+            else:
+                found[ticker] = window.rows()
+        if not remaining:
+            return found
+
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(SELECT_PRICES_SQL, (remaining, start))
+                    rows = cursor.fetchall()
+                finally:
+                    cursor.close()
+        except (PoolError, psycopg2.Error) as e:
+            print(f"Price lookup error: {e}")
+            return found
+
+        by_symbol = {}
+        for symbol, d, o, h, l, c, v in rows:
+            by_symbol.setdefault(symbol, []).append(
+                (d, float(o), float(h), float(l), float(c), int(v or 0))
+            )
+
+        for symbol, series in by_symbol.items():
+            if self._usable(series[0][0], series[-1][0], start):
+                found[symbol] = series
+        return found
+
+    def _downsample(self, key, series):
+        keep = lttb(series.dates.astype(np.int64), series.close, key[2])
+        result = (series[keep], len(series))
+        self.cache.set(key, result)
+        return result
+
+    def _store_window(self, ticker, start):
+        """Price store rows from start on, or None unless they are usable"""
+        if self.store is None:
+            return None
+        window = self.store.window(ticker, start)
+        if window is None or not len(window) or not self._usable(
+                window.dates[0].astype(object), window.dates[-1].astype(object), start):
+            return None
+        return window
+
+    def _stored_chunks(self, ticker, period):
+        """
+        Chunks of stored rows for ticker/period, or None when neither the
+        price store nor the prices table has usable data.
+        """
+        start = period_start(period)
+        window = self._store_window(ticker, start)
+        if window is not None:
+            return series_chunks(window)
+
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute(SELECT_RANGE_SQL, (ticker, start))
+                    oldest, newest = cursor.fetchone()
+                finally:
+                    cursor.close()
+        except (PoolError, psycopg2.Error) as e:
+            print(f"Price lookup error: {e}")
+            return None
+
+        if oldest is None or not self._usable(oldest, newest, start):
+            return None
+        return self._table_chunks(ticker, start)
+
+    def _table_chunks(self, ticker, start):
+        """
+        Rows from prices one page per chunk, keyed on the last date sent.
+        The connection goes back to the pool before each chunk is yielded.
+
+        The response status and first chunks are already sent by the time a
+        later page is read, so a database failure mid-stream cannot become
+        an error status: the error is logged and re-raised, the server drops
+        the connection, and the client sees a truncated body (JSON without
+        its closing "count", or NDJSON that stops early) under a 200.
+        """
+        while True:
+            try:
+                with self.pool.connection(autocommit=True) as conn:
+                    cursor = conn.cursor()
+                    try:
+                        cursor.execute(STREAM_PRICES_SQL, (ticker, start, HISTORY_CHUNK_ROWS))
+                        rows = cursor.fetchall()
+                    finally:
+                        cursor.close()
+            except (PoolError, psycopg2.Error) as e:
+                print(f"Price stream error: {e}")
+                raise
+            if not rows:
+                return
+            yield [
+                (d.isoformat(), float(o), float(h), float(l), float(c), int(v or 0))
+                for d, o, h, l, c, v in rows
+            ]
+            if len(rows) < HISTORY_CHUNK_ROWS:
+                return
+            start = rows[-1][0] + timedelta(days=1)
+
+    def _usable(self, oldest, newest, start):
+        """Stored data must be recent and reach back to the period start"""
+        if newest < date.today() - timedelta(days=self.max_age_days):
+            return False
+        return start is None or oldest <= start + timedelta(days=COVERAGE_SLACK_DAYS)
+
+    def _write_prices(self, ticker, rows):
+        """Persist upstream rows into prices (best effort, known symbols only)"""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("SELECT 1 FROM stocks WHERE symbol = %s", (ticker,))
+                    if cursor.fetchone() is None:
+                        return
+                    execute_values(
+                        cursor, UPSERT_PRICES_SQL,
+                        [(ticker,) + row for row in rows],
+                        page_size=1000,
+                    )
+                    conn.commit()
+                finally:
+                    cursor.close()
+        except (PoolError, psycopg2.Error) as e:
+            print(f"Price write-back error: {e}")
+
+
+def build_payload(ticker, period, rows, total=None):
+    """
+    JSON-ready response body for a list of OHLCV rows; `total` is the row
+    count before downsampling, when the rows were downsampled
+    """
+    historical = [
+        {
+            "Date": d.isoformat(),
+            "Open": round(o, 2),
+            "High": round(h, 2),
+            "Low": round(l, 2),
+            "Close": round(c, 2),
+            "Volume": v,
+        }
+        for d, o, h, l, c, v in rows
+    ]
+    payload = history_meta(ticker, period, len(historical), total)
+    payload["historical_data"] = historical
+    return payload
+
+
+def history_meta(ticker, period, count, total=None):
+    """Every payload field except the rows"""
+    total = count if total is None else total
+    meta = {
+        "ticker": ticker,
+        "period": period,
+        "count": count,
+        "last_updated": datetime.utcnow().isoformat() + "Z",
+    }
+    if total > count:
+        meta["downsampled_from"] = total
+    warning = history_warning(period, total)
+    if warning:
+        meta["warning"] = warning
+    return meta
+
+
+def history_warning(period, count):
+    if period in LONG_PERIODS and count < MIN_HISTORY_POINTS:
+        return f"Limited history: only {count} trading days available"
+    return None
+
+
+def history_columns(series):
+    """
+    Payload columns for a PriceSeries. Prices keep full precision (the JSON
+    rows round to cents), so store windows are serialized without copies.
+    """
+    return {
+        "Date": series.dates,
+        "Open": series.open,
+        "High": series.high,
+        "Low": series.low,
+        "Close": series.close,
+        "Volume": series.volume,
+    }
+
+
+def payload_series(ticker, payload):
+    """PriceSeries holding a built payload's rows"""
+    rows = payload["historical_data"]
+    return PriceSeries(
+        ticker,
+        np.array([r["Date"] for r in rows], dtype='datetime64[D]'),
+        *(np.array([r[name] for r in rows], dtype=float) for name in ("Open", "High", "Low", "Close")),
+        np.array([r["Volume"] for r in rows], dtype=np.int64),
+    )
+
+
+def series_chunks(series):
+    """(iso date, o, h, l, c, v) chunks from a PriceSeries window"""
+    for i in range(0, len(series), HISTORY_CHUNK_ROWS):
+        part = series[i:i + HISTORY_CHUNK_ROWS]
+        yield list(zip(
+            np.datetime_as_string(part.dates, unit='D').tolist(), part.open.tolist(),
+            part.high.tolist(), part.low.tolist(), part.close.tolist(), part.volume.tolist(),
+        ))
+
+
+def payload_chunks(payload):
+    """(iso date, o, h, l, c, v) chunks from an already built payload"""
+    rows = payload["historical_data"]
+    for i in range(0, len(rows), HISTORY_CHUNK_ROWS):
+        yield [
+            (r["Date"], r["Open"], r["High"], r["Low"], r["Close"], r["Volume"])
+            for r in rows[i:i + HISTORY_CHUNK_ROWS]
+        ]
+
+
+def encode_rows(rows, separator):
+    return separator.join(
+        ROW_FORMAT % (d, round(o, 2), round(h, 2), round(l, 2), round(c, 2), v)
+        for d, o, h, l, c, v in rows
+    )
+
+
+def encode_json(ticker, period, chunks):
+    """Stream the build_payload object; "count" and "warning" follow the rows"""
+    head = json.dumps({
+        "ticker": ticker,
+        "period": period,
+        "last_updated": datetime.utcnow().isoformat() + "Z",
+    })
+    yield head[:-1] + ',"historical_data":['
+    count = 0
+    for rows in chunks:
+        if rows:
+            yield ("," if count else "") + encode_rows(rows, ",")
+            count += len(rows)
+    tail = {"count": count}
+    warning = history_warning(period, count)
+    if warning:
+        tail["warning"] = warning
+    yield "]," + json.dumps(tail)[1:]
+
+
+def encode_ndjson(chunks):
+    """One JSON object per row, one row per line"""
+    for rows in chunks:
+        if rows:
+            yield encode_rows(rows, "\n") + "\n"
@@ -0,0 +1,313 @@
+"""
+Incremental technical indicator materialization for the indicators table.
+
+Computes, per symbol and trading day:
+    ma_20, ma_50   simple moving averages of the close
+    macd           EMA(12) - EMA(26) of the close
+    rsi            14-day RSI with Wilder smoothing
+
+All series math is vectorized NumPy. Exponential averages are evaluated in
+fixed-size blocks with a closed-form recurrence, so there is no per-row
+Python loop and no overflow on long histories.
+
+After each run the EMA/RSI state at the last processed day is saved in
+indicator_state. The next run only reads prices after that day (plus the
+49 closes the 50-day average needs) and continues the averages from the
+saved state instead of recomputing history.
+
+Usage:
+    python -m src.stocks.indicators             # all symbols, incremental
+    python -m src.stocks.indicators LMT --full  # recompute one symbol
+"""
+import argparse
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+
+MA_WINDOWS = (20, 50)
+MACD_FAST, MACD_SLOW = 12, 26
+RSI_PERIOD = 14
+EMA_BLOCK = 128   # keeps beta ** -block well inside float64 range
+
+LOOKBACK = max(MA_WINDOWS) - 1
+
+SELECT_STATE_SQL = "SELECT last_date, state FROM indicator_state WHERE symbol = %s"
+
+SELECT_CLOSES_SQL = """
+    SELECT price_date, close_price FROM (
+        SELECT price_date, close_price FROM prices
+        WHERE symbol = %(symbol)s AND price_date <= %(after)s
+        ORDER BY price_date DESC
+        LIMIT %(lookback)s
+    ) AS history
+    UNION ALL
+    SELECT price_date, close_price FROM prices
+    WHERE symbol = %(symbol)s AND price_date > %(after)s
+    ORDER BY price_date
+"""
+
+UPSERT_INDICATORS_SQL = """
+    INSERT INTO indicators (symbol, indicator_type, value, calculation_date)
+    VALUES %s
+    ON CONFLICT (symbol, indicator_type, calculation_date)
+    DO UPDATE SET value = EXCLUDED.value
+"""
+
+UPSERT_STATE_SQL = """
+    INSERT INTO indicator_state (symbol, last_date, state, updated_at)
+    VALUES (%s, %s, %s, CURRENT_TIMESTAMP)
+    ON CONFLICT (symbol) DO UPDATE SET
+        last_date = EXCLUDED.last_date,
+        state = EXCLUDED.state,
+        updated_at = EXCLUDED.updated_at
+"""
+
+
+# ----------------------------------------------------------------------
+# Vectorized series math
+# ----------------------------------------------------------------------
+
+def ema(values, alpha, initial=None):
+    """
+    Exponential moving average e[t] = alpha * x[t] + (1 - alpha) * e[t-1].
+    Without `initial` the series is seeded with its first value.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.empty_like(values)
+    if len(values) == 0:
+        return out
+
+    beta = 1.0 - alpha
+    if initial is None:
+        initial, values, out[0] = values[0], values[1:], values[0]
+        target = out[1:]
+    else:
+        target = out
+
+    previous = float(initial)
+    for start in range(0, len(values), EMA_BLOCK):
+        block = values[start:start + EMA_BLOCK]
+        powers = beta ** np.arange(1, len(block) + 1)           # beta^(j+1)
+        # e[j] = beta^(j+1) * (prev + alpha * sum_{k<=j} x[k] / beta^(k+1))
+        result = powers * (previous + alpha * np.cumsum(block / powers))
+        target[start:start + len(block)] = result
+        previous = result[-1]
+    return out
+
+
+def rolling_mean(values, window):
+    """Simple moving average; the first window-1 entries are NaN"""
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(np.insert(values, 0, 0.0))
+        out[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return out
+
+
+def compute_indicators(closes, new_rows, state=None):
+    """
+    Indicators for the last `new_rows` entries of closes.
+
+    closes    prior lookback closes followed by the new closes
+    state     saved state from the previous run (None for a full run)
+
+    Returns ({indicator_type: array of len new_rows, NaN = not available}, new_state).
+    """
+    closes = np.asarray(closes, dtype=float)
+    new = closes[len(closes) - new_rows:]
+    results = {}
+
+    for window in MA_WINDOWS:
+        results[f'ma_{window}'] = rolling_mean(closes, window)[len(closes) - new_rows:]
+
+    count = state['count'] if state else 0
+    observations = count + np.arange(1, new_rows + 1)
+
+    fast = ema(new, 2.0 / (MACD_FAST + 1), state['ema_fast'] if state else None)
+    slow = ema(new, 2.0 / (MACD_SLOW + 1), state['ema_slow'] if state else None)
+    macd = fast - slow
+    macd[observations < MACD_SLOW] = np.nan
+    results['macd'] = macd
+
+    previous_close = state['last_close'] if state else new[0]
+    changes = np.diff(np.insert(new, 0, previous_close))
+    if not state:
+        changes = changes[1:]   # the first close has no change
+    gains = np.clip(changes, 0, None)
+    losses = np.clip(-changes, 0, None)
+    alpha = 1.0 / RSI_PERIOD
+    avg_gain = ema(gains, alpha, state['avg_gain'] if state else None)
+    avg_loss = ema(losses, alpha, state['avg_loss'] if state else None)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = np.where(avg_loss == 0, 100.0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss))
+    if not state:
+        rsi = np.insert(rsi, 0, np.nan)
+    rsi[observations <= RSI_PERIOD] = np.nan
+    results['rsi'] = rsi
+
+    new_state = {
+        'count': int(count + new_rows),
+        'last_close': float(new[-1]),
+        'ema_fast': float(fast[-1]),
+        'ema_slow': float(slow[-1]),
+        'avg_gain': float(avg_gain[-1]) if len(avg_gain) else (state or {}).get('avg_gain', 0.0),
+        'avg_loss': float(avg_loss[-1]) if len(avg_loss) else (state or {}).get('avg_loss', 0.0),
+    }
+    return results, new_state
+
+
+# ----------------------------------------------------------------------
+# Materialization
+# ----------------------------------------------------------------------
+
+class IndicatorResult:
+    """Outcome of updating one symbol"""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.days = 0
+        self.values = 0
+        self.incremental = False
+        self.read_seconds = 0.0
+        self.compute_seconds = 0.0
+        self.write_seconds = 0.0
+        self.error = None
+
+    def __repr__(self):
+        if self.error:
+            return f"{self.symbol}: FAILED ({self.error})"
+        mode = "incremental" if self.incremental else "full"
+        return (
+            f"{self.symbol}: {self.days} days, {self.values} values ({mode}) "
+            f"read {self.read_seconds * 1000:.1f}ms, compute {self.compute_seconds * 1000:.1f}ms, "
+            f"write {self.write_seconds * 1000:.1f}ms"
+        )
+
+
+class IndicatorEngine:
+    """Keeps the indicators table up to date for every symbol"""
+
+    def __init__(self, pool, workers=4):
+        self.pool = pool
+        self.workers = workers
+
+    def run(self, symbols=None, full=False, report=print):
+        """Update symbols in parallel; returns the list of IndicatorResult"""
+        if symbols is None:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    cursor.execute("SELECT symbol FROM stocks ORDER BY symbol")
+                    symbols = [row[0] for row in cursor.fetchall()]
+                finally:
+                    cursor.close()
+
+        lock = threading.Lock()
+        results = []
+
+        def work(symbol):
+            result = self.update_symbol(symbol, full=full)
+            with lock:
+                results.append(result)
+                report(repr(result))
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as executor:
+            list(executor.map(work, symbols))
+        return results
+
+    def update_symbol(self, symbol, full=False):
+        """Compute and store indicators for days after the saved state"""
+        result = IndicatorResult(symbol)
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                try:
+                    self._update(cursor, symbol, full, result)
+                    conn.commit()
+                finally:
+                    cursor.close()
+        except Exception as e:
+            result.error = str(e)
+        return result
+
+    def _update(self, cursor, symbol, full, result):
+        started = time.perf_counter()
+        state, after = None, None
+        if not full:
+            cursor.execute(SELECT_STATE_SQL, (symbol,))
+            row = cursor.fetchone()
+            if row:
+                after, state = row[0], row[1]
+                if isinstance(state, str):
+                    state = json.loads(state)
+
+        if state is None:
+            cursor.execute(
+                "SELECT price_date, close_price FROM prices WHERE symbol = %s ORDER BY price_date",
+                (symbol,)
+            )
+        else:
+            cursor.execute(SELECT_CLOSES_SQL, {'symbol': symbol, 'after': after, 'lookback': LOOKBACK})
+        rows = cursor.fetchall()
+        result.read_seconds = time.perf_counter() - started
+
+        dates = [d for d, _ in rows]
+        closes = np.array([float(c) for _, c in rows])
+        new_rows = len(rows) if after is None else sum(1 for d in dates if d > after)
+        result.incremental = state is not None
+        result.days = new_rows
+        if new_rows == 0:
+            return
+
+        started = time.perf_counter()
+        values, new_state = compute_indicators(closes, new_rows, state)
+        new_dates = dates[len(dates) - new_rows:]
+        records = [
+            (symbol, name, round(float(value), 6), day)
+            for name, series in values.items()
+            for day, value in zip(new_dates, series)
+            if not np.isnan(value)
+        ]
+        result.compute_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        if records:
+            execute_values(cursor, UPSERT_INDICATORS_SQL, records, page_size=5000)
+        cursor.execute(UPSERT_STATE_SQL, (symbol, new_dates[-1], json.dumps(new_state)))
+        result.values = len(records)
+        result.write_seconds = time.perf_counter() - started
+
+
+def main(argv=None):
+    from src.db import pool_from_env
+
+    parser = argparse.ArgumentParser(description="Materialize technical indicators")
+    parser.add_argument("symbols", nargs="*", help="symbols to update (default: all in stocks)")
+    parser.add_argument("--full", action="store_true", help="recompute from the first price")
+    parser.add_argument("--workers", type=int, default=4, help="symbols processed in parallel")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    pool = pool_from_env(minconn=0, maxconn=max(1, args.workers))
+    started = time.perf_counter()
+    try:
+        results = IndicatorEngine(pool, workers=args.workers).run(args.symbols or None, full=args.full)
+    finally:
+        pool.close_all()
+
+    failed = [r.symbol for r in results if r.error]
+    print(
+        f"Updated {len(results) - len(failed)}/{len(results)} symbols, "
+        f"{sum(r.values for r in results):,} values in {time.perf_counter() - started:.2f}s"
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,334 @@
+"""
+Bulk OHLCV ingestion into the prices table.
+
+Each chunk of rows is streamed into a per-session TEMP staging table with
+COPY, then merged into `prices` with one INSERT ... ON CONFLICT DO UPDATE.
+Rows that did not change are skipped by the merge, so re-running a load is
+idempotent and cheap. Each chunk is committed together with a checkpoint of
+how many input rows of the source are done; with resume enabled, a rerun of
+an interrupted load skips those rows. A load that finishes clears its
+checkpoints, so loading the same file again re-merges it. A file that
+changed since the interrupted run (size or mtime) starts over.
+
+Symbols load in parallel, one pooled connection per symbol. The command-line
+entry point then refreshes the memory-mapped price store for the loaded
+symbols (skip with --no-store); symbols that got rows on or before their
+last stored date are rebuilt. It finally regenerates their stored forecasts
+(skip with --no-forecasts).
+
+Usage:
+    python -m src.stocks.ingest data/LMT.csv data/RTX.csv --workers 4
+    python -m src.stocks.ingest all_symbols.csv --chunk-size 100000 --full
+
+CSV files need Date, Open, High, Low, Close and Volume columns (any case).
+The symbol comes from a Symbol column or, failing that, the file name.
+"""
+import argparse
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from dotenv import load_dotenv
+
+COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+STAGING_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS prices_staging (
+        price_date DATE NOT NULL,
+        open_price DECIMAL(10,2),
+        high_price DECIMAL(10,2),
+        low_price DECIMAL(10,2),
+        close_price DECIMAL(10,2),
+        volume BIGINT
+    )
+"""
+
+COPY_SQL = """
+    COPY prices_staging (price_date, open_price, high_price, low_price, close_price, volume)
+    FROM STDIN WITH (FORMAT csv)
+"""
+
+# DISTINCT ON guards against duplicate dates within one chunk, which
+# ON CONFLICT DO UPDATE would otherwise reject. Returns how many rows were
+# written and the earliest of their dates.
+MERGE_SQL = """
+    WITH merged AS (
+    INSERT INTO prices (symbol, price_date, open_price, high_price, low_price, close_price, volume)
+    SELECT DISTINCT ON (price_date)
+        %s, price_date, open_price, high_price, low_price, close_price, volume
+    FROM prices_staging
+    ORDER BY price_date
+    ON CONFLICT (symbol, price_date) DO UPDATE SET
+        open_price = EXCLUDED.open_price,
+        high_price = EXCLUDED.high_price,
+        low_price = EXCLUDED.low_price,
+        close_price = EXCLUDED.close_price,
+        volume = EXCLUDED.volume
+    WHERE (prices.open_price, prices.high_price, prices.low_price, prices.close_price, prices.volume)
+        IS DISTINCT FROM
+        (EXCLUDED.open_price, EXCLUDED.high_price, EXCLUDED.low_price, EXCLUDED.close_price, EXCLUDED.volume)
+    RETURNING price_date
+    )
+    SELECT count(*), min(price_date) FROM merged
+"""
+
+ENSURE_STOCK_SQL = """
+    INSERT INTO stocks (symbol, name) VALUES (%s, %s)
+    ON CONFLICT (symbol) DO NOTHING
+"""
+
+CHECKPOINT_SQL = """
+    INSERT INTO ingest_checkpoints (source, symbol, rows_done) VALUES (%s, %s, %s)
+    ON CONFLICT (source, symbol) DO UPDATE SET
+        rows_done = EXCLUDED.rows_done,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+
+class IngestResult:
+    """Outcome of loading one symbol"""
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.rows_read = 0
+        self.rows_skipped = 0
+        self.rows_written = 0
+        self.chunks = 0
+        self.first_written = None     # earliest price_date inserted or changed
+        self.seconds = 0.0
+        self.error = None
+
+    @property
+    def rows_per_sec(self):
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+    def __repr__(self):
+        if self.error:
+            return f"{self.symbol}: FAILED after {self.rows_written} rows ({self.error})"
+        return (
+            f"{self.symbol}: {self.rows_written} written, {self.rows_skipped} skipped, "
+            f"{self.rows_read} read in {self.seconds:.2f}s ({self.rows_per_sec:,.0f} rows/s)"
+        )
+
+
+def normalize_frame(frame):
+    """
+    Return a frame with date/open/high/low/close/volume columns (plus symbol
+    if present), accepting yfinance-style names and a Date index.
+    """
+    frame = frame.copy()
+    if 'date' not in {str(c).lower() for c in frame.columns}:
+        frame = frame.reset_index()
+    frame.columns = [str(c).strip().lower() for c in frame.columns]
+
+    missing = [c for c in COLUMNS if c not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+
+    keep = COLUMNS + (['symbol'] if 'symbol' in frame.columns else [])
+    frame = frame[keep]
+    frame['date'] = pd.to_datetime(frame['date']).dt.date
+    return frame
+
+
+def load_symbol(pool, symbol, chunks, source=None):
+    """
+    Load an iterable of frames for one symbol.
+    Each chunk is COPYed into staging, merged into prices and committed.
+    With a `source` name the commit also records how many input rows are
+    done, and a later call with the same source resumes after them.
+    """
+    result = IngestResult(symbol)
+    started = time.perf_counter()
+
+    try:
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(STAGING_DDL)
+                cursor.execute(ENSURE_STOCK_SQL, (symbol, symbol))
+                done = 0
+                if source is not None:
+                    cursor.execute(
+                        "SELECT rows_done FROM ingest_checkpoints WHERE source = %s AND symbol = %s",
+                        (source, symbol),
+                    )
+                    row = cursor.fetchone()
+                    done = row[0] if row else 0
+                conn.commit()
+
+                position = 0
+                for chunk in chunks:
+                    chunk = normalize_frame(chunk)
+                    result.rows_read += len(chunk)
+                    position += len(chunk)
+                    skip = min(len(chunk), max(0, done - (position - len(chunk))))
+                    if skip:
+                        result.rows_skipped += skip
+                        chunk = chunk.iloc[skip:]
+                    if chunk.empty:
+                        continue
+
+                    buffer = io.StringIO()
+                    chunk[COLUMNS].to_csv(buffer, header=False, index=False)
+                    buffer.seek(0)
+
+                    cursor.execute("TRUNCATE prices_staging")
+                    cursor.copy_expert(COPY_SQL, buffer)
+                    cursor.execute(MERGE_SQL, (symbol,))
+                    written, first_written = cursor.fetchone()
+                    result.rows_written += written
+                    result.rows_skipped += len(chunk) - written
+                    if first_written is not None and (
+                            result.first_written is None or first_written < result.first_written):
+                        result.first_written = first_written
+                    if source is not None:
+                        cursor.execute(CHECKPOINT_SQL, (source, symbol, position))
+                    conn.commit()
+                    result.chunks += 1
+
+                if source is not None:
+                    cursor.execute(
+                        "DELETE FROM ingest_checkpoints WHERE source = %s AND symbol = %s",
+                        (source, symbol),
+                    )
+                    conn.commit()
+            finally:
+                cursor.close()
+    except Exception as e:
+        result.error = str(e)
+
+    result.seconds = time.perf_counter() - started
+    return result
+
+
+def ingest_frames(pool, frames, chunk_size=50000, workers=4, source=None, report=print):
+    """
+    Load {symbol: DataFrame} into prices, symbols in parallel.
+    Pass a `source` name to make an interrupted load resumable.
+    Returns the list of IngestResult.
+    """
+    def chunked(frame):
+        frame = normalize_frame(frame).sort_values('date')
+        for start in range(0, len(frame), chunk_size):
+            yield frame.iloc[start:start + chunk_size]
+
+    jobs = {symbol.upper(): (source, chunked(frame)) for symbol, frame in frames.items()}
+    return _run(pool, jobs, workers, report)
+
+
+def ingest_csv_files(pool, paths, chunk_size=50000, workers=4, resume=True, report=print):
+    """
+    Load CSV files into prices. Single-symbol files are streamed in chunks;
+    files with a Symbol column holding several symbols are split in memory.
+    """
+    jobs = {}
+    for path in paths:
+        source = source_name(path) if resume else None
+        header = pd.read_csv(path, nrows=0).columns
+        symbol_column = next((c for c in header if c.strip().lower() == 'symbol'), None)
+
+        if symbol_column is None:
+            symbol = os.path.splitext(os.path.basename(path))[0].upper()
+            jobs[symbol] = (source, pd.read_csv(path, chunksize=chunk_size))
+            continue
+
+        frame = pd.read_csv(path)
+        for symbol, group in frame.groupby(symbol_column):
+            group = group.sort_values(next(c for c in group.columns if c.strip().lower() == 'date'))
+            jobs[str(symbol).upper()] = (source, (
+                group.iloc[start:start + chunk_size]
+                for start in range(0, len(group), chunk_size)
+            ))
+
+    return _run(pool, jobs, workers, report)
+
+
+def source_name(path):
+    """Checkpoint key for a file; changes when the file does"""
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _run(pool, jobs, workers, report):
+    started = time.perf_counter()
+    lock = threading.Lock()
+    results = []
+
+    def work(symbol, job):
+        source, chunks = job
+        result = load_symbol(pool, symbol, chunks, source=source)
+        with lock:
+            results.append(result)
+            report(repr(result))
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for future in [executor.submit(work, s, j) for s, j in jobs.items()]:
+            future.result()
+
+    elapsed = time.perf_counter() - started
+    rows = sum(r.rows_read for r in results)
+    failed = [r.symbol for r in results if r.error]
+    report(
+        f"Loaded {len(results) - len(failed)}/{len(results)} symbols, {rows:,} rows "
+        f"in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)"
+    )
+    if failed:
+        report(f"Failed: {', '.join(failed)} (re-run to resume)")
+    return results
+
+
+def main(argv=None):
+    from src.db import pool_from_env
+
+    parser = argparse.ArgumentParser(description="Bulk load OHLCV CSV files into prices")
+    parser.add_argument("paths", nargs="+", help="CSV files to load")
+    parser.add_argument("--chunk-size", type=int, default=50000, help="rows per COPY/merge chunk")
+    parser.add_argument("--workers", type=int, default=4, help="symbols loaded in parallel")
+    parser.add_argument("--full", action="store_true",
+                        help="re-merge every row instead of resuming an interrupted load")
+    parser.add_argument("--no-store", action="store_true",
+                        help="do not refresh the memory-mapped price store afterwards")
+    parser.add_argument("--no-forecasts", action="store_true",
+                        help="do not regenerate stored forecasts afterwards")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    pool = pool_from_env(minconn=0, maxconn=max(1, args.workers))
+    try:
+        results = ingest_csv_files(
+            pool, args.paths,
+            chunk_size=args.chunk_size,
+            workers=args.workers,
+            resume=not args.full,
+        )
+        loaded = [r.symbol for r in results if r.rows_written]
+        store = None
+        if loaded and not args.no_store:
+            from src.stocks.store import PriceStore
+            store = PriceStore(os.getenv('PRICE_STORE_DIR', 'data/price_store'))
+            # Appends only cover dates after the last stored one; backfilled
+            # or corrected history needs the symbol rebuilt
+            for result in results:
+                last = store.last_date(result.symbol) if result.rows_written else None
+                if last is not None and result.first_written <= last:
+                    store.drop(result.symbol)
+            added = store.refresh(pool, loaded)
+            print(f"Price store: +{sum(added.values()):,} rows for {len(added)} symbols")
+        if loaded and not args.no_forecasts:
+            from src.ml.forecasts import generate_forecasts
+            from src.ml.registry import ModelRegistry
+            registry = ModelRegistry(os.getenv('MODEL_DIR', 'data/models'))
+            generate_forecasts(pool, registry, store, loaded,
+                               days=int(os.getenv('FORECAST_DAYS', '30')))
+    finally:
+        pool.close_all()
+    return 1 if any(r.error for r in results) else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
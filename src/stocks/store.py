@@ -0,0 +1,336 @@
+"""
+Columnar, memory-mapped price store.
+
+Each symbol is a directory of raw little-endian column files plus a small
+meta.json:
+
+    <root>/LMT/date.bin     int64 days since 1970-01-01 (viewed as datetime64[D])
+    <root>/LMT/open.bin     float64
+    <root>/LMT/high.bin     float64
+    <root>/LMT/low.bin      float64
+    <root>/LMT/close.bin    float64
+    <root>/LMT/volume.bin   int64
+    <root>/LMT/meta.json    {"rows": n, "last_date": "YYYY-MM-DD"}
+
+Readers map the first `rows` elements of each file read-only, so every worker
+process on the host shares the same page-cache pages. Date-range queries use
+a binary search on the date column and return zero-copy slices.
+
+Refreshes only append rows newer than the last stored date; new data becomes
+visible to readers when meta.json is replaced, which happens after the column
+files are written. Writers serialize on an flock.
+
+Usage:
+    python -m src.stocks.store            # refresh every symbol from prices
+    python -m src.stocks.store LMT RTX    # refresh selected symbols
+    python -m src.stocks.store --rebuild  # drop and reload everything
+"""
+import argparse
+import fcntl
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+from dotenv import load_dotenv
+
+COLUMNS = (
+    ('date', np.dtype('<i8')),
+    ('open', np.dtype('<f8')),
+    ('high', np.dtype('<f8')),
+    ('low', np.dtype('<f8')),
+    ('close', np.dtype('<f8')),
+    ('volume', np.dtype('<i8')),
+)
+
+REFRESH_SQL = """
+    SELECT p.symbol, p.price_date, p.open_price, p.high_price, p.low_price, p.close_price, p.volume
+    FROM prices p
+    LEFT JOIN unnest(%s::text[], %s::date[]) AS known(symbol, last_date)
+        ON known.symbol = p.symbol
+    WHERE p.symbol = ANY(%s)
+      AND p.price_date > COALESCE(known.last_date, '-infinity'::date)
+    ORDER BY p.symbol, p.price_date
+"""
+
+REFRESH_FETCH_SIZE = 10000
+
+
+class PriceSeries:
+    """OHLCV columns for one symbol; arrays may be views into the mapped files"""
+
+    __slots__ = ('symbol', 'dates', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, symbol, dates, open, high, low, close, volume):
+        self.symbol = symbol
+        self.dates = dates
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __len__(self):
+        return len(self.dates)
+
+    def __getitem__(self, key):
+        """Slice every column at once (views, no copies)"""
+        return PriceSeries(
+            self.symbol, self.dates[key], self.open[key], self.high[key],
+            self.low[key], self.close[key], self.volume[key],
+        )
+
+    def rows(self):
+        """(date, open, high, low, close, volume) tuples"""
+        return list(zip(
+            self.dates.astype(object).tolist(), self.open.tolist(), self.high.tolist(),
+            self.low.tolist(), self.close.tolist(), self.volume.tolist(),
+        ))
+
+
+class PriceStore:
+    """Per-symbol memory-mapped OHLCV columns under `root`"""
+
+    def __init__(self, root, check_interval=5.0):
+        self.root = root
+        self.check_interval = check_interval
+        self._mapped = {}     # symbol -> (meta mtime_ns, checked_at, PriceSeries)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def symbols(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.exists(os.path.join(self.root, name, 'meta.json'))
+        )
+
+    def series(self, symbol):
+        """Full history for symbol, or None if it is not stored"""
+        symbol = symbol.upper()
+        now = time.monotonic()
+        with self._lock:
+            cached = self._mapped.get(symbol)
+        if cached and now - cached[1] < self.check_interval:
+            return cached[2]
+
+        meta_path = os.path.join(self.root, symbol, 'meta.json')
+        try:
+            mtime = os.stat(meta_path).st_mtime_ns
+        except FileNotFoundError:
+            with self._lock:
+                self._mapped.pop(symbol, None)
+            return None
+
+        if cached and cached[0] == mtime:
+            series = cached[2]
+        else:
+            series = self._map(symbol, meta_path)
+        with self._lock:
+            self._mapped[symbol] = (mtime, now, series)
+        return series
+
+    def window(self, symbol, start=None, end=None):
+        """
+        Rows with start <= date <= end as zero-copy views (binary search on
+        the date column). Returns None if the symbol is not stored.
+        """
+        series = self.series(symbol)
+        if series is None:
+            return None
+        lo = 0 if start is None else np.searchsorted(series.dates, np.datetime64(start, 'D'), 'left')
+        hi = len(series) if end is None else np.searchsorted(series.dates, np.datetime64(end, 'D'), 'right')
+        return series[lo:hi]
+
+    def last_date(self, symbol):
+        series = self.series(symbol)
+        if series is None or len(series) == 0:
+            return None
+        return series.dates[-1].astype(object)
+
+    def latest_close(self, symbol):
+        series = self.series(symbol)
+        if series is None or len(series) == 0:
+            return None
+        return float(series.close[-1])
+
+    def _map(self, symbol, meta_path):
+        with open(meta_path) as f:
+            rows = json.load(f)['rows']
+
+        columns = {}
+        for name, dtype in COLUMNS:
+            path = os.path.join(self.root, symbol, f'{name}.bin')
+            if rows == 0:
+                columns[name] = np.empty(0, dtype=dtype)
+            else:
+                columns[name] = np.memmap(path, dtype=dtype, mode='r', shape=(rows,))
+        return PriceSeries(
+            symbol, columns['date'].view('datetime64[D]'), columns['open'],
+            columns['high'], columns['low'], columns['close'], columns['volume'],
+        )
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def append(self, symbol, dates, open, high, low, close, volume):
+        """Append rows (dates strictly after the last stored date) for symbol"""
+        symbol = symbol.upper()
+        with self._writer_lock():
+            return self._append_locked(symbol, {
+                'date': np.asarray(dates, dtype='datetime64[D]').astype('<i8'),
+                'open': open, 'high': high, 'low': low, 'close': close, 'volume': volume,
+            })
+
+    def drop(self, symbol):
+        with self._writer_lock():
+            shutil.rmtree(os.path.join(self.root, symbol.upper()), ignore_errors=True)
+
+    def refresh(self, pool, symbols=None):
+        """
+        Append rows newer than each symbol's last stored date from the prices
+        table, streamed through a server-side cursor.
+        Returns {symbol: rows appended}.
+        """
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                if symbols is None:
+                    cursor.execute("SELECT symbol FROM stocks ORDER BY symbol")
+                    symbols = [row[0] for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+            symbols = [s.upper() for s in symbols]
+
+            with self._writer_lock():
+                known = [(s, self._stored_meta(s)) for s in symbols]
+                known = [(s, meta['last_date']) for s, meta in known if meta and meta['last_date']]
+
+                added = dict.fromkeys(symbols, 0)
+                stream = conn.cursor(name='price_store_refresh')
+                stream.itersize = REFRESH_FETCH_SIZE
+                try:
+                    stream.execute(REFRESH_SQL, (
+                        [s for s, _ in known], [d for _, d in known], symbols,
+                    ))
+                    pending_symbol, pending = None, []
+                    for row in stream:
+                        if row[0] != pending_symbol and pending:
+                            added[pending_symbol] += self._append_rows(pending_symbol, pending)
+                            pending = []
+                        pending_symbol = row[0]
+                        pending.append(row[1:])
+                        if len(pending) >= REFRESH_FETCH_SIZE:
+                            added[pending_symbol] += self._append_rows(pending_symbol, pending)
+                            pending = []
+                    if pending:
+                        added[pending_symbol] += self._append_rows(pending_symbol, pending)
+                finally:
+                    stream.close()
+            conn.commit()
+        return added
+
+    def _append_rows(self, symbol, rows):
+        dates, o, h, l, c, v = zip(*rows)
+        return self._append_locked(symbol, {
+            'date': np.array(dates, dtype='datetime64[D]').astype('<i8'),
+            'open': np.array(o, dtype=float), 'high': np.array(h, dtype=float),
+            'low': np.array(l, dtype=float), 'close': np.array(c, dtype=float),
+            'volume': np.array([x or 0 for x in v], dtype='<i8'),
+        })
+
+    def _append_locked(self, symbol, columns):
+        directory = os.path.join(self.root, symbol)
+        os.makedirs(directory, exist_ok=True)
+        meta = self._stored_meta(symbol) or {'rows': 0, 'last_date': None}
+
+        dates = columns['date']
+        if meta['last_date'] is not None:
+            last = np.datetime64(meta['last_date'], 'D').astype('<i8')
+            keep = dates > last
+            columns = {name: np.asarray(values)[keep] for name, values in columns.items()}
+            dates = columns['date']
+        if len(dates) == 0:
+            if not os.path.exists(os.path.join(directory, 'meta.json')):
+                self._write_meta(directory, meta)
+            return 0
+
+        for name, dtype in COLUMNS:
+            path = os.path.join(directory, f'{name}.bin')
+            with open(path, 'ab') as f:
+                # Drop any tail left behind by an interrupted append
+                f.truncate(meta['rows'] * dtype.itemsize)
+                f.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        meta = {
+            'rows': meta['rows'] + len(dates),
+            'last_date': str(np.datetime64(int(dates[-1]), 'D')),
+        }
+        self._write_meta(directory, meta)
+        return len(dates)
+
+    def _stored_meta(self, symbol):
+        try:
+            with open(os.path.join(self.root, symbol, 'meta.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _write_meta(directory, meta):
+        tmp = os.path.join(directory, 'meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, os.path.join(directory, 'meta.json'))
+
+    @contextmanager
+    def _writer_lock(self):
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, '.lock'), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def main(argv=None):
+    from src.db import pool_from_env
+
+    parser = argparse.ArgumentParser(description="Refresh the memory-mapped price store from prices")
+    parser.add_argument("symbols", nargs="*", help="symbols to refresh (default: all in stocks)")
+    parser.add_argument("--root", default=None, help="store directory (default: PRICE_STORE_DIR)")
+    parser.add_argument("--rebuild", action="store_true", help="drop stored data before loading")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    store = PriceStore(args.root or os.getenv('PRICE_STORE_DIR', 'data/price_store'))
+    pool = pool_from_env(minconn=0, maxconn=1)
+    try:
+        if args.rebuild:
+            for symbol in args.symbols or store.symbols():
+                store.drop(symbol)
+        started = time.perf_counter()
+        added = store.refresh(pool, args.symbols or None)
+        elapsed = time.perf_counter() - started
+    finally:
+        pool.close_all()
+
+    for symbol, rows in sorted(added.items()):
+        print(f"{symbol}: +{rows} rows (through {store.last_date(symbol) or '-'})")
+    print(f"Refreshed {len(added)} symbols in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,113 @@
+"""
+Auth Audit Writer Tests
+Test ID: AUD-001 through AUD-005
+"""
+import pytest
+import threading
+import time
+import sys
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, '.')
+from src.audit import AuditWriter
+
+
+class FakePool:
+    """Pool stand-in that hands out MagicMock connections"""
+
+    def __init__(self, fail=False, gate=None):
+        self.fail = fail
+        self.gate = gate        # Event the connection waits on, to simulate a stuck database
+
+    @contextmanager
+    def connection(self, timeout=None):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        if self.gate is not None:
+            self.gate.wait()
+        yield MagicMock()
+
+
+@pytest.fixture
+def inserted():
+    """Patch execute_values and collect every inserted batch"""
+    batches = []
+
+    def fake_execute_values(cursor, sql, rows, page_size=None):
+        batches.append(list(rows))
+
+    with patch('src.audit.execute_values', side_effect=fake_execute_values):
+        yield batches
+
+
+class TestAuditWriter:
+    """Batching, overflow and shutdown behaviour"""
+
+    def test_events_written_in_batches(self, inserted):
+        """AUD-001: Events are grouped into multi-row inserts by batch_size"""
+        writer = AuditWriter(FakePool(), batch_size=10, flush_interval=5)
+
+        for i in range(25):
+            writer.record('login_success', f'user{i}@example.com', i, '127.0.0.1')
+        writer.close()
+
+        assert [len(b) for b in inserted] == [10, 10, 5]
+        assert writer.stats()['written'] == 25
+
+    def test_partial_batch_flushed_after_interval(self, inserted):
+        """AUD-002: A small batch is written once flush_interval elapses"""
+        writer = AuditWriter(FakePool(), batch_size=100, flush_interval=0.05)
+        writer.record('register', 'new@example.com', 1, '127.0.0.1')
+
+        deadline = time.time() + 2
+        while not inserted and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert len(inserted) == 1
+        assert inserted[0][0][2] == 'register'
+        # Aware, so PostgreSQL converts it to the session zone like the column default
+        assert inserted[0][0][4].utcoffset() == timedelta(0)
+        writer.close()
+
+    def test_full_queue_drops_events(self):
+        """AUD-003: Requests never block when the queue is full"""
+        writer = AuditWriter(FakePool(), max_queue=2, overflow='drop')
+        writer._ensure_started = lambda: None   # keep the worker from draining
+
+        results = [writer.record('login_failed', 'x@example.com') for _ in range(5)]
+
+        assert results == [True, True, False, False, False]
+        assert writer.stats()['dropped'] == 3
+
+    def test_database_errors_are_counted(self):
+        """AUD-004: Failed flushes are recorded without raising"""
+        writer = AuditWriter(FakePool(fail=True), batch_size=5)
+
+        for _ in range(3):
+            writer.record('login_failed', 'x@example.com')
+        writer.close()
+
+        assert writer.stats()['failed'] == 3
+        assert writer.stats()['written'] == 0
+
+    def test_close_does_not_hang_on_full_queue(self, inserted):
+        """AUD-005: close() gives up after its timeout when the worker is stuck"""
+        gate = threading.Event()
+        writer = AuditWriter(FakePool(gate=gate), batch_size=1, max_queue=2)
+        writer.record('login_failed', 'x@example.com')
+        deadline = time.time() + 2
+        while writer.stats()['queue_depth'] and time.time() < deadline:
+            time.sleep(0.01)                   # worker has taken it and is stuck writing
+        writer.record('login_failed', 'y@example.com')
+        writer.record('login_failed', 'z@example.com')
+
+        started = time.monotonic()
+        writer.close(timeout=0.2)
+        assert time.monotonic() - started < 1
+
+        gate.set()
+        writer._thread.join(2)
+        assert not writer._thread.is_alive()
+        assert writer.stats()['written'] == 3
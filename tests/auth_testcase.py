@@ -0,0 +1,173 @@
+"""
+Login / Register Data Path Tests
+Test ID: AUTH-001 through AUTH-004
+"""
+import itertools
+import pytest
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+sys.path.insert(0, '.')
+
+# A fresh client address per test keeps the per-IP rate limits out of the way
+_addresses = itertools.count(1)
+
+
+class UsersPool:
+    """
+    Pool stand-in holding a users table in memory. It answers the auth
+    statements the way PostgreSQL would and records every statement run.
+    """
+
+    def __init__(self, app_module):
+        self.app = app_module
+        self.users = {}
+        self.executed = []
+        self.autocommit = []
+
+    def add_user(self, email, password, **columns):
+        self.users[email] = {
+            "id": len(self.users) + 1, "email": email, "password_hash": f"hashed:{password}",
+            "created_at": datetime(2025, 9, 17), "last_login": None,
+            "failed_attempts": 0, "locked_until": None, **columns,
+        }
+        return self.users[email]
+
+    @contextmanager
+    def connection(self, timeout=None, autocommit=False):
+        self.autocommit.append(autocommit)
+        conn = MagicMock()
+        cursor = conn.cursor.return_value
+        cursor.execute.side_effect = lambda sql, params=None: self._execute(cursor, sql, params)
+        yield conn
+
+    def _execute(self, cursor, sql, params):
+        self.executed.append(sql)
+        now = datetime.utcnow()
+        by_id = {user['id']: user for user in self.users.values()}
+        unlocked = lambda user: user['locked_until'] is None or user['locked_until'] <= now
+
+        if sql == self.app.REGISTER_USER_SQL:
+            email, password_hash, role = params
+            if email in self.users:
+                row = None
+            else:
+                user = self.add_user(email, '')
+                user['password_hash'] = password_hash
+                row = {key: user[key] for key in ('id', 'email', 'created_at')}
+        elif sql == self.app.LOGIN_LOOKUP_SQL:
+            user = self.users.get(params[0])
+            row = user and {
+                **{key: user[key] for key in ('id', 'email', 'password_hash')},
+                "locked_for": 0 if unlocked(user) else (user['locked_until'] - now).total_seconds(),
+            }
+        elif sql == self.app.LOGIN_SUCCESS_SQL:
+            user = by_id[params[0]]
+            row = None
+            if unlocked(user):
+                user.update(last_login=now, failed_attempts=0, locked_until=None)
+                row = {"id": user['id'], "email": user['email']}
+        elif sql == self.app.LOGIN_FAILURE_SQL:
+            user = by_id[params['id']]
+            row = None
+            if unlocked(user):
+                attempts = user['failed_attempts'] + 1
+                locked = attempts >= params['max_attempts']
+                user['failed_attempts'] = 0 if locked else attempts
+                user['locked_until'] = now + timedelta(seconds=params['lockout']) if locked else None
+                row = {"failed_attempts": user['failed_attempts'], "locked": locked}
+        else:
+            raise AssertionError(f"Unexpected statement: {sql}")
+        cursor.fetchone.return_value = row
+
+
+@pytest.fixture
+def auth(client, monkeypatch):
+    """Test client wired to a fake users table, hasher and audit log"""
+    import app as app_module
+
+    pool = UsersPool(app_module)
+    events = []
+    verifies = []
+
+    def verify(password, password_hash):
+        verifies.append(password)
+        return password_hash == f"hashed:{password}"
+
+    monkeypatch.setattr(app_module, 'db_pool', pool)
+    monkeypatch.setattr(app_module, 'password_hasher', SimpleNamespace(
+        hash=lambda password: f"hashed:{password}", verify=verify))
+    monkeypatch.setattr(app_module, 'audit_writer', SimpleNamespace(
+        record=lambda action, email, user_id, ip: events.append((action, email))))
+    monkeypatch.setattr(app_module, 'MAX_LOGIN_ATTEMPTS', 3)
+
+    address = f"10.25.0.{next(_addresses)}"
+
+    def post(path, email, password):
+        return client.post(path, json={"email": email, "password": password},
+                           environ_base={'REMOTE_ADDR': address})
+
+    return SimpleNamespace(pool=pool, events=events, verifies=verifies, post=post)
+
+
+class TestRegister:
+    """Existence check and insert in a single statement"""
+
+    def test_register_is_one_statement(self, auth):
+        """AUTH-001: Register runs one autocommit INSERT ... ON CONFLICT"""
+        response = auth.post('/api/register', 'new@example.com', 'long-enough-1')
+
+        assert response.status_code == 201
+        assert response.get_json()['user']['email'] == 'new@example.com'
+        assert len(auth.pool.executed) == 1 and 'ON CONFLICT (email) DO NOTHING' in auth.pool.executed[0]
+        assert auth.pool.autocommit == [True]
+        assert auth.events == [('register', 'new@example.com')]
+
+        duplicate = auth.post('/api/register', 'new@example.com', 'long-enough-2')
+        assert duplicate.status_code == 409
+        assert len(auth.pool.executed) == 2
+
+
+class TestLogin:
+    """Lookup plus one counter update per attempt, with lockout"""
+
+    def test_success_resets_failures(self, auth):
+        """AUTH-002: A successful login is a lookup and one UPDATE"""
+        user = auth.pool.add_user('pilot@example.com', 'correct-horse', failed_attempts=2)
+
+        response = auth.post('/api/login', 'pilot@example.com', 'correct-horse')
+
+        assert response.status_code == 200
+        assert response.get_json()['user'] == {"id": user['id'], "email": 'pilot@example.com'}
+        assert auth.pool.executed == [auth.pool.app.LOGIN_LOOKUP_SQL, auth.pool.app.LOGIN_SUCCESS_SQL]
+        assert user['failed_attempts'] == 0 and user['last_login'] is not None
+        assert auth.pool.autocommit == [True, True]
+
+    def test_failures_lock_the_account(self, auth):
+        """AUTH-003: MAX_LOGIN_ATTEMPTS wrong passwords lock the account"""
+        user = auth.pool.add_user('pilot@example.com', 'correct-horse')
+
+        statuses = [auth.post('/api/login', 'pilot@example.com', 'wrong').status_code for _ in range(3)]
+
+        assert statuses == [401, 401, 423]
+        assert user['locked_until'] is not None and user['failed_attempts'] == 0
+        assert len(auth.pool.executed) == 6
+
+        # The right password is refused while locked, without a bcrypt verify
+        locked = auth.post('/api/login', 'pilot@example.com', 'correct-horse')
+        assert locked.status_code == 423
+        assert 1 <= int(locked.headers['Retry-After']) <= 15 * 60
+        assert auth.verifies == ['wrong'] * 3
+        assert auth.events[-1] == ('login_locked', 'pilot@example.com')
+
+    def test_expired_lock_allows_login(self, auth):
+        """AUTH-004: Once locked_until passes the account logs in again"""
+        user = auth.pool.add_user('pilot@example.com', 'correct-horse',
+                                  locked_until=datetime.utcnow() - timedelta(seconds=1))
+
+        assert auth.post('/api/login', 'pilot@example.com', 'correct-horse').status_code == 200
+        assert user['locked_until'] is None
+        assert auth.post('/api/login', 'nobody@example.com', 'correct-horse').status_code == 401
@@ -0,0 +1,97 @@
+"""
+Batched Prediction Tests
+Test ID: BPRED-001 through BPRED-004
+"""
+import pytest
+import sys
+
+import numpy as np
+
+sys.path.insert(0, '.')
+from src.ml.predictor import StockPredictor, feature_matrix, forecast_many
+from src.ml.registry import ModelRegistry
+from src.stocks.store import PriceStore
+from tests.conftest import make_price_frame
+
+
+@pytest.fixture(scope='module')
+def models():
+    return {
+        symbol: StockPredictor(seed=seed).train(make_price_frame(300, seed=seed), epochs=5)
+        for seed, symbol in enumerate(['LMT', 'RTX', 'NOC'])
+    }
+
+
+@pytest.fixture
+def batch_client(client, tmp_path, models, monkeypatch):
+    import app as app_module
+
+    registry = ModelRegistry(str(tmp_path / 'models'), check_interval=0)
+    for symbol, predictor in models.items():
+        registry.publish(symbol, predictor)
+    monkeypatch.setattr(app_module, 'model_registry', registry)
+    monkeypatch.setattr(app_module, 'price_store', PriceStore(str(tmp_path / 'prices')))
+    return client
+
+
+class TestForecastMany:
+    """Vectorized inference across models"""
+
+    def test_batch_matches_single_forecasts(self, models):
+        """BPRED-001: Stacked inference gives each model's own forecast"""
+        predictors = list(models.values())
+        windows = [p.history for p in predictors]
+
+        batch = forecast_many(predictors, windows, 10)
+
+        assert batch.shape == (3, 10)
+        for row, predictor in zip(batch, predictors):
+            assert np.allclose(row, predictor.forecast(predictor.history, 10))
+
+    def test_first_step_matches_feature_matrix(self, models):
+        """BPRED-002: Carried indicator state reproduces the full feature computation"""
+        predictor = models['LMT']
+        closes = make_price_frame(300)['Close'].to_numpy()
+
+        row = feature_matrix(closes[-120:])[-1]
+        expected = closes[-1] * np.exp(predictor._predict_returns(row[None, :])[0])
+
+        assert forecast_many([predictor], [closes], 1)[0, 0] == pytest.approx(expected)
+
+
+class TestBatchEndpoint:
+    """POST /predict/batch"""
+
+    def test_many_tickers_and_horizons(self, batch_client, models):
+        """BPRED-003: One response covers every ticker at its own horizon"""
+        response = batch_client.post('/predict/batch', json={
+            'tickers': ['LMT', 'rtx', 'NOC', 'GD'],
+            'days': 5,
+            'horizons': {'NOC': 30},
+        })
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert set(data['predictions']) == {'LMT', 'RTX', 'NOC', 'GD'}
+        assert len(data['predictions']['LMT']['predictions']) == 5
+        assert len(data['predictions']['NOC']['predictions']) == 30
+        assert data['predictions']['RTX']['model']['version'] == 1
+        assert 'model' not in data['predictions']['GD']      # no model: linear fallback
+
+        single = batch_client.get('/predict?ticker=NOC&days=30').get_json()
+        assert single['predictions'] == data['predictions']['NOC']['predictions']
+
+    def test_invalid_entries_reported(self, batch_client):
+        """BPRED-004: Bad tickers and horizons are reported without failing the batch"""
+        response = batch_client.post('/predict/batch', json={
+            'tickers': ['LMT', '<script>', 'RTX'],
+            'horizons': {'RTX': 99},
+        })
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert list(data['predictions']) == ['LMT']
+        assert set(data['errors']) == {'<script>', 'RTX'}
+
+        assert batch_client.post('/predict/batch', json={'tickers': []}).status_code == 400
+        assert batch_client.post('/predict/batch', json={'tickers': ['LMT'], 'days': 0}).status_code == 400
@@ -0,0 +1,145 @@
+"""
+Load Benchmark Tests
+Test ID: BENCH-001 through BENCH-005
+"""
+import json
+import pytest
+import sys
+import threading
+import time
+
+from flask import Flask, jsonify
+from werkzeug.serving import make_server
+
+sys.path.insert(0, '.')
+from src.benchmark import HttpSender, compare, main, parse_mix, prepare_data, run_load, summarize, synthetic_prices
+from tests.ingest_testcase import CopyRecorder
+
+
+@pytest.fixture
+def server():
+    """Throwaway app on a random port answering the benchmarked routes"""
+    app = Flask(__name__)
+
+    @app.get("/health")
+    def health():
+        return jsonify({"status": "ok"})
+
+    @app.post("/api/login")
+    def login():
+        return jsonify({"error": "Invalid email or password"}), 401
+
+    @app.post("/api/register")
+    def register():
+        return jsonify({"message": "Registration successful"}), 201
+
+    httpd = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+
+class TestReport:
+    """Summaries and regression checks"""
+
+    def test_summary_percentiles(self):
+        """BENCH-001: Percentiles are in ms and non-2xx responses count as errors"""
+        samples = [(i / 1000, 200) for i in range(1, 101)] + [(0.5, 500), (0.001, 0)]
+
+        summary = summarize(samples, 2.0)
+
+        assert summary['requests'] == 102 and summary['errors'] == 2
+        assert summary['throughput'] == 51.0
+        assert summary['status'] == {'0': 1, '200': 100, '500': 1}
+        assert 50 <= summary['p50_ms'] <= 52 and summary['max_ms'] == 500.0
+        assert summarize([], 1.0)['requests'] == 0
+
+    def test_compare_flags_slowdowns(self):
+        """BENCH-002: Only slowdowns and throughput drops beyond the tolerance are reported"""
+        route = {'requests': 100, 'throughput': 100.0, 'p50_ms': 10.0, 'p95_ms': 20.0, 'p99_ms': 30.0}
+        baseline = {'routes': {'predict': route, 'health': route}}
+        current = {'routes': {
+            'predict': {**route, 'p95_ms': 25.0, 'throughput': 80.0},
+            'health': {**route, 'p50_ms': 11.0, 'throughput': 150.0},
+            'login': route,
+        }}
+
+        regressions = compare(baseline, current, tolerance=0.15)
+
+        assert len(regressions) == 2
+        assert all(line.startswith('predict') for line in regressions)
+        with pytest.raises(ValueError):
+            parse_mix('predict=1,teleport=2')
+
+
+class TestLoad:
+    """Closed-loop load generation"""
+
+    def test_mix_and_concurrency(self):
+        """BENCH-003: Clients run concurrently and only send routes from the mix"""
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def send(method, path, body):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.005)
+            with lock:
+                active[0] -= 1
+            return 503 if path == '/health' else 200
+
+        samples, elapsed = run_load(send, parse_mix('predict=3,health=1'), concurrency=4,
+                                    duration=0.3, warmup=0.05)
+
+        assert set(samples) == {'predict', 'health'}
+        assert len(samples['predict']) > len(samples['health']) > 0
+        assert all(status == 503 for _, status in samples['health'])
+        assert peak[0] == 4 and elapsed >= 0.3
+
+    def test_main_writes_report(self, server, tmp_path, capsys):
+        """BENCH-004: A run against a live server writes a comparable JSON report"""
+        output = tmp_path / 'run.json'
+        args = ['--url', server, '--mix', 'health=2,login=1', '--concurrency', '2',
+                '--duration', '0.3', '--warmup', '0', '--output', str(output)]
+
+        assert main(args) == 0
+        report = json.loads(output.read_text())
+        assert set(report['routes']) == {'health', 'login'}
+        assert report['routes']['health']['errors'] == 0
+        assert report['routes']['login']['status'] == {'401': report['routes']['login']['requests']}
+        assert {'p50_ms', 'p95_ms', 'p99_ms'} <= set(report['total'])
+
+        assert main(['--results', str(output), '--baseline', str(output)]) == 0
+        assert isinstance(HttpSender(server)('GET', '/health'), int)
+
+
+class TestData:
+    """Local, reproducible data behind the benchmarked routes"""
+
+    def test_prepare_data_publishes_models(self, tmp_path, monkeypatch):
+        """BENCH-005: Seeded multi-year history is loaded, stored and modeled"""
+        import src.db
+        import src.ml.forecasts
+        from src.ml.registry import ModelRegistry
+        from src.stocks.history import period_start
+        from src.stocks.store import PriceStore
+
+        frame = synthetic_prices('NOC', seed=3)
+        assert frame.equals(synthetic_prices('NOC', seed=3))
+        assert not frame.equals(synthetic_prices('LMT', seed=3))
+        assert frame.index[0].date() <= period_start('5y')
+
+        pool = CopyRecorder()
+        pool.close_all = lambda: None
+        forecasts = []
+        monkeypatch.setattr(src.db, 'ConnectionPool', lambda config, **kwargs: pool)
+        monkeypatch.setattr(src.ml.forecasts, 'execute_values',
+                            lambda cursor, sql, rows, page_size=None: forecasts.extend(rows))
+
+        env = prepare_data({}, ['NOC', 'LMT'], str(tmp_path / 'bench'), seed=3)
+
+        store = PriceStore(env['PRICE_STORE_DIR'])
+        assert len(store.series('NOC')) == len(frame)
+        assert ModelRegistry(env['MODEL_DIR']).symbols() == ['LMT', 'NOC']
+        assert {row[0] for row in forecasts} == {'LMT', 'NOC'}
@@ -0,0 +1,107 @@
+"""
+Binary Response Format Tests
+Test ID: FMT-001 through FMT-005
+"""
+import pytest
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, '.')
+from src.stocks.cache import TTLCache
+from src.stocks.history import StockHistoryService
+from tests.history_stream_testcase import StreamingDatabase, stored_history
+
+pa = pytest.importorskip('pyarrow')
+msgpack = pytest.importorskip('msgpack')
+
+ARROW = {'Accept': 'application/vnd.apache.arrow.stream'}
+MSGPACK = {'Accept': 'application/msgpack'}
+
+
+def read_arrow(response):
+    assert response.mimetype == ARROW['Accept']
+    return pa.ipc.open_stream(response.get_data()).read_all()
+
+
+def upstream_rows(ticker, period):
+    if ticker != 'RTX':
+        return []
+    today = date.today()
+    return [(today - timedelta(days=300 - i), 90.0 + i, 91.0 + i, 89.0 + i, 90.123 + i, 500) for i in range(300)]
+
+
+@pytest.fixture
+def history_client(client, tmp_path, monkeypatch):
+    import app as app_module
+
+    stale = StreamingDatabase([(date(2000, 1, 3), 1.0, 1.0, 1.0, 1.0, 1)])
+    service = StockHistoryService(
+        stale, TTLCache(), fetch=upstream_rows, write_back=False,
+        store=stored_history(str(tmp_path / 'prices'), 400),
+    )
+    monkeypatch.setattr(app_module, 'stock_history', service)
+    return client
+
+
+class TestHistoryFormats:
+    """Stock history endpoints"""
+
+    def test_arrow_history_matches_json(self, history_client):
+        """FMT-001: Arrow columns carry the JSON rows (unrounded) and payload fields"""
+        rows = history_client.get('/api/stocks/LMT?period=1y').get_json()['historical_data']
+
+        table = read_arrow(history_client.get('/api/stocks/LMT?period=1y', headers=ARROW))
+
+        assert table.column_names == ['Date', 'Open', 'High', 'Low', 'Close', 'Volume']
+        assert str(table.schema.field('Date').type) == 'date32[day]'
+        assert table.num_rows == len(rows)
+        assert table.column('Close').to_pylist() == pytest.approx([r['Close'] for r in rows], abs=0.005)
+        assert table.schema.metadata[b'ticker'] == b'"LMT"'
+
+    def test_msgpack_history_from_upstream(self, history_client):
+        """FMT-002: Histories without stored columns are converted from the payload"""
+        body = msgpack.unpackb(history_client.get('/api/stocks/RTX?format=msgpack').get_data())
+        rows = history_client.get('/api/stocks/RTX').get_json()['historical_data']
+
+        assert body['ticker'] == 'RTX' and body['count'] == len(rows)
+        assert body['historical_data']['Date'] == [r['Date'] for r in rows]
+        assert body['historical_data']['Close'] == [r['Close'] for r in rows]
+
+    def test_batch_is_one_long_table(self, history_client):
+        """FMT-003: Batch histories stack into one table with a Symbol column"""
+        response = history_client.post('/api/stocks/batch?format=arrow', json={
+            'tickers': ['LMT', 'RTX', 'NOPE'], 'period': '6mo',
+        })
+        table = read_arrow(response)
+        symbols = table.column('Symbol').to_pylist()
+
+        assert set(symbols) == {'LMT', 'RTX'}
+        assert symbols == sorted(symbols)
+        assert b'NOPE' in table.schema.metadata[b'errors']
+
+
+class TestPredictionFormats:
+    """/predict and /predict/batch"""
+
+    def test_prediction_columns(self, client):
+        """FMT-004: Predictions serialize as date/price columns"""
+        expected = client.get('/predict?ticker=LMT&days=5').get_json()
+
+        body = msgpack.unpackb(client.get('/predict?ticker=LMT&days=5', headers=MSGPACK).get_data())
+        table = read_arrow(client.post('/predict/batch', headers=ARROW, json={
+            'tickers': ['LMT', 'RTX', '<bad>'], 'days': 3,
+        }))
+
+        assert body['source'] == expected['source']
+        assert body['predictions']['price'] == pytest.approx([p['price'] for p in expected['predictions']], abs=0.005)
+        assert table.column('ticker').to_pylist() == ['LMT'] * 3 + ['RTX'] * 3
+        assert b'<bad>' in table.schema.metadata[b'errors']
+
+    def test_json_default_and_unavailable_formats(self, client, monkeypatch):
+        """FMT-005: JSON stays the default; unknown or missing formats are refused"""
+        response = client.get('/predict?ticker=LMT', headers={'Accept': 'text/html,*/*;q=0.8'})
+        assert response.mimetype == 'application/json'
+        assert client.get('/predict?ticker=LMT&format=xml').status_code == 400
+
+        monkeypatch.setitem(sys.modules, 'pyarrow', None)
+        assert client.get('/predict?ticker=LMT', headers=ARROW).status_code == 406
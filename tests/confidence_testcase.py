@@ -0,0 +1,111 @@
+"""
+Monte Carlo Confidence Band Tests
+Test ID: CONF-001 through CONF-005
+"""
+import pytest
+import sys
+
+import numpy as np
+
+sys.path.insert(0, '.')
+from src.ml.forecasts import ForecastService, PathBudget, generate_forecasts
+from src.ml.predictor import StockPredictor, confidence_bands, simulate_paths
+from src.ml.registry import ModelRegistry
+from src.stocks.cache import TTLCache
+from src.stocks.store import PriceStore
+from tests.conftest import make_price_frame
+from tests.forecast_table_testcase import PredictionsPool, pool
+
+
+@pytest.fixture(scope='module')
+def predictor():
+    return StockPredictor().train(make_price_frame(300), epochs=5)
+
+
+@pytest.fixture
+def published(tmp_path, predictor):
+    registry = ModelRegistry(str(tmp_path / 'models'), check_interval=0)
+    registry.publish('LMT', predictor)
+    return registry
+
+
+class TestSimulation:
+    """Residual-bootstrapped path simulation"""
+
+    def test_bands_surround_forecast(self, predictor):
+        """CONF-001: Row 0 is the point forecast and bands widen with the horizon"""
+        closes = predictor.history
+        paths = simulate_paths(predictor, closes, 30, 1000, np.random.default_rng(0))
+        bands = confidence_bands(paths, 0.9)
+
+        assert paths.shape == (1001, 30)
+        assert np.allclose(paths[0], predictor.forecast(closes, 30))
+        assert np.all(bands['lower'] <= bands['upper'])
+        assert bands['upper'][-1] - bands['lower'][-1] > bands['upper'][0] - bands['lower'][0]
+        assert np.all((bands['confidence'] >= 0) & (bands['confidence'] <= 1))
+        assert bands['confidence'][0] > bands['confidence'][-1]
+
+    def test_residuals_are_saved_and_resampled(self, predictor):
+        """CONF-002: Shocks are drawn from the saved in-sample residuals"""
+        restored = StockPredictor.from_bytes(predictor.to_bytes())
+
+        shocks = restored.sample_residuals(np.random.default_rng(1), (50, 7))
+
+        assert np.array_equal(restored.residuals, predictor.residuals)
+        assert np.isin(shocks, restored.residuals).all()
+        assert len(restored.predict_with_confidence(make_price_frame(300), days=7, paths=200)) == 7
+
+
+class TestPathBudget:
+    """Path counts adapt to the latency budget"""
+
+    def test_paths_follow_measured_cost(self):
+        """CONF-003: Slow simulations get fewer paths, never below the floor"""
+        budget = PathBudget(max_paths=2000, min_paths=100, budget_ms=50)
+        assert budget.paths(30) == 2000
+
+        budget.record(2000, 30, 0.3)          # 5 us per path-day
+        assert budget.paths(30) == 333
+        budget.record(2000, 30, 30.0)
+        assert budget.paths(30) == 100
+
+
+class TestConfidenceEndpoint:
+    """/predict?confidence=true"""
+
+    def test_live_bands_are_cached(self, client, published, tmp_path, monkeypatch):
+        """CONF-004: Live bands come from one simulation per model version and horizon"""
+        import app as app_module
+
+        monkeypatch.setattr(app_module, 'model_registry', published)
+        monkeypatch.setattr(app_module, 'price_store', PriceStore(str(tmp_path / 'prices')))
+        monkeypatch.setattr(app_module, 'forecast_service', ForecastService(PredictionsPool(fail=True), TTLCache()))
+        budget = PathBudget(max_paths=500)
+        runs = []
+        monkeypatch.setattr(app_module, 'path_budget', budget)
+        monkeypatch.setattr(budget, 'simulate', lambda *a, **k: runs.append(a) or PathBudget.simulate(budget, *a, **k))
+
+        first = client.get('/predict?ticker=LMT&days=10&confidence=true').get_json()
+        second = client.get('/predict?ticker=LMT&days=10&confidence=true').get_json()
+        plain = client.get('/predict?ticker=LMT&days=10').get_json()
+
+        assert len(runs) == 1
+        assert first['bands'] == {'interval': 0.9, 'paths': 500}
+        assert first['predictions'] == second['predictions']
+        row = first['predictions'][-1]
+        assert row['lower'] <= row['price'] <= row['upper'] and 0 <= row['confidence'] <= 1
+        assert [r['price'] for r in first['predictions']] == [r['price'] for r in plain['predictions']]
+        assert 'lower' not in plain['predictions'][0]
+
+    def test_stored_bands_served(self, client, pool, published, monkeypatch):
+        """CONF-005: Bands generated with the stored forecast are served from the table"""
+        import app as app_module
+
+        generate_forecasts(pool, published, None, days=30, paths=300, report=lambda m: None)
+        monkeypatch.setattr(app_module, 'forecast_service', ForecastService(pool, TTLCache()))
+
+        data = client.get('/predict?ticker=LMT&days=5&confidence=true').get_json()
+
+        assert data['source'] == 'precomputed'
+        assert data['predictions'][4]['upper'] == float(pool.rows[('LMT', 5)][9])
+        assert data['predictions'][4]['confidence'] == round(pool.rows[('LMT', 5)][10], 4)
@@ -0,0 +1,51 @@
+"""
+Shared pytest fixtures for the API test suites.
+"""
+import pytest
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, '.')
+
+
+def make_price_frame(days, start_price=420.0, seed=7):
+    """yfinance-style daily OHLCV DataFrame indexed by Date"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end='2025-09-17', periods=days, name='Date')
+    close = start_price + np.cumsum(rng.normal(0.2, 3.0, days))
+    return pd.DataFrame({
+        'Open': close - rng.uniform(-2, 2, days),
+        'High': close + rng.uniform(0, 4, days),
+        'Low': close - rng.uniform(0, 4, days),
+        'Close': close,
+        'Volume': rng.integers(800_000, 2_000_000, days),
+    }, index=dates)
+
+
+@pytest.fixture
+def client():
+    """
+    Flask test client with empty in-process caches.
+    Not entered as a context manager so tests can share it across threads.
+    """
+    from app import app, confidence_cache, forecast_cache, stock_cache
+
+    app.config['TESTING'] = True
+    stock_cache.clear()
+    forecast_cache.clear()
+    confidence_cache.clear()
+    yield app.test_client()
+
+
+@pytest.fixture
+def mock_yfinance_data():
+    """One year of daily bars (~252 trading days)"""
+    return make_price_frame(252)
+
+
+@pytest.fixture
+def mock_insufficient_stock_data():
+    """A recent listing with only a few weeks of history"""
+    return make_price_frame(30)
@@ -0,0 +1,177 @@
+"""
+Database Connection Pool Tests
+Test ID: DB-001 through DB-008
+"""
+import pytest
+import threading
+import sys
+
+import psycopg2
+import psycopg2.extensions
+
+sys.path.insert(0, '.')
+from src.db import ConnectionPool, PoolError, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        if self.conn.broken:
+            raise psycopg2.OperationalError("server closed the connection")
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Minimal stand-in for a psycopg2 connection"""
+
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.rollbacks = 0
+        self.in_transaction = False
+        self.autocommit = False
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self)
+
+    def get_transaction_status(self):
+        if self.in_transaction:
+            return psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def opened():
+    """List of every connection the pool opened"""
+    return []
+
+
+@pytest.fixture
+def make_pool(opened):
+    def factory(**kwargs):
+        def connect(**config):
+            conn = FakeConnection()
+            opened.append(conn)
+            return conn
+        return ConnectionPool({}, connect=connect, **kwargs)
+    return factory
+
+
+class TestConnectionPool:
+    """Connection reuse, limits and validation"""
+
+    def test_connections_are_reused(self, make_pool, opened):
+        """DB-001: Sequential checkouts reuse one connection"""
+        pool = make_pool(minconn=1, maxconn=5)
+
+        for _ in range(10):
+            with pool.connection() as conn:
+                assert conn is opened[0]
+
+        assert len(opened) == 1
+        assert pool.stats()['checkouts'] == 10
+
+    def test_checkout_times_out_when_exhausted(self, make_pool):
+        """DB-002: Callers get PoolTimeout instead of opening past maxconn"""
+        pool = make_pool(minconn=0, maxconn=2, timeout=0.05)
+        held = [pool.getconn(), pool.getconn()]
+
+        with pytest.raises(PoolTimeout):
+            pool.getconn()
+
+        assert pool.stats()['in_use'] == 2
+        assert pool.stats()['timeouts'] == 1
+        for conn in held:
+            pool.putconn(conn)
+
+    def test_waiter_receives_returned_connection(self, make_pool, opened):
+        """DB-003: A blocked checkout is served when a connection comes back"""
+        pool = make_pool(minconn=0, maxconn=1, timeout=2)
+        held = pool.getconn()
+        got = []
+
+        waiter = threading.Thread(target=lambda: got.append(pool.getconn()))
+        waiter.start()
+        pool.putconn(held)
+        waiter.join()
+
+        assert got == [held]
+        assert len(opened) == 1
+
+    def test_stale_idle_connection_is_replaced(self, make_pool, opened):
+        """DB-004: Idle connections that fail validation are discarded"""
+        pool = make_pool(minconn=0, maxconn=2, validate_after=0)
+        with pool.connection() as conn:
+            pass
+        conn.broken = True
+
+        with pool.connection() as fresh:
+            assert fresh is not conn
+
+        assert conn.closed
+        assert pool.stats()['discarded'] == 1
+
+    def test_open_transaction_rolled_back_on_return(self, make_pool):
+        """DB-005: Connections never go back to the pool mid-transaction"""
+        pool = make_pool(minconn=0, maxconn=1)
+
+        with pool.connection() as conn:
+            conn.in_transaction = True
+
+        assert conn.rollbacks == 1
+        assert pool.stats()['idle'] == 1
+
+    def test_autocommit_is_switched_off_on_return(self, make_pool):
+        """DB-007: Autocommit checkouts don't leak autocommit to the next borrower"""
+        pool = make_pool(minconn=0, maxconn=1)
+
+        with pool.connection(autocommit=True) as conn:
+            assert conn.autocommit
+
+        with pool.connection() as again:
+            assert again is conn and not again.autocommit
+
+    def test_base_exceptions_return_the_connection(self, make_pool):
+        """DB-008: Closed generators and interrupts don't leak pool slots"""
+        pool = make_pool(minconn=0, maxconn=1, timeout=0.05)
+
+        def stream():
+            with pool.connection() as conn:
+                conn.in_transaction = True
+                yield conn
+
+        rows = stream()
+        conn = next(rows)
+        rows.close()
+        assert conn.rollbacks == 1 and pool.stats()['idle'] == 1
+
+        with pytest.raises(KeyboardInterrupt):
+            with pool.connection():
+                raise KeyboardInterrupt
+        assert conn.closed and pool.stats()['in_use'] == 0
+        with pool.connection() as fresh:
+            assert fresh is not conn
+
+    def test_connect_failure_raises_pool_error(self):
+        """DB-006: Database outages surface as PoolError"""
+        def connect(**config):
+            raise psycopg2.OperationalError("could not connect")
+
+        pool = ConnectionPool({}, minconn=0, maxconn=1, connect=connect)
+
+        with pytest.raises(PoolError):
+            with pool.connection():
+                pass
+
+        assert pool.stats()['size'] == 0
@@ -0,0 +1,99 @@
+"""
+Chart Downsampling Tests
+Test ID: DS-001 through DS-004
+"""
+import pytest
+import sys
+from datetime import date
+
+import numpy as np
+
+sys.path.insert(0, '.')
+from src.stocks.cache import TTLCache
+from src.stocks.downsample import lttb
+from src.stocks.history import StockHistoryService
+from tests.history_stream_testcase import StreamingDatabase, stored_history
+
+
+def reference_lttb(x, y, threshold):
+    """Straightforward LTTB, one candidate at a time"""
+    n = len(y)
+    every = (n - 2) / (threshold - 2)
+    a, keep = 0, [0]
+    for i in range(threshold - 2):
+        start, end = int((i + 1) * every) + 1, min(int((i + 2) * every) + 1, n)
+        avg_x, avg_y = np.mean(x[start:end]), np.mean(y[start:end])
+        best, chosen = -1.0, None
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best:
+                best, chosen = area, j
+        keep.append(chosen)
+        a = chosen
+    return keep + [n - 1]
+
+
+@pytest.fixture
+def service(tmp_path):
+    stale = StreamingDatabase([(date(2000, 1, 3), 1.0, 1.0, 1.0, 1.0, 1)])
+    return StockHistoryService(
+        stale, TTLCache(), fetch=lambda t, p: [], store=stored_history(str(tmp_path / 'prices'), 7300),
+    )
+
+
+class TestLTTB:
+    """Vectorized Largest-Triangle-Three-Buckets"""
+
+    def test_matches_reference(self):
+        """DS-001: Same points as the one-at-a-time algorithm"""
+        rng = np.random.default_rng(3)
+        for n, threshold in [(100, 10), (1000, 37), (5003, 500)]:
+            x, y = np.arange(n, dtype=float), np.cumsum(rng.normal(size=n))
+            assert lttb(x, y, threshold).tolist() == reference_lttb(x, y, threshold)
+
+    def test_keeps_shape(self):
+        """DS-002: Endpoints and isolated spikes survive; short series are untouched"""
+        y = np.zeros(5000)
+        y[1234], y[3456] = 50.0, -40.0
+
+        keep = lttb(np.arange(5000), y, 100)
+
+        assert len(keep) == 100 and keep[0] == 0 and keep[-1] == 4999
+        assert 1234 in keep and 3456 in keep
+        assert lttb(np.arange(10), np.arange(10.0), 100).tolist() == list(range(10))
+
+
+class TestDownsampledHistory:
+    """max_points on the history and prediction endpoints"""
+
+    def test_downsampled_series_is_cached(self, service, monkeypatch):
+        """DS-003: Results are cached per (ticker, period, max_points)"""
+        series, total = service.downsampled('LMT', 'max', 200)
+        calls = []
+        monkeypatch.setattr(service.store, 'window', lambda *args: calls.append(args))
+
+        assert service.downsampled('LMT', 'max', 200)[0] is series
+        assert calls == []
+        assert len(series) == 200 and total == 7300
+        assert np.all(np.diff(series.dates.astype(np.int64)) > 0)
+
+    def test_endpoints_honour_max_points(self, client, service, monkeypatch):
+        """DS-004: Responses are bounded by max_points in every format"""
+        import app as app_module
+        monkeypatch.setattr(app_module, 'stock_history', service)
+
+        data = client.get('/api/stocks/LMT?period=max&max_points=300').get_json()
+        assert data['count'] == 300 and data['downsampled_from'] == 7300
+        assert 'warning' not in data
+
+        lines = client.get('/api/stocks/LMT?period=5y&max_points=50&format=ndjson').get_data(as_text=True)
+        assert len(lines.splitlines()) == 50
+
+        batch = client.post('/api/stocks/batch', json={'tickers': ['LMT'], 'period': '2y', 'max_points': 20})
+        assert batch.get_json()['stocks']['LMT']['count'] == 20
+
+        prediction = client.get('/predict?ticker=LMT&days=30&max_points=8').get_json()
+        assert len(prediction['predictions']) == 8 and prediction['downsampled_from'] == 30
+
+        assert client.get('/api/stocks/LMT?max_points=1').status_code == 400
+        assert client.get('/predict?ticker=LMT&max_points=lots').status_code == 400
@@ -0,0 +1,92 @@
+"""
+Ensemble Predictor Tests
+Test ID: ENS-001 through ENS-004
+"""
+import pytest
+import sys
+
+import numpy as np
+
+sys.path.insert(0, '.')
+import src.ml.predictor as predictor_module
+from src.ml.ensemble import EnsemblePredictor
+from src.ml.predictor import StockPredictor
+from tests.conftest import make_price_frame
+
+
+class ConstantModel:
+    """Non-StockPredictor member forecasting a flat price"""
+
+    def __init__(self, price):
+        self.price = price
+
+    def forecast(self, closes, days):
+        return np.full(days, self.price)
+
+
+@pytest.fixture(scope='module')
+def data():
+    return make_price_frame(400)
+
+
+@pytest.fixture(scope='module')
+def ensemble(data):
+    return EnsemblePredictor(size=4, executor='thread').train(data, epochs=5)
+
+
+class TestEnsembleTraining:
+    """Shared features and parallel member fits"""
+
+    def test_features_computed_once(self, data, monkeypatch):
+        """ENS-001: Training computes the feature matrix once for every member"""
+        calls = []
+        original = predictor_module.feature_matrix
+        monkeypatch.setattr(predictor_module, 'feature_matrix', lambda c: calls.append(1) or original(c))
+
+        model = EnsemblePredictor(size=3, executor='thread').train(data, epochs=3)
+
+        assert len(calls) == 1
+        assert model.is_trained
+        assert all(m.last_date == data.index[-1].date() for m in model.members)
+
+    def test_process_pool_matches_threads(self, data, ensemble):
+        """ENS-002: Members fitted in worker processes equal those fitted on threads"""
+        model = EnsemblePredictor(size=4, executor='process', workers=2).train(data, epochs=5)
+
+        for fitted, expected in zip(model.members, ensemble.members):
+            assert np.allclose(fitted.weights, expected.weights)
+        assert not np.allclose(ensemble.members[0].weights, ensemble.members[1].weights)
+
+
+class TestEnsemblePrediction:
+    """Combining member forecasts"""
+
+    def test_weighted_average_of_members(self, data, ensemble):
+        """ENS-003: Forecasts are the weighted mean of the individual member forecasts"""
+        closes = data['Close'].to_numpy(dtype=float)
+        members = np.array([m.forecast(closes, 7) for m in ensemble.members])
+
+        assert ensemble.predict(data, days=7) == pytest.approx(members.mean(axis=0).tolist())
+
+        ensemble.weighting = 'inverse_variance'
+        try:
+            weights = ensemble.member_weights()
+            expected = 1 / np.array([m.residual_std for m in ensemble.members]) ** 2
+            assert weights == pytest.approx(expected / expected.sum())
+            assert ensemble.forecast(closes, 7) == pytest.approx(weights @ members)
+        finally:
+            ensemble.weighting = 'equal'
+        assert sum(ensemble.get_feature_importance().values()) == pytest.approx(1.0)
+
+    def test_mixed_members_and_explicit_weights(self, data, ensemble):
+        """ENS-004: Other model types join the ensemble; bad weights are rejected"""
+        mixed = EnsemblePredictor(members=[ensemble.members[0], ConstantModel(100.0)], weighting=[3, 1])
+        closes = data['Close'].to_numpy(dtype=float)
+
+        expected = 0.75 * ensemble.members[0].forecast(closes, 5) + 0.25 * 100.0
+        assert mixed.forecast(closes, 5) == pytest.approx(expected)
+
+        with pytest.raises(ValueError):
+            EnsemblePredictor(members=[ConstantModel(1.0)], weighting=[1, 1]).forecast(closes, 5)
+        with pytest.raises(RuntimeError):
+            EnsemblePredictor(size=2).predict(data)
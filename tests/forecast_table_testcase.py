@@ -0,0 +1,156 @@
+"""
+Precomputed Forecast Tests
+Test ID: FCST-001 through FCST-006
+"""
+import pytest
+import sys
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from unittest.mock import patch, MagicMock
+
+sys.path.insert(0, '.')
+from src.ml.forecasts import ForecastService, generate_forecasts
+from src.ml.predictor import StockPredictor
+from src.ml.registry import ModelRegistry
+from src.stocks.cache import TTLCache
+from src.stocks.store import PriceStore
+from tests.conftest import make_price_frame
+
+
+class PredictionsPool:
+    """Pool stand-in holding the predictions table in memory"""
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.rows = {}       # (symbol, horizon) -> row tuple
+        self.selects = 0
+
+    @contextmanager
+    def connection(self, timeout=None):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        conn = MagicMock()
+        cursor = conn.cursor.return_value
+
+        def execute(sql, params=None):
+            if sql.lstrip().startswith('DELETE'):
+                symbols, days = params
+                for key in [k for k in self.rows if k[0] in symbols and k[1] > days]:
+                    del self.rows[key]
+            elif 'FROM predictions' in sql:
+                self.selects += 1
+                cursor.fetchall.return_value = [
+                    (r[0], r[1], r[2], r[3], r[4], r[5], r[7], r[8], r[9], r[10])
+                    for key, r in sorted(self.rows.items()) if key[0] in params[0]
+                ]
+
+        cursor.execute.side_effect = execute
+        yield conn
+
+    def upsert(self, cursor, sql, rows, page_size=None):
+        for row in rows:
+            self.rows[(row[0], row[1])] = row
+
+
+@pytest.fixture
+def published(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'models'), check_interval=0)
+    for seed, symbol in enumerate(['LMT', 'RTX']):
+        registry.publish(symbol, StockPredictor(seed=seed).train(make_price_frame(300, seed=seed), epochs=3))
+    return registry
+
+
+@pytest.fixture
+def pool():
+    pool = PredictionsPool()
+    with patch('src.ml.forecasts.execute_values', side_effect=pool.upsert):
+        yield pool
+
+
+class TestForecastGeneration:
+    """Bulk forecast generation into the predictions table"""
+
+    def test_paths_stored_per_horizon(self, pool, published):
+        """FCST-001: Every published model gets one row per horizon with its version"""
+        written = generate_forecasts(pool, published, None, days=30, report=lambda m: None)
+
+        assert written == 2
+        assert len(pool.rows) == 60
+        row = pool.rows[('LMT', 30)]
+        assert row[4] == 1 and row[5] is not None
+        predictor, _ = published.get('LMT')
+        assert row[3] == round(float(predictor.forecast(predictor.history, 30)[-1]), 2)
+
+    def test_shorter_run_drops_longer_horizons(self, pool, published):
+        """FCST-002: Regenerating with fewer days removes stale longer horizons"""
+        generate_forecasts(pool, published, None, days=30, report=lambda m: None)
+        generate_forecasts(pool, published, None, days=10, report=lambda m: None)
+
+        assert max(h for _, h in pool.rows) == 10
+
+
+class TestForecastService:
+    """Cached lookups of stored forecasts"""
+
+    def test_lookup_is_cached_and_sliced(self, pool, published):
+        """FCST-003: One query serves any horizon up to the stored one"""
+        generate_forecasts(pool, published, None, days=30, report=lambda m: None)
+        service = ForecastService(pool, TTLCache(ttl=60))
+
+        week = service.get('LMT', 7)
+        month = service.get('LMT', 30)
+
+        assert len(week['prices']) == 7 and week['prices'] == month['prices'][:7]
+        assert month['model_version'] == 1 and month['generated_at'].endswith('Z')
+        assert service.get('LMT', 31) is None
+        assert service.get_many({'LMT': 5, 'NOPE': 5}).keys() == {'LMT'}
+        assert pool.selects == 2          # LMT once, NOPE once (then cached as missing)
+
+    def test_stale_rows_are_misses(self, pool, published):
+        """FCST-006: Old forecasts and paths starting today or earlier are not served"""
+        generate_forecasts(pool, published, None, days=30, report=lambda m: None)
+        old = datetime.utcnow() - timedelta(hours=48)
+        for key, row in pool.rows.items():
+            if key[0] == 'LMT':
+                pool.rows[key] = row[:7] + (old,) + row[8:]
+            else:
+                pool.rows[key] = row[:2] + (row[2] - timedelta(days=1),) + row[3:]
+        service = ForecastService(pool, TTLCache(ttl=60), max_age=36 * 3600)
+
+        assert service.get_many({'LMT': 7, 'RTX': 7}) == {}
+        assert service.stats()['stale'] == 2
+        assert ForecastService(pool, TTLCache(ttl=60)).get('LMT', 7) is not None
+
+
+class TestPredictFromTable:
+    """/predict reads stored forecasts and falls back to inference"""
+
+    def test_predict_served_from_table(self, client, pool, published, tmp_path, monkeypatch):
+        """FCST-004: Covered tickers are answered from the predictions table"""
+        import app as app_module
+
+        generate_forecasts(pool, published, None, days=30, report=lambda m: None)
+        monkeypatch.setattr(app_module, 'forecast_service', ForecastService(pool, TTLCache()))
+        monkeypatch.setattr(app_module, 'model_registry', ModelRegistry(str(tmp_path / 'empty')))
+
+        data = client.get('/predict?ticker=LMT&days=7').get_json()
+
+        assert data['source'] == 'precomputed'
+        assert data['model']['version'] == 1
+        assert len(data['predictions']) == 7
+        assert data['predictions'][0]['price'] == float(pool.rows[('LMT', 1)][3])
+
+    def test_uncovered_falls_back_to_inference(self, client, published, tmp_path, monkeypatch):
+        """FCST-005: Database errors and missing rows fall back to on-demand inference"""
+        import app as app_module
+
+        monkeypatch.setattr(app_module, 'forecast_service',
+                            ForecastService(PredictionsPool(fail=True), TTLCache()))
+        monkeypatch.setattr(app_module, 'model_registry', published)
+        monkeypatch.setattr(app_module, 'price_store', PriceStore(str(tmp_path / 'prices')))
+
+        live = client.get('/predict?ticker=RTX&days=7').get_json()
+        fallback = client.get('/predict?ticker=GD&days=7').get_json()
+
+        assert live['source'] == 'live' and live['model']['version'] == 1
+        assert fallback['source'] == 'fallback' and 'model' not in fallback
@@ -0,0 +1,94 @@
+"""
+Password Hashing Pool Tests
+Test ID: HASH-001 through HASH-005
+"""
+import os
+import pytest
+import threading
+import sys
+
+sys.path.insert(0, '.')
+from src.hashing import HashingBusy, PasswordHasher
+
+
+@pytest.fixture
+def hasher():
+    pool = PasswordHasher(workers=2, max_pending=2, timeout=5, rounds=4)
+    yield pool
+    pool.shutdown()
+
+
+class TestPasswordHasher:
+    """bcrypt work runs off the request thread with backpressure"""
+
+    def test_hash_and_verify_round_trip(self, hasher):
+        """HASH-001: Hashes verify against the original password only"""
+        hashed = hasher.hash('Str0ngPassword')
+
+        assert hashed.startswith('$2b$04$')
+        assert hasher.verify('Str0ngPassword', hashed)
+        assert not hasher.verify('WrongPassword1', hashed)
+        assert hasher.stats()['completed'] == 3
+
+    def test_full_queue_rejected_immediately(self):
+        """HASH-002: Jobs beyond workers + max_pending raise HashingBusy"""
+        hasher = PasswordHasher(workers=1, max_pending=0, timeout=5, rounds=4)
+        release = threading.Event()
+        blocker = threading.Thread(target=hasher._run, args=(release.wait,))
+        blocker.start()
+
+        try:
+            with pytest.raises(HashingBusy) as exc:
+                hasher.hash('Str0ngPassword')
+            assert exc.value.retry_after >= 1
+            assert hasher.stats()['rejected'] == 1
+        finally:
+            release.set()
+            blocker.join()
+            hasher.shutdown()
+
+    def test_slow_job_times_out(self):
+        """HASH-003: Waiting longer than timeout raises HashingBusy"""
+        hasher = PasswordHasher(workers=1, max_pending=1, timeout=0.05, rounds=4)
+        release = threading.Event()
+
+        try:
+            with pytest.raises(HashingBusy):
+                hasher._run(release.wait)
+            assert hasher.stats()['timeouts'] == 1
+        finally:
+            release.set()
+            hasher.shutdown()
+
+    def test_concurrent_hashing(self, hasher):
+        """HASH-004: Concurrent callers within capacity all succeed"""
+        results = []
+
+        def work():
+            results.append(hasher.hash('Str0ngPassword'))
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(results) == 4
+        assert len(set(results)) == 4   # unique salts
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs fork()")
+    def test_reset_after_fork(self, hasher):
+        """HASH-005: A forked child hashes again once it resets the pool"""
+        hashed = hasher.hash('Str0ngPassword')     # parent's worker threads now exist
+
+        pid = os.fork()
+        if pid == 0:
+            ok = False
+            try:
+                hasher.reset()
+                ok = hasher.verify('Str0ngPassword', hashed) and hasher.stats()['completed'] == 1
+            finally:
+                os._exit(0 if ok else 1)
+        _, status = os.waitpid(pid, 0)
+
+        assert os.waitstatus_to_exitcode(status) == 0
@@ -0,0 +1,103 @@
+"""
+Health Probe Tests
+Test ID: HLT-001 through HLT-004
+"""
+import sys
+import time
+
+sys.path.insert(0, '.')
+from src.health import HealthProber
+
+
+class TestHealthProber:
+    """Cached dependency checks"""
+
+    def test_readiness_follows_checks(self):
+        """HLT-001: Not ready until checks pass; failures are counted"""
+        state = {'up': True}
+
+        def database():
+            if not state['up']:
+                raise ConnectionError("connection refused")
+
+        prober = HealthProber(interval=60)
+        prober.add_check('database', database)
+        prober.add_check('cache', lambda: True)
+        prober.ensure_started = lambda: None
+
+        ready, report = prober.ready()
+        assert not ready and report['checks']['database'] == {'status': 'pending'}
+
+        prober.check_now()
+        ready, report = prober.ready()
+        assert ready and report['status'] == 'ready'
+        assert report['checks']['database']['age_s'] < 1
+
+        state['up'] = False
+        prober.check_now()
+        prober.check_now()
+        ready, report = prober.ready()
+        assert not ready
+        assert report['checks']['database']['error'] == "connection refused"
+        assert report['checks']['database']['consecutive_failures'] == 2
+        assert report['checks']['cache']['status'] == 'ok'
+
+    def test_stale_results_are_not_ready(self):
+        """HLT-002: An old "ok" stops counting once it is older than stale_after"""
+        prober = HealthProber(interval=60, stale_after=0.05)
+        prober.add_check('database', lambda: None)
+        prober.ensure_started = lambda: None
+        prober.check_now()
+        assert prober.ready()[0]
+
+        time.sleep(0.1)
+        ready, report = prober.ready()
+
+        assert not ready and report['checks']['database']['status'] == 'stale'
+
+
+class TestHealthEndpoints:
+    """/health, /health/live and /health/ready"""
+
+    def test_probes_do_not_run_checks(self, client, monkeypatch):
+        """HLT-003: Probes answer from cached state; only the prober runs checks"""
+        import app as app_module
+
+        calls = []
+        prober = HealthProber(interval=60)
+        prober.add_check('database', lambda: calls.append(1))
+        monkeypatch.setattr(app_module, 'health_prober', prober)
+
+        assert client.get('/health/live').get_json()['status'] == 'alive'
+        prober.ensure_started()
+        deadline = time.monotonic() + 2
+        while not prober.runs and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        for _ in range(50):
+            ready = client.get('/health/ready')
+        health = client.get('/health').get_json()
+
+        assert ready.status_code == 200 and ready.get_json()['checks']['database']['status'] == 'ok'
+        assert health['database'] == 'connected' and health['ready']
+        assert len(calls) == 1
+
+    def test_component_stats_need_admin_token(self, client, monkeypatch):
+        """HLT-004: /health reports only check status; component stats are admin-only"""
+        import app as app_module
+
+        prober = HealthProber(interval=60)
+        prober.add_check('database', lambda: None)
+        prober.add_check('rate_limit', lambda: 1 / 0)
+        prober.check_now()
+        monkeypatch.setattr(app_module, 'health_prober', prober)
+
+        health = client.get('/health').get_json()
+        assert set(health) == {'status', 'ready', 'database', 'checks', 'timestamp'}
+        assert health['checks'] == {'database': 'ok', 'rate_limit': 'failed'}
+
+        assert client.get('/admin/stats').status_code == 404
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 's3cret')
+        assert client.get('/admin/stats', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+        stats = client.get('/admin/stats', headers={'X-Admin-Token': 's3cret'}).get_json()
+        assert {'pool', 'audit', 'bcrypt', 'slow_queries'} <= set(stats)
@@ -0,0 +1,148 @@
+"""
+Streamed Stock History Tests
+Test ID: STREAM-001 through STREAM-005
+"""
+import json
+import pytest
+import sys
+from contextlib import contextmanager
+from datetime import date, timedelta
+from unittest.mock import MagicMock
+
+import numpy as np
+import psycopg2
+
+sys.path.insert(0, '.')
+from src.stocks.cache import TTLCache
+from src.stocks.history import HISTORY_CHUNK_ROWS, StockHistoryService, StockNotFound
+from src.stocks.store import PriceStore
+
+
+def stored_history(root, days):
+    """Price store holding `days` daily bars for LMT ending today"""
+    store = PriceStore(root, check_interval=0)
+    end = np.datetime64(date.today(), 'D')
+    dates = np.arange(end - days + 1, end + 1)
+    close = 100.0 + np.arange(days) * 0.013
+    store.append('LMT', dates, close - 0.5, close + 1, close - 1, close, np.full(days, 1000))
+    return store
+
+
+class StreamingDatabase:
+    """Pool stand-in serving prices rows one LIMITed page per query"""
+
+    def __init__(self, rows, fail_after=None):
+        self.rows = rows
+        self.fail_after = fail_after
+        self.fetches = 0
+        self.checked_out = 0
+
+    @contextmanager
+    def connection(self, timeout=None, autocommit=False):
+        conn = MagicMock()
+        cur = conn.cursor.return_value
+        cur.fetchone.return_value = (self.rows[0][0], self.rows[-1][0])
+
+        def execute(sql, params=None):
+            if 'LIMIT' not in sql:
+                return
+            if self.fail_after is not None and self.fetches >= self.fail_after:
+                raise psycopg2.OperationalError("server closed the connection unexpectedly")
+            self.fetches += 1
+            symbol, start, limit = params
+            cur.fetchall.return_value = [r for r in self.rows if start is None or r[0] >= start][:limit]
+
+        cur.execute.side_effect = execute
+        self.checked_out += 1
+        try:
+            yield conn
+        finally:
+            self.checked_out -= 1
+
+
+@pytest.fixture
+def service(tmp_path):
+    stale = StreamingDatabase([(date(2000, 1, 3), 1.0, 1.0, 1.0, 1.0, 1)])
+    return StockHistoryService(
+        stale, TTLCache(), fetch=lambda t, p: [], store=stored_history(str(tmp_path / 'prices'), 7300),
+    )
+
+
+class TestHistoryStream:
+    """StockHistoryService.stream"""
+
+    def test_stream_matches_buffered_payload(self, service):
+        """STREAM-001: A 20-year stream decodes to the buffered payload"""
+        chunks = list(service.stream('LMT', '10y'))
+        streamed = json.loads(''.join(chunks))
+
+        buffered = service.get('LMT', '10y')
+        service.cache.clear()
+
+        assert len(chunks) > 3                      # rows arrive in several chunks
+        assert streamed['count'] == buffered['count']
+        assert streamed['historical_data'] == buffered['historical_data']
+        assert json.loads(''.join(service.stream('LMT', 'max')))['count'] == 7300
+
+    def test_table_rows_are_paged(self):
+        """STREAM-002: Prices rows come one page per query and no connection is held between chunks"""
+        today = date.today()
+        rows = [
+            (today - timedelta(days=3000 - i), 100.0, 101.0, 99.0, 100.5, 1000)
+            for i in range(3000)
+        ]
+        pool = StreamingDatabase(rows)
+        service = StockHistoryService(pool, TTLCache(), fetch=lambda t, p: [])
+
+        lines = ''.join(service.stream('LMT', 'max', ndjson=True)).splitlines()
+        assert len(lines) == 3000
+        assert [json.loads(line)['Date'] for line in lines] == [r[0].isoformat() for r in rows]
+        assert pool.fetches == 3000 // HISTORY_CHUNK_ROWS + 1
+
+        stream = service.stream('LMT', 'max')
+        next(stream), next(stream)
+        assert pool.checked_out == 0                # a stalled client holds nothing
+        stream.close()                              # client disconnected
+        assert pool.checked_out == 0
+
+    def test_database_failure_mid_stream(self):
+        """STREAM-005: A failure after the first page ends the stream with the error"""
+        today = date.today()
+        rows = [(today - timedelta(days=2500 - i), 1.0, 1.0, 1.0, 1.0, None) for i in range(2500)]
+        pool = StreamingDatabase(rows, fail_after=1)
+        service = StockHistoryService(pool, TTLCache(), fetch=lambda t, p: [])
+
+        lines = []
+        with pytest.raises(psycopg2.OperationalError):
+            for chunk in service.stream('LMT', 'max', ndjson=True):
+                lines.extend(chunk.splitlines())
+        assert len(lines) == HISTORY_CHUNK_ROWS and json.loads(lines[0])['Volume'] == 0
+        assert pool.checked_out == 0
+
+    def test_missing_ticker_raises_before_streaming(self, service):
+        """STREAM-003: Unknown tickers fail up front, not mid-response"""
+
+        with pytest.raises(StockNotFound):
+            service.stream('NOPE', '10y')
+
+
+class TestHistoryStreamEndpoint:
+    """/api/stocks/<ticker> streaming responses"""
+
+    def test_long_periods_and_ndjson_stream(self, client, service, monkeypatch):
+        """STREAM-004: Long periods and NDJSON requests are streamed"""
+        import app as app_module
+        monkeypatch.setattr(app_module, 'stock_history', service)
+
+        response = client.get('/api/stocks/LMT?period=10y')
+        assert len(service.cache) == 0              # streamed, not built and cached
+        assert response.get_json()['count'] == len(service.get('LMT', '10y')['historical_data'])
+
+        response = client.get('/api/stocks/LMT?period=1mo', headers={'Accept': 'application/x-ndjson'})
+        assert response.mimetype == 'application/x-ndjson'
+        assert all('Close' in json.loads(line) for line in response.get_data(as_text=True).splitlines())
+
+        client.get('/api/stocks/LMT?period=1y')
+        assert service.cache.get(('LMT', '1y')) is not None
+        assert client.get('/api/stocks/LMT?format=csv').status_code == 400
+        assert client.get('/api/stocks/NOPE?period=max').status_code == 404
@@ -0,0 +1,137 @@
+"""
+Technical Indicator Engine Tests
+Test ID: IND-001 through IND-005
+"""
+import pytest
+import sys
+from contextlib import contextmanager
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, '.')
+from src.stocks.indicators import IndicatorEngine, compute_indicators, ema, rolling_mean
+from tests.conftest import make_price_frame
+
+
+class FakeDatabase:
+    """Pool stand-in holding prices, indicators and indicator_state in memory"""
+
+    def __init__(self, frames):
+        self.prices = {
+            symbol: [(day.date(), round(close, 2)) for day, close in frame['Close'].items()]
+            for symbol, frame in frames.items()
+        }
+        self.state = {}
+        self.indicators = {}
+        self.price_reads = []
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = MagicMock()
+        cursor = conn.cursor.return_value
+
+        def execute(sql, params=None):
+            if 'FROM stocks' in sql:
+                cursor.fetchall.return_value = [(s,) for s in sorted(self.prices)]
+            elif 'FROM indicator_state' in sql:
+                cursor.fetchone.return_value = self.state.get(params[0])
+            elif 'INSERT INTO indicator_state' in sql:
+                self.state[params[0]] = (params[1], params[2])
+            elif 'FROM prices' in sql:
+                if isinstance(params, dict):
+                    rows = self.prices[params['symbol']]
+                    older = [r for r in rows if r[0] <= params['after']][-params['lookback']:]
+                    rows = older + [r for r in rows if r[0] > params['after']]
+                else:
+                    rows = self.prices[params[0]]
+                self.price_reads.append(len(rows))
+                cursor.fetchall.return_value = rows
+
+        cursor.execute.side_effect = execute
+        yield conn
+
+    def write_indicators(self, cursor, sql, rows, page_size=None):
+        for symbol, name, value, day in rows:
+            self.indicators[(symbol, name, day)] = value
+
+
+@pytest.fixture
+def database():
+    db = FakeDatabase({'LMT': make_price_frame(300), 'RTX': make_price_frame(300, seed=11)})
+    with patch('src.stocks.indicators.execute_values', side_effect=db.write_indicators):
+        yield db
+
+
+class TestIndicatorMath:
+    """Vectorized series math against pandas reference implementations"""
+
+    def test_ema_matches_pandas(self):
+        """IND-001: Blocked EMA equals the recursive definition over long series"""
+        values = np.random.default_rng(3).normal(100, 5, 2000)
+
+        for span in (12, 26):
+            expected = pd.Series(values).ewm(span=span, adjust=False).mean().to_numpy()
+            assert np.allclose(ema(values, 2.0 / (span + 1)), expected, rtol=1e-9)
+
+    def test_rolling_mean_matches_pandas(self):
+        """IND-002: Moving averages match pandas rolling means"""
+        values = np.random.default_rng(4).normal(100, 5, 120)
+        expected = pd.Series(values).rolling(20).mean().to_numpy()
+
+        result = rolling_mean(values, 20)
+
+        assert np.isnan(result[:19]).all()
+        assert np.allclose(result[19:], expected[19:])
+
+    def test_incremental_equals_full(self):
+        """IND-003: Continuing from saved state gives the same values as a full pass"""
+        closes = make_price_frame(260)['Close'].to_numpy()
+        full, _ = compute_indicators(closes, len(closes))
+
+        _, state = compute_indicators(closes[:200], 200)
+        tail, _ = compute_indicators(closes[200 - 49:], 60, state)
+
+        for name, values in tail.items():
+            assert np.allclose(values, full[name][200:], equal_nan=True), name
+        assert 0 <= np.nanmin(full['rsi']) and np.nanmax(full['rsi']) <= 100
+
+
+class TestIndicatorEngine:
+    """Materialization into the indicators table"""
+
+    def test_full_run_writes_all_symbols(self, database):
+        """IND-004: First run stores every indicator type for every symbol"""
+        results = IndicatorEngine(database, workers=2).run(report=lambda m: None)
+
+        assert sorted(r.symbol for r in results) == ['LMT', 'RTX']
+        assert all(r.error is None and not r.incremental for r in results)
+        types = {name for _, name, _ in database.indicators}
+        assert types == {'ma_20', 'ma_50', 'macd', 'rsi'}
+        # The 50-day average starts on the 50th close
+        assert sum(1 for s, n, _ in database.indicators if s == 'LMT' and n == 'ma_50') == 251
+        assert set(database.state) == {'LMT', 'RTX'}
+
+    def test_second_run_reads_only_the_tail(self, database):
+        """IND-005: Later runs read the new days plus the moving-average lookback"""
+        extended = make_price_frame(300)
+        database.prices['LMT'] = database.prices['LMT'][:290]
+        engine = IndicatorEngine(database, workers=1)
+        engine.update_symbol('LMT')
+        baseline = dict(database.indicators)
+
+        database.prices['LMT'] = [(d.date(), round(c, 2)) for d, c in extended['Close'].items()]
+        result = engine.update_symbol('LMT')
+
+        assert result.incremental and result.days == 10
+        assert database.price_reads[-1] == 10 + 49
+        assert len(database.indicators) == len(baseline) + 40
+
+        incremental = dict(database.indicators)
+        database.indicators.clear()
+        engine.update_symbol('LMT', full=True)
+        last = database.prices['LMT'][-1][0]
+        for name in ('ma_20', 'ma_50', 'macd', 'rsi'):
+            key = ('LMT', name, last)
+            assert incremental[key] == pytest.approx(database.indicators[key], abs=1e-6)
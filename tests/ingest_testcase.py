@@ -0,0 +1,170 @@
+"""
+Bulk Price Ingestion Tests
+Test ID: ING-001 through ING-005
+"""
+import pytest
+import sys
+from contextlib import contextmanager
+from datetime import date
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, '.')
+from src.stocks.ingest import ingest_csv_files, ingest_frames, normalize_frame
+from tests.conftest import make_price_frame
+
+
+class CopyRecorder:
+    """
+    Pool stand-in that records COPY payloads per symbol, keeps the merged
+    rows and checkpoints in memory and streams them back for store refreshes
+    """
+
+    def __init__(self, stored=None, fail_after=None):
+        self.prices = {symbol: dict.fromkeys(dates, ()) for symbol, dates in (stored or {}).items()}
+        self.checkpoints = {}
+        self.copied = {}
+        self.commits = 0
+        self.fail_after = fail_after     # chunks merged before the connection dies
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = MagicMock()
+        cursor = conn.cursor.return_value
+        state = {}
+
+        def execute(sql, params=None):
+            if 'INSERT INTO stocks' in sql:
+                state['symbol'] = params[0]
+            elif 'FROM ingest_checkpoints' in sql and sql.lstrip().startswith('SELECT'):
+                done = self.checkpoints.get(tuple(params))
+                cursor.fetchone.return_value = (done,) if done is not None else None
+            elif 'INSERT INTO ingest_checkpoints' in sql:
+                state['checkpoint'] = ((params[0], params[1]), params[2])
+            elif 'DELETE FROM ingest_checkpoints' in sql:
+                self.checkpoints.pop(tuple(params), None)
+            elif 'WITH merged' in sql:
+                if self.fail_after is not None and len(self.copied[params[0]]) > self.fail_after:
+                    raise RuntimeError("server closed the connection")
+                rows = self.prices.setdefault(params[0], {})
+                written = []
+                for line in state['staged']:
+                    day, *values = line.split(',')
+                    day = date.fromisoformat(day)
+                    if rows.get(day) != tuple(values):
+                        rows[day] = tuple(values)
+                        written.append(day)
+                cursor.fetchone.return_value = (len(written), min(written, default=None))
+
+        def copy_expert(sql, buffer):
+            lines = buffer.read().splitlines()
+            self.copied.setdefault(state['symbol'], []).append(lines)
+            state['staged'] = lines
+
+        def commit():
+            self.commits += 1
+            if 'checkpoint' in state:
+                key, done = state.pop('checkpoint')
+                self.checkpoints[key] = done
+
+        def refresh_stream(name=None, **kwargs):
+            if name is None:
+                return cursor
+            stream = MagicMock()
+            stream.execute.side_effect = lambda sql, params: state.update(refresh=params)
+
+            def rows():
+                known = dict(zip(state['refresh'][0], state['refresh'][1]))
+                for symbol in state['refresh'][2]:
+                    for day in sorted(self.prices.get(symbol, {})):
+                        if symbol in known and day <= date.fromisoformat(known[symbol]):
+                            continue
+                        values = self.prices[symbol][day] or (1, 1, 1, 1, 1)
+                        yield (symbol, day, *(float(v) for v in values))
+            stream.__iter__.side_effect = lambda: rows()
+            return stream
+
+        cursor.execute.side_effect = execute
+        cursor.copy_expert.side_effect = copy_expert
+        conn.commit.side_effect = commit
+        conn.cursor.side_effect = refresh_stream
+        yield conn
+
+
+class TestIngestion:
+    """COPY staging, chunking and resume"""
+
+    def test_frames_loaded_in_chunks(self):
+        """ING-001: Rows are COPYed in chunk_size pieces per symbol"""
+        pool = CopyRecorder()
+        frames = {'LMT': make_price_frame(250), 'rtx': make_price_frame(120)}
+
+        results = ingest_frames(pool, frames, chunk_size=100, workers=2, report=lambda m: None)
+
+        assert sorted(r.symbol for r in results) == ['LMT', 'RTX']
+        assert [len(c) for c in pool.copied['LMT']] == [100, 100, 50]
+        assert [len(c) for c in pool.copied['RTX']] == [100, 20]
+        assert all(r.error is None for r in results)
+        assert sum(r.rows_written for r in results) == 370
+
+    def test_resume_continues_after_last_checkpoint(self, tmp_path):
+        """ING-002: An interrupted load resumes after its last committed chunk"""
+        path = tmp_path / 'lmt.csv'
+        make_price_frame(50).to_csv(path)
+        pool = CopyRecorder(fail_after=2)
+
+        failed = ingest_csv_files(pool, [str(path)], chunk_size=20, report=lambda m: None)[0]
+        assert failed.error and failed.rows_written == 40
+        assert list(pool.checkpoints.values()) == [40]
+
+        pool.fail_after = None
+        result = ingest_csv_files(pool, [str(path)], chunk_size=20, report=lambda m: None)[0]
+
+        assert result.error is None
+        assert result.rows_skipped == 40 and result.rows_written == 10
+        assert len(pool.prices['LMT']) == 50
+        assert pool.checkpoints == {}
+
+    def test_csv_symbol_from_file_name(self, tmp_path):
+        """ING-003: Single-symbol CSVs take the symbol from the file name"""
+        path = tmp_path / 'noc.csv'
+        make_price_frame(30).to_csv(path)
+        pool = CopyRecorder()
+
+        results = ingest_csv_files(pool, [str(path)], chunk_size=12, report=lambda m: None)
+
+        assert results[0].symbol == 'NOC'
+        assert [len(c) for c in pool.copied['NOC']] == [12, 12, 6]
+
+    def test_missing_columns_rejected(self):
+        """ING-004: Frames without OHLCV columns are rejected"""
+        frame = pd.DataFrame({'Date': [date(2025, 1, 2)], 'Close': [100.0]})
+
+        with pytest.raises(ValueError):
+            normalize_frame(frame)
+
+    def test_backfill_is_not_skipped_and_rebuilds_store(self, tmp_path, monkeypatch):
+        """ING-005: Older history loads past seed rows and rebuilds the price store"""
+        from src.stocks import ingest
+        from src.stocks.store import PriceStore
+        import src.db
+
+        frame = make_price_frame(300)
+        seeded = [d.date() for d in frame.index[-7:]]
+        pool = CopyRecorder(stored={'LMT': seeded})
+        pool.close_all = lambda: None
+        store_dir = tmp_path / 'store'
+        store = PriceStore(str(store_dir))
+        store.append('LMT', seeded, *([np.ones(7)] * 4), np.ones(7, dtype=int))
+
+        path = tmp_path / 'lmt.csv'
+        frame.to_csv(path)
+        monkeypatch.setattr(src.db, 'pool_from_env', lambda **kwargs: pool)
+        monkeypatch.setenv('PRICE_STORE_DIR', str(store_dir))
+
+        assert ingest.main([str(path), '--no-forecasts']) == 0
+
+        assert len(pool.prices['LMT']) == 300
+        assert len(PriceStore(str(store_dir)).series('LMT')) == 300
@@ -0,0 +1,114 @@
+"""
+Metrics Tests
+Test ID: MET-001 through MET-004
+"""
+import multiprocessing
+import pytest
+import sys
+import threading
+
+sys.path.insert(0, '.')
+import src.db as db_module
+from src.metrics import COUNTER, GAUGE, HISTOGRAM, Metrics
+
+
+def sample(text, line_start):
+    """Value of the first exposition line starting with line_start"""
+    for line in text.splitlines():
+        if line.startswith(line_start):
+            return float(line.rsplit(' ', 1)[1])
+    raise AssertionError(f"{line_start} not in output")
+
+
+def record_in_child(directory):
+    child = Metrics(directory)
+    child.inc('jobs_total', (('worker', 'child'),), 5)
+    child.add('busy', value=3)
+    child.observe('latency_seconds', 0.2)
+    child.flush()
+
+
+class TestAggregation:
+    """Recording, bucketing and rendering"""
+
+    def test_histogram_and_counter_rendering(self):
+        """MET-001: Buckets are cumulative and labels are escaped"""
+        metrics = Metrics(buckets=(0.1, 1.0))
+        metrics.define('latency_seconds', HISTOGRAM, 'Latency')
+        metrics.define('jobs_total', COUNTER, 'Jobs')
+        for value in (0.05, 0.1, 0.5, 3.0):
+            metrics.observe('latency_seconds', value, (('route', '/a'),))
+        metrics.inc('jobs_total', (('name', 'say "hi"\n'),), 2)
+
+        text = metrics.render()
+
+        assert '# TYPE latency_seconds histogram' in text
+        assert sample(text, 'latency_seconds_bucket{route="/a",le="0.1"}') == 2
+        assert sample(text, 'latency_seconds_bucket{route="/a",le="1"}') == 3
+        assert sample(text, 'latency_seconds_bucket{route="/a",le="+Inf"}') == 4
+        assert sample(text, 'latency_seconds_sum{route="/a"}') == pytest.approx(3.65)
+        assert sample(text, 'latency_seconds_count{route="/a"}') == 4
+        assert 'jobs_total{name="say \\"hi\\"\\n"} 2' in text
+
+    def test_concurrent_recording_is_exact(self):
+        """MET-002: Recording from many threads without locks loses nothing"""
+        metrics = Metrics()
+
+        def work():
+            for _ in range(5000):
+                metrics.inc('hits_total')
+                metrics.observe('latency_seconds', 0.01)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        scalars, histograms = metrics.totals()
+
+        assert scalars[('hits_total', ())] == 40000
+        assert histograms[('latency_seconds', ())][0].sum() == 40000
+
+    def test_workers_are_summed(self, tmp_path):
+        """MET-003: Series published by other processes are added; dead gauges are dropped"""
+        directory = str(tmp_path / 'metrics')
+        metrics = Metrics(directory)
+        metrics.define('busy', GAUGE, 'Busy')
+        metrics.inc('jobs_total', (('worker', 'child'),), 1)
+        metrics.add('busy', value=1)
+
+        child = multiprocessing.get_context('fork').Process(target=record_in_child, args=(directory,))
+        child.start()
+        child.join()
+        scalars, histograms = metrics.totals()
+
+        assert scalars[('jobs_total', (('worker', 'child'),))] == 6
+        assert scalars[('busy', ())] == 1
+        assert histograms[('latency_seconds', ())][0].sum() == 1
+
+
+class TestInstrumentation:
+    """Hooks in the app, the pool and the hashing pool"""
+
+    def test_timed_cursor_and_endpoint(self, client, monkeypatch):
+        """MET-004: Query time reaches observers and requests show up at /metrics"""
+        seen = []
+
+        class FakeCursor:
+            def execute(self, query, vars=None):
+                return 'done'
+
+        monkeypatch.setattr(db_module, '_query_observers', [lambda s, q, p: seen.append((q, p))])
+        cursor = db_module._timed_cursor(FakeCursor)()
+
+        assert cursor.execute("SELECT 1", (2,)) == 'done'
+        assert seen == [("SELECT 1", (2,))]
+
+        client.get('/health')
+        client.get('/does-not-exist')
+        text = client.get('/metrics').get_data(as_text=True)
+
+        assert sample(text, 'http_requests_total{route="/health",method="GET",status="200"}') >= 1
+        assert sample(text, 'http_requests_total{route="unmatched",method="GET",status="404"}') >= 1
+        assert sample(text, 'http_request_duration_seconds_count{route="/health",method="GET"}') >= 1
+        assert 'cache_hit_ratio{cache="stock_history"}' in text
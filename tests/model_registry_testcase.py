@@ -0,0 +1,123 @@
+"""
+Model Registry Tests
+Test ID: MODEL-001 through MODEL-006
+"""
+import pytest
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, '.')
+from src.ml.predictor import StockPredictor
+from src.ml.registry import ModelRegistry
+from src.stocks.store import PriceStore
+from tests.conftest import make_price_frame
+
+
+@pytest.fixture(scope='module')
+def trained():
+    return StockPredictor().train(make_price_frame(300), epochs=5)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path / 'models'), check_interval=0)
+
+
+class TestModelRegistry:
+    """Persistence, lazy loading, LRU eviction and version swaps"""
+
+    def test_serialization_round_trip(self, trained):
+        """MODEL-001: A reloaded model gives identical forecasts"""
+        restored = StockPredictor.from_bytes(trained.to_bytes())
+        closes = make_price_frame(300)['Close'].to_numpy()
+
+        assert np.allclose(restored.forecast(closes, 7), trained.forecast(closes, 7))
+        assert restored.last_date == trained.last_date
+
+    def test_publish_then_lazy_load(self, registry, trained):
+        """MODEL-002: Models load from disk on first use, then from memory"""
+        meta = registry.publish('lmt', trained, metrics={'epochs': 5})
+        assert meta['version'] == 1 and meta['metrics'] == {'epochs': 5}
+        assert registry.stats()['loaded'] == 0
+
+        predictor, loaded_meta = registry.get('LMT')
+        registry.get('LMT')
+
+        assert loaded_meta['version'] == 1
+        assert isinstance(predictor, StockPredictor)
+        stats = registry.stats()
+        assert stats['loads'] == 1 and stats['hits'] == 1
+
+    def test_unknown_symbol(self, tmp_path, trained, monkeypatch):
+        """MODEL-003: Symbols without a published model return (None, None), checked once per interval"""
+        registry = ModelRegistry(str(tmp_path / 'models'), check_interval=60)
+        reads = []
+        current = registry.current
+        monkeypatch.setattr(registry, 'current', lambda symbol: reads.append(symbol) or current(symbol))
+
+        assert registry.get('NOPE') == (None, None)
+        assert registry.get('nope') == (None, None)
+        assert reads == ['NOPE']
+
+        registry.publish('NOPE', trained)
+        assert registry.get('NOPE')[1]['version'] == 1
+
+    def test_lru_eviction_by_count_and_budget(self, tmp_path, trained):
+        """MODEL-004: Least recently used models are dropped past the limits"""
+        registry = ModelRegistry(str(tmp_path / 'models'), max_models=2, check_interval=60)
+        for symbol in ('LMT', 'RTX', 'NOC'):
+            registry.publish(symbol, trained)
+
+        registry.get('LMT')
+        registry.get('RTX')
+        registry.get('LMT')      # RTX is now least recently used
+        registry.get('NOC')
+
+        assert registry.stats()['evictions'] == 1
+        assert set(registry._models) == {'LMT', 'NOC'}
+
+        tight = ModelRegistry(str(tmp_path / 'models'), memory_budget=trained.nbytes + 1)
+        tight.get('LMT')
+        tight.get('RTX')
+        assert tight.stats()['loaded'] == 1
+
+    def test_new_version_swapped_in(self, registry, trained):
+        """MODEL-005: A newly published version replaces the cached one"""
+        registry.publish('LMT', trained)
+        first, _ = registry.get('LMT')
+
+        retrained = StockPredictor(seed=1).train(make_price_frame(300, seed=3), epochs=5)
+        for _ in range(4):
+            registry.publish('LMT', retrained)
+        second, meta = registry.get('LMT')
+
+        assert meta['version'] == 5
+        assert second is not first
+        assert registry.stats()['swaps'] == 1
+        files = sorted(p.name for p in (Path(registry.root) / 'LMT').glob('v*.npz'))
+        assert files == ['v000003.npz', 'v000004.npz', 'v000005.npz']
+
+
+class TestPredictEndpoint:
+    """/predict serves forecasts from published models"""
+
+    def test_predict_uses_published_model(self, client, tmp_path, trained, monkeypatch):
+        """MODEL-006: Response carries model version and model forecasts"""
+        import app as app_module
+
+        registry = ModelRegistry(str(tmp_path / 'models'), check_interval=0)
+        registry.publish('LMT', trained)
+        monkeypatch.setattr(app_module, 'model_registry', registry)
+        monkeypatch.setattr(app_module, 'price_store', PriceStore(str(tmp_path / 'prices')))
+
+        response = client.get('/predict?ticker=LMT&days=5')
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert data['model']['version'] == 1
+        expected = trained.forecast(trained.history, 5)
+        assert [p['price'] for p in data['predictions']] == [round(float(p), 2) for p in expected]
+
+        assert client.get('/predict?ticker=LMT&days=31').status_code == 400
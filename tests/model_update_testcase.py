@@ -0,0 +1,115 @@
+"""
+Incremental Model Update Tests
+Test ID: UPD-001 through UPD-004
+"""
+import pytest
+import sys
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+
+import numpy as np
+
+sys.path.insert(0, '.')
+from src.ml.predictor import StockPredictor
+from src.ml.registry import ModelRegistry
+from src.ml.training import update_all, update_symbol
+from tests.conftest import make_price_frame
+
+
+class PricesPool:
+    """Pool stand-in serving prices rows after the requested date"""
+
+    def __init__(self, frame):
+        self.rows = [
+            (day.date(), row.Open, row.High, row.Low, row.Close, int(row.Volume))
+            for day, row in frame.iterrows()
+        ]
+        self.queries = []
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = MagicMock()
+        cursor = conn.cursor.return_value
+
+        def execute(sql, params):
+            self.queries.append(params)
+            cursor.fetchall.return_value = [r for r in self.rows if r[0] > params[1]]
+
+        cursor.execute.side_effect = execute
+        yield conn
+
+
+class TestWarmStartUpdate:
+    """StockPredictor.update keeps fitted state and trains on new rows only"""
+
+    def test_update_only_uses_new_rows(self):
+        """UPD-001: Rows on or before last_date are ignored"""
+        frame = make_price_frame(400)
+        predictor = StockPredictor().train(frame[:300], epochs=5)
+        mean, std = predictor.feature_mean.copy(), predictor.feature_std.copy()
+
+        predictor.update(frame, epochs=3)     # the first 300 rows are already known
+
+        assert predictor.training_rows == 400
+        assert predictor.last_date == frame.index[-1].date()
+        assert np.array_equal(predictor.feature_mean, mean)
+        assert np.array_equal(predictor.feature_std, std)
+        assert len(predictor.predict(frame, days=7)) == 7
+
+    def test_update_without_new_rows_is_noop(self):
+        """UPD-002: Updating with already-seen data leaves the weights unchanged"""
+        frame = make_price_frame(300)
+        predictor = StockPredictor().train(frame, epochs=5)
+        weights = predictor.weights.copy()
+
+        predictor.update(frame[-50:], epochs=5)
+
+        assert np.array_equal(predictor.weights, weights)
+
+    def test_update_fits_new_regime(self):
+        """UPD-003: Fine-tuning lowers one-step error on the new rows"""
+        frame = make_price_frame(340, seed=2)
+        calm = frame[:300].copy()
+        calm['Close'] = 420.0 + np.random.default_rng(2).normal(0, 1, 300)
+        predictor = StockPredictor().train(calm, epochs=10)
+
+        rally = frame[300:].copy()
+        rally['Close'] = calm['Close'].iloc[-1] * np.exp(np.cumsum(np.full(40, 0.01)))
+        closes = np.concatenate([calm['Close'].to_numpy(), rally['Close'].to_numpy()])
+        features, targets = predictor.training_set(closes)
+        features, targets = features[-35:], targets[-35:]
+
+        def error():
+            return np.mean((predictor._predict_returns(features) - targets) ** 2)
+
+        before = error()
+        predictor.update(rally, epochs=20)
+
+        assert error() < before
+
+
+class TestNightlyUpdate:
+    """Nightly job fine-tunes published models from the prices table"""
+
+    def test_update_publishes_new_version(self, tmp_path):
+        """UPD-004: Only rows after the model's last date are read and a new version is published"""
+        frame = make_price_frame(320)
+        registry = ModelRegistry(str(tmp_path / 'models'), check_interval=0)
+        registry.publish('LMT', StockPredictor().train(frame[:300], epochs=5), metrics={
+            'full_train_seconds': 1.0, 'full_train_rows': 300,
+        })
+        pool = PricesPool(frame)
+        messages = []
+
+        results, failed = update_all(pool, registry, epochs=3, report=messages.append)
+
+        assert failed == []
+        assert results[0]['new_rows'] == 20 and results[0]['version'] == 2
+        assert results[0]['estimated_full_seconds'] == pytest.approx(320 / 300)
+        assert pool.queries[0][1] == frame.index[299].date()
+        assert registry.current('LMT')['last_date'] == frame.index[-1].date().isoformat()
+        assert 'saved' in messages[-1]
+
+        # Nothing new: no further version
+        assert update_symbol(pool, registry, 'LMT')['new_rows'] == 0
+        assert registry.current('LMT')['version'] == 2
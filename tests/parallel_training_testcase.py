@@ -0,0 +1,83 @@
+"""
+Parallel Model Training Tests
+Test ID: TRAIN-001 through TRAIN-004
+"""
+import pytest
+import sys
+import warnings
+
+import numpy as np
+
+sys.path.insert(0, '.')
+from src.ml.predictor import StockPredictor
+from src.ml.registry import ModelRegistry
+from src.ml.training import WORKER_BASE_BYTES, plan_workers, series_to_frame, train_many
+from src.stocks.store import PriceStore
+from tests.conftest import make_price_frame
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PriceStore(str(tmp_path / 'prices'), check_interval=0)
+    for seed, symbol in enumerate(['LMT', 'RTX', 'NOC', 'GD']):
+        frame = make_price_frame(300, seed=seed)
+        store.append(
+            symbol, frame.index.values, frame['Open'], frame['High'],
+            frame['Low'], frame['Close'], frame['Volume'],
+        )
+    return store
+
+
+class TestParallelTraining:
+    """Process pool training from shared-memory feature matrices"""
+
+    def test_all_symbols_trained_and_published(self, store, tmp_path):
+        """TRAIN-001: Every symbol is trained in a worker process and published"""
+        root = str(tmp_path / 'models')
+        messages = []
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', UserWarning)    # no leaked shared memory
+            results = train_many(store, root, epochs=3, workers=2, report=messages.append)
+
+        assert sorted(r.symbol for r in results) == ['GD', 'LMT', 'NOC', 'RTX']
+        assert all(r.error is None and r.version == 1 for r in results)
+        assert all(r.pid is not None for r in results)
+        assert ModelRegistry(root).symbols() == ['GD', 'LMT', 'NOC', 'RTX']
+        assert messages[0] == "Training 4 symbols on 2 worker processes"
+        assert messages[-1].startswith("Trained 4/4 symbols")
+
+    def test_matches_in_process_training(self, store, tmp_path):
+        """TRAIN-002: Shared-memory training gives the same model as train()"""
+        root = str(tmp_path / 'models')
+        train_many(store, root, ['LMT'], epochs=3, report=lambda m: None)
+
+        published, meta = ModelRegistry(root).get('LMT')
+        local = StockPredictor().train(series_to_frame(store.series('LMT')), epochs=3)
+
+        assert np.allclose(published.weights, local.weights)
+        assert published.last_date == local.last_date
+        assert meta['metrics']['full_train_rows'] == 300
+
+    def test_failures_reported_per_symbol(self, store, tmp_path):
+        """TRAIN-003: A symbol that cannot be trained does not stop the others"""
+        short = make_price_frame(20)
+        store.append('TINY', short.index.values, short['Open'], short['High'],
+                     short['Low'], short['Close'], short['Volume'])
+
+        results = train_many(store, str(tmp_path / 'models'), ['LMT', 'TINY', 'NOPE'],
+                             epochs=2, report=lambda m: None)
+        by_symbol = {r.symbol: r for r in results}
+
+        assert by_symbol['LMT'].error is None
+        assert 'at least' in by_symbol['TINY'].error
+        assert by_symbol['NOPE'].error == "no stored prices"
+
+    def test_concurrency_capped_by_memory(self):
+        """TRAIN-004: Worker count respects the memory budget and task count"""
+        tasks = [50 * 1024 * 1024] * 8
+
+        assert plan_workers(tasks, workers=8) == 8
+        assert plan_workers(tasks, workers=8, memory_budget=2 * (WORKER_BASE_BYTES + 150 * 1024 * 1024)) == 2
+        assert plan_workers(tasks, workers=8, memory_budget=1) == 1
+        assert plan_workers(tasks[:3], workers=8) == 3
@@ -0,0 +1,86 @@
+"""
+Columnar Price Store Tests
+Test ID: STORE-001 through STORE-005
+"""
+import pytest
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, '.')
+from src.stocks.cache import TTLCache
+from src.stocks.history import StockHistoryService
+from src.stocks.store import PriceStore
+
+
+def daily_columns(start, days, base=100.0):
+    dates = np.arange(np.datetime64(start, 'D'), np.datetime64(start, 'D') + days)
+    close = base + np.arange(days, dtype=float)
+    return dates, close - 0.5, close + 1, close - 1, close, np.full(days, 1000)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return PriceStore(str(tmp_path / 'prices'), check_interval=0)
+
+
+class TestPriceStore:
+    """Memory-mapped columns, range slicing and incremental appends"""
+
+    def test_append_and_read_back(self, store):
+        """STORE-001: Stored columns round-trip through the mapped files"""
+        store.append('lmt', *daily_columns('2024-01-01', 10))
+
+        series = store.series('LMT')
+        assert len(series) == 10
+        assert series.dates[0] == np.datetime64('2024-01-01')
+        assert series.close[-1] == 109.0
+        assert isinstance(series.close, np.memmap)
+        assert store.symbols() == ['LMT']
+
+    def test_window_is_zero_copy(self, store):
+        """STORE-002: Date windows are views into the mapped columns"""
+        store.append('LMT', *daily_columns('2024-01-01', 366))
+        series = store.series('LMT')
+
+        window = store.window('LMT', date(2024, 3, 1), date(2024, 3, 31))
+
+        assert len(window) == 31
+        assert window.dates[0] == np.datetime64('2024-03-01')
+        assert window.dates[-1] == np.datetime64('2024-03-31')
+        assert np.shares_memory(window.close, series.close)
+
+    def test_incremental_append_visible_to_readers(self, store, tmp_path):
+        """STORE-003: Appends only add newer rows and readers pick them up"""
+        reader = PriceStore(store.root, check_interval=0)
+        store.append('LMT', *daily_columns('2024-01-01', 5))
+        assert len(reader.series('LMT')) == 5
+
+        # Overlapping input: only the three rows after 2024-01-05 are new
+        added = store.append('LMT', *daily_columns('2024-01-04', 5, base=103.0))
+
+        assert added == 3
+        assert len(reader.series('LMT')) == 8
+        assert reader.last_date('LMT') == date(2024, 1, 8)
+
+    def test_unknown_symbol(self, store):
+        """STORE-004: Missing symbols return None"""
+        assert store.series('NOPE') is None
+        assert store.window('NOPE', date(2024, 1, 1)) is None
+        assert store.latest_close('NOPE') is None
+
+    def test_history_service_reads_from_store(self, store):
+        """STORE-005: Fresh stored data is served without touching the DB"""
+        start = date.today() - timedelta(days=40)
+        store.append('LMT', *daily_columns(start.isoformat(), 40))
+
+        class NoPool:
+            def connection(self, timeout=None):
+                raise AssertionError("database should not be queried")
+
+        service = StockHistoryService(NoPool(), TTLCache(), fetch=None, store=store)
+        payload = service.get('LMT', '1mo')
+
+        assert payload['count'] == 31
+        assert service.stats()['l2_hits'] == 1
@@ -0,0 +1,133 @@
+"""
+Rate Limiter Tests
+Test ID: RL-001 through RL-007
+"""
+import pytest
+import sys
+from unittest.mock import patch
+
+from flask import Flask
+
+sys.path.insert(0, '.')
+from src.rate_limit import MemoryBackend, SharedMemoryBackend, RateLimiter, rate_limit
+
+
+@pytest.fixture(params=['memory', 'shm'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        yield MemoryBackend()
+    else:
+        shm = SharedMemoryBackend(str(tmp_path / 'ratelimit'), slots=64)
+        yield shm
+        shm.close()
+
+
+class TestRateLimiter:
+    """Sliding-window counting and key eviction"""
+
+    def test_allows_up_to_limit(self, backend):
+        """RL-001: Exactly `limit` hits pass within one window"""
+        limiter = RateLimiter(backend, limit=5, window=60)
+
+        with patch('src.rate_limit.time.time', return_value=600.0):
+            results = [limiter.hit('10.0.0.1')[0] for _ in range(7)]
+
+        assert results == [True] * 5 + [False] * 2
+
+    def test_keys_are_independent(self, backend):
+        """RL-002: One IP hitting the limit does not affect another"""
+        limiter = RateLimiter(backend, limit=1, window=60)
+
+        with patch('src.rate_limit.time.time', return_value=600.0):
+            assert limiter.hit('10.0.0.1')[0]
+            assert not limiter.hit('10.0.0.1')[0]
+            assert limiter.hit('10.0.0.2')[0]
+
+    def test_previous_window_is_weighted(self, backend):
+        """RL-003: Hits from the previous window decay linearly"""
+        limiter = RateLimiter(backend, limit=10, window=60)
+
+        with patch('src.rate_limit.time.time', return_value=659.0):
+            for _ in range(10):
+                limiter.hit('10.0.0.1')
+
+        # 15s into the next window the previous 10 hits still weigh 7.5
+        with patch('src.rate_limit.time.time', return_value=675.0):
+            results = [limiter.hit('10.0.0.1')[0] for _ in range(3)]
+        assert results == [True, True, False]
+
+        # A full window later they no longer count
+        with patch('src.rate_limit.time.time', return_value=780.0):
+            assert limiter.hit('10.0.0.1')[0]
+
+    def test_retry_after_reported(self, backend):
+        """RL-004: Blocked hits report when to retry"""
+        limiter = RateLimiter(backend, limit=1, window=60)
+
+        with patch('src.rate_limit.time.time', return_value=610.0):
+            limiter.hit('10.0.0.1')
+            allowed, retry_after = limiter.hit('10.0.0.1')
+
+        assert not allowed
+        assert retry_after == 50
+
+
+class TestKeyEviction:
+    """Memory stays bounded under many distinct keys"""
+
+    def test_memory_backend_evicts_idle_keys(self):
+        """RL-005: Keys idle for two windows are swept"""
+        backend = MemoryBackend(sweep_interval=0)
+        limiter = RateLimiter(backend, limit=5, window=60)
+
+        with patch('src.rate_limit.time.time', return_value=600.0):
+            for i in range(1000):
+                limiter.hit(f'10.0.{i // 256}.{i % 256}')
+        assert len(backend) == 1000
+
+        with patch('src.rate_limit.time.time', return_value=800.0):
+            limiter.hit('10.9.9.9')
+        assert len(backend) == 1
+
+    def test_shared_memory_mixes_window_lengths(self, tmp_path):
+        """RL-007: Short-window keys neither reset nor outlive long-window slots"""
+        backend = SharedMemoryBackend(str(tmp_path / 'ratelimit'), slots=2)
+        register = RateLimiter(backend, limit=1, window=3600, scope='register')
+        login = RateLimiter(backend, limit=5, window=60, scope='login')
+
+        with patch('src.rate_limit.time.time', return_value=36010.0):
+            assert register.hit('10.0.0.1')[0]
+
+        # Login keys two minutes later evict each other, not the register slot
+        with patch('src.rate_limit.time.time', return_value=36200.0):
+            for i in range(5):
+                login.hit(f'10.0.1.{i}')
+            assert not register.hit('10.0.0.1')[0]
+
+        # Once the login slot has expired, a new register key reclaims it
+        with patch('src.rate_limit.time.time', return_value=36400.0):
+            assert register.hit('10.0.0.2')[0]
+            assert not register.hit('10.0.0.1')[0]
+        backend.close()
+
+
+class TestRateLimitDecorator:
+    """Flask integration"""
+
+    def test_decorator_returns_429(self):
+        """RL-006: Views answer 429 with Retry-After once limited"""
+        app = Flask(__name__)
+        limiter = RateLimiter(MemoryBackend(), limit=2, window=60)
+
+        @app.route('/limited')
+        @rate_limit(limiter)
+        def limited():
+            return {"ok": True}
+
+        client = app.test_client()
+        codes = [client.get('/limited').status_code for _ in range(3)]
+
+        assert codes == [200, 200, 429]
+        response = client.get('/limited')
+        assert 'Retry-After' in response.headers
+        assert 'error' in response.get_json()
@@ -0,0 +1,72 @@
+"""
+Production Server Tests
+Test ID: SRV-001 through SRV-003
+"""
+import logging
+import os
+import runpy
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, '.')
+from src import server
+from src.ml.predictor import StockPredictor
+from src.ml.registry import ModelRegistry
+from tests.conftest import make_price_frame
+from tests.history_stream_testcase import stored_history
+
+
+class TestWarmup:
+    """Work done in the master before forking"""
+
+    def test_warm_loads_models_and_prices(self, tmp_path):
+        """SRV-001: Published models are loaded and stored prices are mapped"""
+        registry = ModelRegistry(str(tmp_path / 'models'), check_interval=60)
+        registry.publish('LMT', StockPredictor().train(make_price_frame(200), epochs=2))
+        registry.evict('LMT')
+        store = stored_history(str(tmp_path / 'prices'), 500)
+
+        warmed = server.warm(SimpleNamespace(model_registry=registry, price_store=store))
+
+        assert warmed['models'] == 1 and warmed['price_series'] == 1
+        assert registry.stats()['loaded'] == 1
+        assert 'LMT' in store._mapped
+
+    def test_hooks_report_and_reset(self, caplog, monkeypatch):
+        """SRV-002: Hooks log startup memory and reset per-process resources"""
+        import app as app_module
+
+        log = logging.getLogger('gunicorn-test')
+        caplog.set_level(logging.INFO, logger='gunicorn-test')
+        resets = []
+        for name in ('db_pool', 'password_hasher', 'audit_writer'):
+            monkeypatch.setattr(app_module, name, SimpleNamespace(reset=lambda name=name: resets.append(name)))
+
+        server.post_fork(SimpleNamespace(log=log), SimpleNamespace())
+        server.post_worker_init(SimpleNamespace(log=log, pid=os.getpid()))
+
+        memory = server.memory_usage()
+        assert resets == ['db_pool', 'password_hasher', 'audit_writer']
+        assert memory['rss_mb'] > 0
+        assert 'booted' in caplog.text and 'rss' in caplog.text
+
+
+class TestConfig:
+    """gunicorn.conf.py"""
+
+    def test_config_module(self, tmp_path, monkeypatch):
+        """SRV-003: Preloading gthread workers share a metrics directory"""
+        metrics_dir = tmp_path / 'metrics'
+        metrics_dir.mkdir()
+        (metrics_dir / 'metrics-1.json').write_text('{}')
+        monkeypatch.setenv('METRICS_DIR', str(metrics_dir))
+        monkeypatch.setenv('WEB_WORKERS', '3')
+        monkeypatch.setenv('BCRYPT_WORKERS', '2')
+
+        config = runpy.run_path('gunicorn.conf.py')
+
+        assert config['preload_app'] and config['wsgi_app'] == 'app:app'
+        assert config['workers'] == 3 and config['worker_class'] == 'gthread'
+        assert list(metrics_dir.iterdir()) == []
+        assert config['post_fork'] is server.post_fork
+        assert server.default_workers(1) == 2 and server.default_workers(8) == 8
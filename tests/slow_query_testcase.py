@@ -0,0 +1,133 @@
+"""
+Slow-Query Log Tests
+Test ID: SQL-001 through SQL-006
+"""
+import pytest
+import sys
+from contextlib import contextmanager
+from unittest.mock import MagicMock
+
+sys.path.insert(0, '.')
+from src.slow_queries import SlowQueryLog, fingerprint
+
+
+class ExplainPool:
+    """Pool stand-in that records the statements run on its connections"""
+
+    def __init__(self):
+        self.executed = []
+        self.rollbacks = 0
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = MagicMock()
+        cursor = conn.cursor.return_value
+        cursor.execute.side_effect = lambda sql, params=None: self.executed.append((sql, params))
+        cursor.fetchall.return_value = [("Seq Scan on users",), ("  Buffers: shared hit=3",)]
+        conn.rollback.side_effect = lambda: setattr(self, 'rollbacks', self.rollbacks + 1)
+        yield conn
+
+
+@pytest.fixture
+def log():
+    return SlowQueryLog(ExplainPool(), threshold=0.1, interval=60)
+
+
+class TestFingerprints:
+    """Statement normalization and statistics"""
+
+    def test_literals_and_lists_collapse(self):
+        """SQL-001: Statements differing only in values share a fingerprint"""
+        assert fingerprint("SELECT * FROM users WHERE email = %s") == \
+            fingerprint("SELECT *  FROM users\n WHERE email = 'a@b.com'")
+        assert fingerprint("SELECT 1 FROM prices WHERE symbol IN ('LMT', 'RTX', 'BA') AND close_price > 10.5") == \
+            "SELECT ? FROM prices WHERE symbol IN (?) AND close_price > ?"
+        assert fingerprint("INSERT INTO t (a, b) VALUES (1, 'x'), (2, 'it''s'), (3, 'z')") == \
+            "INSERT INTO t (a, b) VALUES (?)"
+        assert fingerprint(b"SELECT price_1 FROM t2") == "SELECT price_1 FROM t2"
+
+    def test_statement_statistics(self, log):
+        """SQL-002: Calls, percentiles and ordering by total time"""
+        for ms in range(1, 101):
+            log.record(ms / 10000, "SELECT id FROM users WHERE email = %s", ('x',))
+        log.record(0.05, "UPDATE users SET last_login = now() WHERE id = %s", (1,))
+
+        fast, update = log.statements()
+
+        assert fast['calls'] == 100 and fast['max_ms'] == 10.0
+        assert fast['p50_ms'] == pytest.approx(5.05) and fast['p99_ms'] == pytest.approx(9.901)
+        assert update['fingerprint'] == "UPDATE users SET last_login = now() WHERE id = ?"
+        assert log.stats()['slow'] == 0
+
+
+class TestExplainCapture:
+    """Sampled, rate-limited EXPLAIN of slow statements"""
+
+    def test_slow_select_is_analyzed_once(self, log):
+        """SQL-003: SELECTs get EXPLAIN (ANALYZE, BUFFERS) once per interval, rolled back"""
+        sql = "SELECT id, password_hash FROM users WHERE email = %s"
+        log.record(0.5, sql, ('a@b.com',))
+        log.record(0.7, sql, ('c@d.com',))
+        log.record(0.3, "UPDATE users SET last_login = now() WHERE id = %s", (7,))
+        log.join()
+
+        explains = [e for e in log.pool.executed if e[0].startswith('EXPLAIN')]
+        assert explains == [
+            (f"EXPLAIN (ANALYZE, BUFFERS) {sql}", ('a@b.com',)),
+            ("EXPLAIN UPDATE users SET last_login = now() WHERE id = %s", (7,)),
+        ]
+        assert log.pool.rollbacks == 2
+        update, select = log.captures()
+        assert select['analyzed'] and select['duration_ms'] == 500.0
+        assert 'Buffers' in select['plan'] and not update['analyzed']
+        assert log.stats()['slow'] == 3 and log.stats()['skipped'] == 1
+
+    def test_writing_statements_are_not_analyzed(self, log):
+        """SQL-005: Data-modifying CTEs and locking SELECTs get a plain EXPLAIN"""
+        cte = ("WITH moved AS (DELETE FROM auth_audit WHERE created_at < %s RETURNING *) "
+               "SELECT count(*) FROM moved")
+        locking = "SELECT id FROM users WHERE email = %s FOR UPDATE"
+        quoted = "WITH recent AS (SELECT * FROM auth_audit WHERE action = 'delete') SELECT count(*) FROM recent"
+        for sql in (cte, locking, quoted):
+            log.record(0.5, sql, ('x',))
+        log.join()
+
+        explains = [e[0] for e in log.pool.executed if e[0].startswith('EXPLAIN')]
+        assert explains == [f"EXPLAIN {cte}", f"EXPLAIN {locking}", f"EXPLAIN (ANALYZE, BUFFERS) {quoted}"]
+
+    def test_inlined_batches_are_scrubbed(self, log):
+        """SQL-006: execute_values batches share a fingerprint, are not memoized and keep no literals"""
+        def batch(start):
+            rows = ", ".join(f"('login', 'user{i}@example.com', {i}, '10.0.0.{i}', now())"
+                             for i in range(start, start + 500))
+            return ("INSERT INTO auth_audit (action, email, user_id, ip_address, created_at) "
+                    f"VALUES {rows} ON CONFLICT DO NOTHING")
+
+        log.record(0.01, batch(0))
+        log.record(0.5, batch(500))
+        log.join()
+
+        (statement,) = log.statements()
+        assert statement['calls'] == 2
+        assert statement['fingerprint'] == ("INSERT INTO auth_audit (action, email, user_id, ip_address, "
+                                            "created_at) VALUES (?) ON CONFLICT DO NOTHING")
+        assert log._fingerprints == {}
+        (capture,) = log.captures()
+        assert 'example.com' not in capture['query'] and '10.0.0' not in capture['query']
+        assert capture['query'].endswith("VALUES (?) ON CONFLICT DO NOTHING")
+
+    def test_admin_endpoint(self, client, log, monkeypatch):
+        """SQL-004: /admin/slow-queries needs the admin token"""
+        import app as app_module
+
+        log.record(0.4, "SELECT * FROM prices WHERE symbol = %s", ('LMT',))
+        log.join()
+        monkeypatch.setattr(app_module, 'slow_query_log', log)
+
+        assert client.get('/admin/slow-queries').status_code == 404
+        monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 's3cret')
+        assert client.get('/admin/slow-queries', headers={'X-Admin-Token': 'wrong'}).status_code == 403
+
+        data = client.get('/admin/slow-queries', headers={'X-Admin-Token': 's3cret'}).get_json()
+        assert data['statements'][0]['fingerprint'] == "SELECT * FROM prices WHERE symbol = ?"
+        assert data['slow_queries'][0]['plan'].startswith("Seq Scan")
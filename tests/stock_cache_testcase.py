@@ -0,0 +1,213 @@
+"""
+Stock History Cache Tests
+Test ID: CACHE-001 through CACHE-008
+"""
+import json
+import pytest
+import threading
+import time
+import sys
+from contextlib import contextmanager
+from datetime import date, timedelta
+from unittest.mock import MagicMock
+
+sys.path.insert(0, '.')
+from src.db import PoolError
+from src.stocks.cache import SingleFlight, TTLCache
+from src.stocks.history import StockHistoryService, StockNotFound, frame_to_rows
+
+
+class NoDatabase:
+    """Pool stand-in for an unreachable database"""
+
+    @contextmanager
+    def connection(self, timeout=None):
+        raise PoolError("database unavailable")
+        yield
+
+
+class PricesDatabase:
+    """Pool stand-in whose prices table holds the given {symbol: rows}"""
+
+    def __init__(self, prices):
+        self.prices = prices
+        self.queries = []
+
+    @contextmanager
+    def connection(self, timeout=None):
+        conn = MagicMock()
+        cursor = conn.cursor.return_value
+
+        def execute(sql, params):
+            self.queries.append(params)
+            symbols = params[0]
+            cursor.fetchall.return_value = [
+                (symbol,) + row
+                for symbol in sorted(symbols) for row in self.prices.get(symbol, [])
+            ]
+
+        cursor.execute.side_effect = execute
+        yield conn
+
+
+def sample_rows(days=5):
+    today = date.today()
+    return [
+        (today - timedelta(days=days - i), 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i, 1000)
+        for i in range(days)
+    ]
+
+
+class TestTTLCache:
+    """LRU eviction and expiry"""
+
+    def test_lru_eviction(self):
+        """CACHE-001: Least recently used entries are evicted first"""
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.stats()['evictions'] == 1
+
+    def test_entries_expire(self):
+        """CACHE-002: Entries are not served after their TTL"""
+        cache = TTLCache(maxsize=10, ttl=0.01)
+        cache.set('a', 1)
+        time.sleep(0.02)
+
+        assert cache.get('a') is None
+
+
+class TestSingleFlight:
+    """Concurrent miss coalescing"""
+
+    def test_concurrent_misses_share_one_upstream_call(self):
+        """CACHE-003: Ten concurrent misses cause a single fetch"""
+        calls = []
+        gate = threading.Event()
+
+        def fetch(ticker, period):
+            calls.append(ticker)
+            gate.wait(2)
+            return sample_rows()
+
+        service = StockHistoryService(NoDatabase(), TTLCache(), fetch=fetch, write_back=False)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(service.get('LMT', '1y')))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        while service.stats()['coalesced'] < 9:
+            time.sleep(0.005)
+        gate.set()
+        for thread in threads:
+            thread.join()
+
+        assert calls == ['LMT']
+        assert len(results) == 10
+        assert all(r is results[0] for r in results)
+        assert service.stats()['upstream_fetches'] == 1
+
+    def test_errors_are_shared(self):
+        """CACHE-004: Waiters receive the leader's exception"""
+        flight = SingleFlight()
+        gate = threading.Event()
+        errors = []
+
+        def failing():
+            gate.wait(2)
+            raise ValueError("upstream failed")
+
+        def call():
+            try:
+                flight.do('key', failing)
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        while flight.coalesced < 2:
+            time.sleep(0.005)
+        gate.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(errors) == 3
+
+    def test_cache_hit_skips_upstream(self):
+        """CACHE-005: Repeat requests are served from L1"""
+        calls = []
+
+        def fetch(ticker, period):
+            calls.append(ticker)
+            return sample_rows() if ticker == 'LMT' else []
+
+        service = StockHistoryService(NoDatabase(), TTLCache(), fetch=fetch, write_back=False)
+        for _ in range(3):
+            assert service.get('LMT', '1mo')['ticker'] == 'LMT'
+        with pytest.raises(StockNotFound):
+            service.get('NOPE', '1mo')
+
+        assert calls == ['LMT', 'NOPE']
+        assert service.stats()['l1_hits'] == 2
+
+    def test_nan_bars_are_dropped(self):
+        """CACHE-008: NaN prices are dropped and NaN volume becomes 0"""
+        import pandas as pd
+
+        nan = float('nan')
+        frame = pd.DataFrame({
+            'Open': [10.0, nan, 11.0, 12.0], 'High': [10.5, nan, 11.5, float('inf')],
+            'Low': [9.5, nan, 10.5, 11.5], 'Close': [10.2, nan, 11.2, 12.2],
+            'Volume': [100, nan, nan, 300],
+        }, index=pd.date_range(date.today() - timedelta(days=3), periods=4, tz='America/New_York'))
+
+        rows = frame_to_rows(frame)
+        assert rows == [
+            (frame.index[0].date(), 10.0, 10.5, 9.5, 10.2, 100),
+            (frame.index[2].date(), 11.0, 11.5, 10.5, 11.2, 0),
+        ]
+
+        service = StockHistoryService(NoDatabase(), TTLCache(), fetch=lambda t, p: frame_to_rows(frame),
+                                      write_back=False)
+        payload = service.get('LMT', '5d')
+        assert len(payload['historical_data']) == 2
+        json.dumps(payload, allow_nan=False)        # strict JSON, no NaN tokens
+
+
+class TestBatchReads:
+    """get_many: one query for stored symbols, parallel upstream for the rest"""
+
+    def test_stored_symbols_use_one_query(self):
+        """CACHE-006: Stored symbols cost a single DB round trip"""
+        symbols = ['LMT', 'RTX', 'BA', 'NOC', 'GD']
+        database = PricesDatabase({s: sample_rows(30) for s in symbols})
+        service = StockHistoryService(database, TTLCache(), fetch=None, write_back=False)
+
+        payloads, errors = service.get_many(symbols, '1mo')
+
+        assert sorted(payloads) == sorted(symbols)
+        assert errors == {}
+        assert len(database.queries) == 1
+        assert service.stats()['l2_hits'] == 5
+
+    def test_partial_results_with_errors(self):
+        """CACHE-007: One failing ticker does not fail the batch"""
+        database = PricesDatabase({'LMT': sample_rows(30)})
+
+        def fetch(ticker, period):
+            return sample_rows(30) if ticker == 'BA' else []
+
+        service = StockHistoryService(database, TTLCache(), fetch=fetch, write_back=False)
+        payloads, errors = service.get_many(['LMT', 'BA', 'NOPE'], '1mo')
+
+        assert sorted(payloads) == ['BA', 'LMT']
+        assert isinstance(errors['NOPE'], StockNotFound)
+        assert service.stats()['upstream_fetches'] == 2